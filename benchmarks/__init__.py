@@ -0,0 +1,4 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
@@ -0,0 +1,148 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Benchmarks of the rescaling and interpolation performed by the
+generators.
+
+"""
+import os
+import shutil
+import tempfile
+import numpy as np
+from eddylicious.readers.hdf5_readers import *
+from eddylicious.writers.raw_writers import create_velocity_files_raw
+from eddylicious.generators.helper_functions import blending_function
+from eddylicious.generators.lund_rescaling import *
+from eddylicious.generators.interpolation import interpolation_generate
+from eddylicious.generators.interpolation import rectilinear_grid
+from eddylicious.generators.executors import get_executor
+from .synthetic import channel_grid, channel_mean_velocity, channel_velocity
+from .synthetic import create_hdf5_precursor, nu
+
+gridSizes = [32, 64, 128]
+
+
+class LundRescaling(object):
+    """Rescaling the mean velocity and the fluctuations of the bottom
+    half of a channel onto a finer inflow grid, for square precursor
+    grids of different sizes.
+
+    """
+    params = gridSizes
+    param_names = ["nPoints"]
+
+    def setup(self, nPoints):
+        randomState = np.random.RandomState(0)
+
+        # The points of the bottom half, with the wall and the centreline
+        # added, as done by runLundRescaling
+        [pointsY, pointsZ] = channel_grid(2*nPoints, nPoints)
+        pointsY = np.concatenate((np.zeros((1, nPoints)), pointsY[:nPoints],
+                                  np.ones((1, nPoints))))
+        self.pointsZ = np.concatenate((pointsZ[:1], pointsZ[:nPoints],
+                                       pointsZ[:1]))
+        self.etaPrec = pointsY[:, 0]
+        self.yPlusPrec = self.etaPrec/nu
+        self.uMeanXPrec = channel_mean_velocity(self.etaPrec)
+        self.uMeanYPrec = np.zeros(self.etaPrec.shape)
+
+        self.uPrime = channel_velocity(pointsY, randomState)
+        self.uPrime[0] -= self.uMeanXPrec[:, np.newaxis]
+
+        # The bottom half of an inflow grid with 50% more points in each
+        # direction
+        nPointsInfl = 3*nPoints//2
+        [pointsYInfl, pointsZInfl] = channel_grid(2*nPointsInfl, nPointsInfl)
+        self.etaInfl = pointsYInfl[:nPointsInfl, 0]
+        self.yPlusInfl = self.etaInfl/nu
+        self.pointsZInfl = pointsZInfl[:nPointsInfl]
+        self.nInfl = nPointsInfl
+        self.nPointsZInfl = nPointsInfl
+        self.blending = blending_function(self.etaInfl)
+
+    def time_rescale_mean_velocity(self, nPoints):
+        lund_rescale_mean_velocity(self.etaPrec, self.yPlusPrec,
+                                   self.uMeanXPrec, self.uMeanYPrec,
+                                   self.nInfl, self.etaInfl, self.yPlusInfl,
+                                   self.nPointsZInfl, 1, 1, 1, self.blending)
+
+    def time_rescale_fluctuations(self, nPoints):
+        lund_rescale_fluctuations(self.etaPrec, self.yPlusPrec, self.pointsZ,
+                                  self.uPrime[0], self.uPrime[1],
+                                  self.uPrime[2], 1, self.etaInfl,
+                                  self.yPlusInfl, self.pointsZInfl,
+                                  self.nInfl, self.blending)
+
+
+class Interpolation(object):
+    """Generating a few time-steps of an inflow database by
+    interpolation from an HDF5 precursor database onto a finer grid, for
+    square precursor grids of different sizes. The velocity is written
+    in the raw format.
+
+    """
+    params = gridSizes
+    param_names = ["nPoints"]
+    timeout = 300
+    nTimes = 4
+
+    def setup(self, nPoints):
+        self.directory = tempfile.mkdtemp()
+        precursorPath = os.path.join(self.directory, "precursor.hdf5")
+        create_hdf5_precursor(precursorPath, nPoints, nPoints, self.nTimes)
+
+        [pointsY, pointsZ] = read_structured_points_hdf5(precursorPath)
+        self.reader = read_structured_velocity_hdf5(precursorPath)
+        self.times = list(range(self.nTimes))
+
+        # All the points, normalized to the unit square
+        pointsY = np.ravel(pointsY)
+        pointsZ = np.ravel(pointsZ)
+        self.idxPrec = np.arange(pointsY.size)
+        self.points = np.column_stack(
+            ((pointsY - pointsY.min())/np.ptp(pointsY),
+             (pointsZ - pointsZ.min())/np.ptp(pointsZ)))
+
+        nPointsInfl = 3*nPoints//2
+        [pointsYInfl, pointsZInfl] = channel_grid(nPointsInfl, nPointsInfl)
+        self.pointsInfl = np.column_stack((pointsYInfl.ravel()/2,
+                                           pointsZInfl.ravel()/3))
+
+        self.writePath = os.path.join(self.directory, "inflow")
+        os.makedirs(self.writePath)
+        create_velocity_files_raw(self.writePath, self.nTimes,
+                                  self.pointsInfl.shape[0], 0)
+
+        self.executor = get_executor("serial")
+
+        # Both grids are rectilinear
+        self.grids = [rectilinear_grid(self.points[:, 0], self.points[:, 1]),
+                      rectilinear_grid(self.pointsInfl[:, 0],
+                                       self.pointsInfl[:, 1])]
+
+    def teardown(self, nPoints):
+        shutil.rmtree(self.directory)
+
+    def time_interpolation_generate_rectilinear(self, nPoints):
+        interpolation_generate(self.reader, "raw", self.writePath,
+                               1, 0, self.nTimes - 1, 0,
+                               self.points, self.pointsInfl,
+                               self.idxPrec, self.times,
+                               executor=self.executor, grids=self.grids)
+
+    def time_interpolation_generate_batched(self, nPoints):
+        interpolation_generate(self.reader, "raw", self.writePath,
+                               1, 0, self.nTimes - 1, 0,
+                               self.points, self.pointsInfl,
+                               self.idxPrec, self.times,
+                               executor=self.executor,
+                               batchSize=self.nTimes)
+
+    def time_interpolation_generate(self, nPoints):
+        interpolation_generate(self.reader, "raw", self.writePath,
+                               1, 0, self.nTimes - 1, 0,
+                               self.points, self.pointsInfl,
+                               self.idxPrec, self.times,
+                               executor=self.executor)
@@ -0,0 +1,76 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Benchmarks of the readers of precursor databases."""
+import os
+import shutil
+import tempfile
+from eddylicious.readers.foamfile_readers import *
+from eddylicious.readers.hdf5_readers import *
+from .synthetic import create_foamfile_precursor, create_hdf5_precursor
+
+gridSizes = [32, 64, 128]
+
+
+class FoamFileReaders(object):
+    """Reading the points and a velocity field in the foamFile format,
+    ascii and binary, for square grids of different sizes.
+
+    """
+    params = [gridSizes, ["ascii", "binary"]]
+    param_names = ["nPoints", "format"]
+    timeout = 300
+
+    def setup(self, nPoints, fileFormat):
+        self.casePath = tempfile.mkdtemp()
+        self.times = create_foamfile_precursor(self.casePath, nPoints,
+                                               nPoints, 2,
+                                               binary=fileFormat == "binary")
+        self.dataDir = os.path.join(self.casePath, "postProcessing",
+                                    "sampledSurface")
+        self.pointsPath = os.path.join(self.dataDir, self.times[0], "inlet",
+                                       "faceCentres")
+
+        [pointsY, pointsZ, self.yInd, self.zInd] = \
+            read_structured_points_foamfile(self.pointsPath)
+        self.reader = read_structured_velocity_foamfile(self.dataDir, "inlet",
+                                                        nPoints, self.yInd,
+                                                        self.zInd)
+
+    def teardown(self, nPoints, fileFormat):
+        shutil.rmtree(self.casePath)
+
+    def time_read_structured_points(self, nPoints, fileFormat):
+        read_structured_points_foamfile(self.pointsPath)
+
+    def time_read_structured_velocity(self, nPoints, fileFormat):
+        self.reader(self.times[1])
+
+    def time_read_points(self, nPoints, fileFormat):
+        read_points_foamfile(self.pointsPath)
+
+
+class HDF5Readers(object):
+    """Reading the points and a velocity field in the HDF5 format, for
+    square grids of different sizes.
+
+    """
+    params = gridSizes
+    param_names = ["nPoints"]
+
+    def setup(self, nPoints):
+        self.directory = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.directory, "precursor.hdf5")
+        create_hdf5_precursor(self.filePath, nPoints, nPoints, 2)
+        self.reader = read_structured_velocity_hdf5(self.filePath)
+
+    def teardown(self, nPoints):
+        shutil.rmtree(self.directory)
+
+    def time_read_structured_points(self, nPoints):
+        read_structured_points_hdf5(self.filePath)
+
+    def time_read_structured_velocity(self, nPoints):
+        self.reader(1)
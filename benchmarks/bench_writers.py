@@ -0,0 +1,57 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Benchmarks of the writers of inflow databases."""
+import os
+import shutil
+import tempfile
+import numpy as np
+import h5py
+from eddylicious.writers.ofnative_writers import *
+from eddylicious.writers.hdf5_writers import *
+from eddylicious.writers.raw_writers import *
+
+gridSizes = [32, 64, 128]
+
+
+class Writers(object):
+    """Writing a single velocity field for square grids of different
+    sizes.
+
+    """
+    params = gridSizes
+    param_names = ["nPoints"]
+
+    def setup(self, nPoints):
+        self.directory = tempfile.mkdtemp()
+        randomState = np.random.RandomState(0)
+        self.u = [randomState.standard_normal((nPoints, nPoints))
+                  for i in range(3)]
+        self.iteration = 0
+
+        self.hdf5File = h5py.File(os.path.join(self.directory,
+                                               "inflow.hdf5"), 'w')
+        create_velocity_datasets_hdf5(self.hdf5File, 1, nPoints**2, 0)
+
+        self.rawPath = os.path.join(self.directory, "raw")
+        os.makedirs(self.rawPath)
+        create_velocity_files_raw(self.rawPath, 1, nPoints**2, 0)
+
+    def teardown(self, nPoints):
+        self.hdf5File.close()
+        shutil.rmtree(self.directory)
+
+    def time_write_ofnative(self, nPoints):
+        # A new time directory each call, as in the generators
+        self.iteration += 1
+        write_velocity_to_ofnative(self.directory, self.iteration, *self.u)
+
+    def time_write_hdf5(self, nPoints):
+        write_velocity_to_hdf5(self.hdf5File, 0, self.u[0], self.u[1],
+                               self.u[2], 0)
+
+    def time_write_raw(self, nPoints):
+        write_velocity_to_raw(self.rawPath, 0, self.u[0], self.u[1],
+                              self.u[2], 0)
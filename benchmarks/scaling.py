@@ -0,0 +1,505 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""A harness measuring how the scripts scale with the amount of MPI
+processes.
+
+The scripts runLundRescaling, runInterpolation, convertFoamFileToHDF5
+and precursorStats are run under MPI on synthetic precursor databases,
+see :mod:`synthetic`, for each amount of processes in a sweep.
+
+    strong scaling :
+        The amount of time-steps is fixed. The efficiency is
+        T_0*N_0/(T_N*N), where T_N is the wall time with N processes and
+        N_0 is the smallest amount of processes in the sweep.
+    weak scaling :
+        The amount of time-steps per process is fixed. The efficiency is
+        T_0/T_N.
+
+For each run, the time spent in each stage by each process is taken
+from the output of the scripts' ``--timingfile`` flag. The imbalance is
+the largest busy time of a process divided by the mean over the
+processes, the busy time excluding waiting at barriers. The I/O fraction
+is the part of the busy time spent reading and writing. The crossover is
+the smallest amount of processes for which the I/O fraction is at least
+one half, i.e. the run is I/O-bound.
+
+The results are saved to a CSV file, and plotted if matplotlib is
+available. Run ``python -m benchmarks.scaling -h`` for the options.
+
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import sys
+import csv
+import json
+import time
+import shlex
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from .synthetic import create_foamfile_precursor, create_hdf5_precursor
+from .synthetic import create_inflow_geometry, channel_mean_velocity, nu
+
+__all__ = ["tools", "prepare_precursor", "write_config", "tool_command",
+           "run_tool", "scaling_metrics", "crossover", "write_csv",
+           "plot_scaling"]
+
+# The modules of the scripts, by the names used in the harness
+tools = {"lund": "eddylicious.bin.runLundRescaling",
+         "interpolation": "eddylicious.bin.runInterpolation",
+         "convert": "eddylicious.bin.convertFoamFileToHDF5",
+         "stats": "eddylicious.bin.precursorStats"}
+
+# The stages counted as I/O, all the other stages except waiting at
+# barriers are counted as computation
+ioStages = ["read", "write"]
+
+csvColumns = ["tool", "mode", "nProcs", "nTimes", "status", "wallTime",
+              "speedup", "efficiency", "imbalance", "ioFraction"]
+
+
+def prepare_precursor(directory, nPointsY, nPointsZ, nTimes):
+    """Create the synthetic precursor databases used by the scripts.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to create the databases in.
+    nPointsY : int
+        The amount of points in the wall-normal direction.
+    nPointsZ : int
+        The amount of points in the spanwise direction.
+    nTimes : int
+        The amount of time-steps.
+
+    Returns
+    -------
+    dict
+        The paths to the foamFile case ("case"), its mean velocity
+        profile ("uMean"), the HDF5 database ("hdf5") and the face
+        centres of the inflow boundary ("inflow").
+
+    """
+    paths = {"case": os.path.join(directory, "case"),
+             "hdf5": os.path.join(directory, "precursor.hdf5"),
+             "inflow": os.path.join(directory, "inflow", "faceCentres")}
+
+    times = create_foamfile_precursor(paths["case"], nPointsY, nPointsZ,
+                                      nTimes)
+    paths["uMean"] = os.path.join(paths["case"], "postProcessing",
+                                  "collapsedFields", times[-1], "UMean_X.xy")
+
+    create_hdf5_precursor(paths["hdf5"], nPointsY, nPointsZ, nTimes)
+
+    # The inflow grid has 50% more points in each direction
+    create_inflow_geometry(paths["inflow"], 3*nPointsY//2, 3*nPointsZ//2)
+
+    return paths
+
+
+def write_config(configPath, tool, paths, writePath, nTimes):
+    """Write the configuration file of runLundRescaling or
+    runInterpolation, generating nTimes time-steps in the raw format
+    from the HDF5 database.
+
+    """
+    config = [("reader", "hdf5"),
+              ("readPath", paths["hdf5"]),
+              ("inflowGeometryReader", "foamFile"),
+              ("inflowGeometryPath", paths["inflow"]),
+              ("writer", "raw"),
+              ("writePath", writePath),
+              ("rawStoreName", "inflow.raw"),
+              ("dt", 1),
+              ("t0", 0),
+              ("tEnd", nTimes - 1),
+              ("tPrecision", 0)]
+
+    # The inflow boundary layer is the bottom half of the channel
+    if tool == "lund":
+        config += [("half", "bottom"),
+                   ("nuInflow", nu),
+                   ("nuPrecursor", nu),
+                   ("Ue", channel_mean_velocity(1.)),
+                   ("delta99", 1),
+                   ("uTauInflow", nu),
+                   ("xOrigin", 0),
+                   ("yOrigin", 0)]
+    else:
+        config += [("minYPrec", 0), ("maxYPrec", 2),
+                   ("minZPrec", 0), ("maxZPrec", 3),
+                   ("minYInfl", 0), ("maxYInfl", 2),
+                   ("minZInfl", 0), ("maxZInfl", 3)]
+
+    with open(configPath, 'w') as configFile:
+        for key, value in config:
+            configFile.write(key + " " + str(value) + "\n")
+
+
+def tool_command(tool, paths, runDir, nTimes):
+    """Create the arguments of a script, preparing its configuration
+    and output directory in runDir.
+
+    Returns
+    -------
+    List of str
+        The arguments, except the timing file.
+
+    """
+    if tool in ["lund", "interpolation"]:
+        configPath = os.path.join(runDir, tool + ".cfg")
+        write_config(configPath, tool, paths, runDir, nTimes)
+        arguments = ["--config", configPath]
+    elif tool == "convert":
+        arguments = ["--precursor", paths["case"], "--surface", "inlet",
+                     "--umean", paths["uMean"],
+                     "--filename", os.path.join(runDir, "converted.hdf5")]
+    elif tool == "stats":
+        arguments = ["--database", paths["hdf5"], "--writepath", runDir]
+    else:
+        raise ValueError("Unknown tool: " + str(tool))
+
+    return [sys.executable, "-m", tools[tool]] + arguments + \
+        ["--backend", "mpi"]
+
+
+def run_tool(tool, nProcs, paths, runDir, nTimes,
+             launcher="mpiexec -n {n}", timeout=None):
+    """Run a script with nProcs MPI processes.
+
+    Parameters
+    ----------
+    tool : str
+        The script, one of the keys of :data:`tools`.
+    nProcs : int
+        The amount of MPI processes.
+    paths : dict
+        The paths to the precursor databases, see
+        :func:`prepare_precursor`.
+    runDir : str
+        An empty directory for the output of the script.
+    nTimes : int
+        The amount of time-steps to process.
+    launcher : str, optional
+        The command starting MPI programs, {n} is replaced by the amount
+        of processes.
+    timeout : float, optional
+        The time in seconds after which the run is killed. By default
+        there is no limit.
+
+    Returns
+    -------
+    dict
+        The wall time ("wallTime"), the timing summary written by the
+        script ("timing") and the outcome of the run ("status"), either
+        "ok", "failed" or "timeout".
+
+    """
+    timingPath = os.path.join(runDir, "timing.json")
+    command = shlex.split(launcher.format(n=nProcs)) + \
+        tool_command(tool, paths, runDir, nTimes) + \
+        ["--timingfile", timingPath]
+
+    logPath = os.path.join(runDir, "log")
+    start = time.perf_counter()
+    with open(logPath, 'w') as logFile:
+        try:
+            returnCode = subprocess.call(command, stdout=logFile,
+                                         stderr=subprocess.STDOUT,
+                                         timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print("    Timed out, see " + logPath)
+            return {"wallTime": float('nan'), "timing": None,
+                    "status": "timeout"}
+    wallTime = time.perf_counter() - start
+
+    if returnCode != 0 or not os.path.isfile(timingPath):
+        print("    Failed, see " + logPath)
+        return {"wallTime": wallTime, "timing": None, "status": "failed"}
+
+    with open(timingPath) as timingFile:
+        timing = json.load(timingFile)
+
+    return {"wallTime": wallTime, "timing": timing, "status": "ok"}
+
+
+def scaling_metrics(runs, mode):
+    """Compute the speedup, efficiency, imbalance and I/O fraction of
+    the runs of a script.
+
+    Parameters
+    ----------
+    runs : list of dict
+        The runs, ordered by the amount of processes, each with the keys
+        "nProcs" and those returned by :func:`run_tool`. Updated in
+        place with the keys "speedup", "efficiency", "imbalance" and
+        "ioFraction".
+    mode : str
+        Either "strong" or "weak".
+
+    """
+    reference = None
+    for run in runs:
+        if run["status"] == "ok":
+            reference = run
+            break
+
+    for run in runs:
+        for key in ["speedup", "efficiency", "imbalance", "ioFraction"]:
+            run[key] = float('nan')
+
+        if run["status"] != "ok":
+            continue
+
+        ratio = reference["wallTime"]/run["wallTime"]
+        if mode == "strong":
+            run["speedup"] = ratio
+            run["efficiency"] = ratio*reference["nProcs"]/run["nProcs"]
+        else:
+            run["speedup"] = ratio*run["nProcs"]/reference["nProcs"]
+            run["efficiency"] = ratio
+
+        busy = []
+        io = []
+        for stages in run["timing"]["ranks"]:
+            busy.append(sum(stages[stage]["total"] for stage in stages
+                            if stage != "barrier"))
+            io.append(sum(stages[stage]["total"] for stage in stages
+                          if stage in ioStages))
+
+        # Processes that got no work are missing from the summary
+        busy += [0.0]*(run["nProcs"] - len(busy))
+
+        if np.sum(busy) > 0:
+            run["imbalance"] = np.max(busy)/np.mean(busy)
+            run["ioFraction"] = np.sum(io)/np.sum(busy)
+
+
+def crossover(runs):
+    """Find the smallest amount of processes for which a script is
+    I/O-bound.
+
+    Parameters
+    ----------
+    runs : list of dict
+        The runs, ordered by the amount of processes, as updated by
+        :func:`scaling_metrics`.
+
+    Returns
+    -------
+    int
+        The amount of processes, None if no run is I/O-bound.
+
+    """
+    for run in runs:
+        if run["ioFraction"] >= 0.5:
+            return run["nProcs"]
+    return None
+
+
+def write_csv(results, filePath):
+    """Write the runs of all the scripts and modes to a CSV file, with
+    the columns in :data:`csvColumns`.
+
+    """
+    with open(filePath, 'w') as csvFile:
+        writer = csv.writer(csvFile)
+        writer.writerow(csvColumns)
+        for run in results:
+            writer.writerow([run[column] for column in csvColumns])
+
+
+def plot_scaling(results, outputPrefix):
+    """Plot the efficiency and the I/O fraction against the amount of
+    processes, a figure per mode saved to outputPrefix_mode.png.
+
+    Requires matplotlib, nothing is plotted if it is missing.
+
+    """
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not available, the results are not plotted.")
+        return
+
+    for mode in ["strong", "weak"]:
+        modeRuns = [run for run in results if run["mode"] == mode]
+        if not modeRuns:
+            continue
+
+        [fig, axes] = plt.subplots(1, 2, figsize=(10, 4))
+        for tool in tools:
+            runs = [run for run in modeRuns if run["tool"] == tool]
+            if not runs:
+                continue
+            nProcs = [run["nProcs"] for run in runs]
+            axes[0].plot(nProcs, [run["efficiency"] for run in runs], 'o-',
+                         label=tool)
+            axes[1].plot(nProcs, [run["ioFraction"] for run in runs], 'o-',
+                         label=tool)
+
+        axes[0].set_ylabel("Efficiency")
+        axes[1].set_ylabel("I/O fraction")
+        axes[1].axhline(0.5, color='k', linestyle='--')
+        for ax in axes:
+            ax.set_xscale("log", base=2)
+            ax.set_xlabel("Processes")
+            ax.set_ylim(bottom=0)
+            ax.legend()
+        fig.suptitle(mode.capitalize() + " scaling")
+        fig.tight_layout()
+        fig.savefig(outputPrefix + "_" + mode + ".png")
+        plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+                description="Measure the strong and weak scaling of the \
+                             scripts with the amount of MPI processes, \
+                             using synthetic precursor databases.")
+
+    parser.add_argument('--procs',
+                        type=int,
+                        nargs='+',
+                        default=[1, 2, 4, 8],
+                        help='The amounts of MPI processes.')
+    parser.add_argument('--modes',
+                        nargs='+',
+                        choices=['strong', 'weak'],
+                        default=['strong', 'weak'],
+                        help='The kinds of scaling to measure.')
+    parser.add_argument('--tools',
+                        nargs='+',
+                        choices=sorted(tools),
+                        default=sorted(tools),
+                        help='The scripts to run.')
+    parser.add_argument('--ny',
+                        type=int,
+                        default=64,
+                        help='The amount of points in the wall-normal \
+                              direction of the precursor.')
+    parser.add_argument('--nz',
+                        type=int,
+                        default=64,
+                        help='The amount of points in the spanwise \
+                              direction of the precursor.')
+    parser.add_argument('--ntimes',
+                        type=int,
+                        default=64,
+                        help='The amount of time-steps, per process for \
+                              weak scaling.')
+    parser.add_argument('--storage',
+                        choices=['local', 'tmpfs'],
+                        default='local',
+                        help='Where to keep the data, in --dir or in \
+                              /dev/shm.')
+    parser.add_argument('--dir',
+                        type=str,
+                        default='.',
+                        help='The directory to keep the data in, for \
+                              local storage.')
+    parser.add_argument('--launcher',
+                        type=str,
+                        default='mpiexec -n {n}',
+                        help='The command starting MPI programs, {n} is \
+                              replaced by the amount of processes.')
+    parser.add_argument('--timeout',
+                        type=float,
+                        default=3600,
+                        help='The time in seconds after which a run is \
+                              killed (default 3600).')
+    parser.add_argument('--output',
+                        type=str,
+                        default='scaling',
+                        help='The results are saved to OUTPUT.csv and \
+                              OUTPUT_mode.png.')
+    parser.add_argument('--keep',
+                        action='store_true',
+                        help='Keep the data and the output of the \
+                              scripts.')
+
+    args = parser.parse_args()
+
+    procs = sorted(args.procs)
+    baseDir = tempfile.mkdtemp(prefix="eddylicious_scaling_",
+                               dir="/dev/shm" if args.storage == "tmpfs"
+                               else args.dir)
+    print("Keeping the data in " + baseDir)
+
+    # The precursor databases, by the amount of time-steps
+    precursors = {}
+    results = []
+
+    try:
+        for mode in args.modes:
+            for tool in args.tools:
+                runs = []
+                for nProcs in procs:
+                    nTimes = args.ntimes
+                    if mode == "weak":
+                        nTimes *= nProcs
+
+                    if nTimes not in precursors:
+                        print("Creating a precursor database with " +
+                              str(nTimes) + " time-steps")
+                        precursors[nTimes] = prepare_precursor(
+                            os.path.join(baseDir,
+                                         "precursor" + str(nTimes)),
+                            args.ny, args.nz, nTimes)
+
+                    print("Running " + tool + ", " + mode + " scaling, " +
+                          str(nProcs) + " process(es)")
+                    runDir = os.path.join(baseDir, mode, tool, str(nProcs))
+                    os.makedirs(runDir)
+
+                    run = run_tool(tool, nProcs, precursors[nTimes], runDir,
+                                   nTimes, args.launcher, args.timeout)
+                    run.update({"tool": tool, "mode": mode,
+                                "nProcs": nProcs, "nTimes": nTimes})
+                    runs.append(run)
+
+                    if not args.keep:
+                        shutil.rmtree(runDir)
+
+                scaling_metrics(runs, mode)
+                results += runs
+    finally:
+        if not args.keep:
+            shutil.rmtree(baseDir)
+
+    write_csv(results, args.output + ".csv")
+    plot_scaling(results, args.output)
+
+    print("\n{0:<14}{1:<8}{2:>6}{3:>10}{4:>12}{5:>11}{6:>8}".format(
+        "tool", "mode", "procs", "wall [s]", "efficiency", "imbalance",
+        "I/O"))
+    for run in results:
+        print("{0:<14}{1:<8}{2:>6d}{3:>10.3g}{4:>12.2f}{5:>11.2f}"
+              "{6:>8.2f}".format(run["tool"], run["mode"], run["nProcs"],
+                                 run["wallTime"], run["efficiency"],
+                                 run["imbalance"], run["ioFraction"]))
+
+    for mode in args.modes:
+        for tool in args.tools:
+            nProcs = crossover([run for run in results
+                                if run["tool"] == tool and
+                                run["mode"] == mode])
+            if nProcs is None:
+                print(tool + ", " + mode + ": not I/O-bound up to " +
+                      str(procs[-1]) + " process(es)")
+            else:
+                print(tool + ", " + mode + ": I/O-bound from " +
+                      str(nProcs) + " process(es)")
+
+    print("\nSaved the results to " + args.output + ".csv")
+
+if __name__ == "__main__":
+    main()
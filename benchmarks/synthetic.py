@@ -0,0 +1,335 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for creating synthetic precursor databases of a given size,
+used by the benchmarks.
+
+The databases mimic a channel flow at Re_tau = 180 with the channel
+half-height equal to 1, like the channel_flow_180 dataset of the tests.
+The mean velocity follows Reichardt's law of the wall and the
+fluctuations are random. The foamFile database is stored in the layout
+produced by OpenFOAM's sampling, the HDF5 database in the layout
+produced by convertFoamFileToHDF5.
+
+Can also be run as a script, see ``python -m benchmarks.synthetic -h``.
+
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import argparse
+import numpy as np
+import h5py
+
+__all__ = ["channel_grid", "channel_mean_velocity", "channel_velocity",
+           "create_foamfile_precursor", "create_hdf5_precursor",
+           "create_inflow_geometry"]
+
+reTau = 180.
+nu = 1./reTau
+
+
+def channel_grid(nPointsY, nPointsZ, lengthZ=3.):
+    """Create the cell centres of a channel cross-section, with a grid
+    refined towards the walls.
+
+    Parameters
+    ----------
+    nPointsY : int
+        The amount of points in the wall-normal direction.
+    nPointsZ : int
+        The amount of points in the spanwise direction.
+    lengthZ : float, optional
+        The width of the channel (default 3).
+
+    Returns
+    -------
+    List of ndarrays
+        Two 2d arrays with the y and z coordinates of the points, the
+        axes correspond to the wall-normal and spanwise directions.
+
+    """
+    faces = 1 - np.cos(np.linspace(0, np.pi, nPointsY + 1))
+    y = 0.5*(faces[1:] + faces[:-1])
+    z = (np.arange(nPointsZ) + 0.5)*lengthZ/nPointsZ
+
+    return np.meshgrid(y, z, indexing='ij')
+
+
+def channel_mean_velocity(y):
+    """Compute the mean streamwise velocity, using Reichardt's law of
+    the wall on both halves of the channel.
+
+    Parameters
+    ----------
+    y : ndarray
+        The wall-normal coordinates.
+
+    Returns
+    -------
+    ndarray
+        The mean streamwise velocity, scaled with the friction velocity
+        which is equal to 1/Re_tau.
+
+    """
+    yPlus = np.minimum(y, 2 - y)/nu
+    kappa = 0.41
+    uPlus = np.log(1 + kappa*yPlus)/kappa + \
+        7.8*(1 - np.exp(-yPlus/11) - yPlus/11*np.exp(-yPlus/3))
+
+    return uPlus*nu
+
+
+def channel_velocity(pointsY, randomState):
+    """Create a random velocity field with the mean velocity of a
+    channel flow.
+
+    Parameters
+    ----------
+    pointsY : ndarray
+        The wall-normal coordinates of the points.
+    randomState : numpy.random.RandomState
+        The source of the random fluctuations.
+
+    Returns
+    -------
+    List of ndarrays
+        Three arrays, of the same shape as pointsY, corresponding to the
+        three components of velocity.
+
+    """
+    amplitude = 2*nu*np.ones(pointsY.shape)
+    uX = channel_mean_velocity(pointsY) + \
+        amplitude*randomState.standard_normal(pointsY.shape)
+    uY = 0.5*amplitude*randomState.standard_normal(pointsY.shape)
+    uZ = 0.5*amplitude*randomState.standard_normal(pointsY.shape)
+
+    return [uX, uY, uZ]
+
+
+def create_foamfile_precursor(casePath, nPointsY, nPointsZ, nTimes,
+                              surfaceName="inlet", dt=0.01, seed=0,
+                              binary=False):
+    """Create a precursor case with the velocity sampled in the foamFile
+    format.
+
+    The velocity fields are written to
+    postProcessing/sampledSurface/time/surfaceName, along with the face
+    centres, and the mean velocity profile to
+    postProcessing/collapsedFields/time/UMean_X.xy. The points are
+    shuffled, as in the output of OpenFOAM.
+
+    Parameters
+    ----------
+    casePath : str
+        The path to the case, created if needed.
+    nPointsY : int
+        The amount of points in the wall-normal direction.
+    nPointsZ : int
+        The amount of points in the spanwise direction.
+    nTimes : int
+        The amount of time-steps.
+    surfaceName : str, optional
+        The name of the sampled surface (default "inlet").
+    dt : float, optional
+        The time-step (default 0.01).
+    seed : int, optional
+        The seed of the random fluctuations (default 0).
+    binary : bool, optional
+        Whether to write the face centres and the velocity in the binary
+        format instead of ascii (default False).
+
+    Returns
+    -------
+    List of str
+        The sampled times.
+
+    """
+    randomState = np.random.RandomState(seed)
+    [pointsY, pointsZ] = channel_grid(nPointsY, nPointsZ)
+    order = randomState.permutation(pointsY.size)
+    points = np.column_stack((np.zeros(pointsY.size),
+                              pointsY.ravel()[order],
+                              pointsZ.ravel()[order]))
+
+    dataDir = os.path.join(casePath, "postProcessing", "sampledSurface")
+    times = [str(round(1000 + dt*(i + 1), 10)) for i in range(nTimes)]
+
+    for time in times:
+        surfaceDir = os.path.join(dataDir, time, surfaceName)
+        if not os.path.exists(os.path.join(surfaceDir, "vectorField")):
+            os.makedirs(os.path.join(surfaceDir, "vectorField"))
+
+        _write_foamfile_vectors(os.path.join(surfaceDir, "faceCentres"),
+                                points, binary)
+
+        u = channel_velocity(pointsY, randomState)
+        _write_foamfile_vectors(os.path.join(surfaceDir, "vectorField", "U"),
+                                np.column_stack([c.ravel()[order] for c in u]),
+                                binary)
+
+    # The mean velocity, including the walls
+    meanDir = os.path.join(casePath, "postProcessing", "collapsedFields",
+                           times[-1])
+    if not os.path.exists(meanDir):
+        os.makedirs(meanDir)
+
+    y = np.concatenate(([0], pointsY[:, 0], [2]))
+    np.savetxt(os.path.join(meanDir, "UMean_X.xy"),
+               np.column_stack((y, channel_mean_velocity(y))))
+
+    return times
+
+
+def create_hdf5_precursor(filePath, nPointsY, nPointsZ, nTimes, dt=0.01,
+                          seed=0):
+    """Create a precursor database in the HDF5 format.
+
+    The layout is the one produced by convertFoamFileToHDF5, with the
+    mean velocity and the points including the walls.
+
+    Parameters
+    ----------
+    filePath : str
+        The path to the HDF5 file, overwritten if it exists.
+    nPointsY : int
+        The amount of points in the wall-normal direction.
+    nPointsZ : int
+        The amount of points in the spanwise direction.
+    nTimes : int
+        The amount of time-steps.
+    dt : float, optional
+        The time-step (default 0.01).
+    seed : int, optional
+        The seed of the random fluctuations (default 0).
+
+    """
+    randomState = np.random.RandomState(seed)
+    [pointsY, pointsZ] = channel_grid(nPointsY, nPointsZ)
+
+    # Add the walls
+    pointsY = np.concatenate((np.zeros((1, nPointsZ)), pointsY,
+                              2*np.ones((1, nPointsZ))))
+    pointsZ = np.concatenate((pointsZ[:1], pointsZ, pointsZ[:1]))
+
+    uMeanX = channel_mean_velocity(pointsY[:, 0])
+
+    with h5py.File(filePath, 'w') as dbFile:
+        pointsGroup = dbFile.create_group("points")
+        velocityGroup = dbFile.create_group("velocity")
+
+        pointsGroup.create_dataset("pointsY", data=pointsY)
+        pointsGroup.create_dataset("pointsZ", data=pointsZ)
+
+        velocityGroup.create_dataset("uMeanX", data=uMeanX)
+        velocityGroup.create_dataset("uMeanY", data=np.zeros(uMeanX.shape))
+        velocityGroup.create_dataset("times",
+                                     data=1000 + dt*(np.arange(nTimes) + 1))
+
+        datasets = [velocityGroup.create_dataset(name,
+                                                 (nTimes,) + pointsY.shape,
+                                                 dtype=np.float64)
+                    for name in ["uX", "uY", "uZ"]]
+
+        for i in range(nTimes):
+            u = channel_velocity(pointsY, randomState)
+            for dataset, component in zip(datasets, u):
+                dataset[i] = component
+
+        dbFile.attrs["nPointsY"] = pointsY.shape[0]
+        dbFile.attrs["nPointsZ"] = pointsY.shape[1]
+        dbFile.attrs["nPoints"] = pointsY.size
+
+
+def create_inflow_geometry(filePath, nPointsY, nPointsZ):
+    """Create the face centres of the inflow boundary in the foamFile
+    format, a channel with a grid different from the precursor.
+
+    Parameters
+    ----------
+    filePath : str
+        The path to the file.
+    nPointsY : int
+        The amount of points in the wall-normal direction.
+    nPointsZ : int
+        The amount of points in the spanwise direction.
+
+    """
+    [pointsY, pointsZ] = channel_grid(nPointsY, nPointsZ)
+    points = np.column_stack((np.zeros(pointsY.size), pointsY.ravel(),
+                              pointsZ.ravel()))
+
+    directory = os.path.dirname(filePath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    _write_foamfile_vectors(filePath, points)
+
+
+def _write_foamfile_vectors(filePath, vectors, binary=False):
+    """Write vectors as a list in the foamFile format, ascii or binary."""
+    if not binary:
+        np.savetxt(filePath, vectors, fmt='(%.10g %.10g %.10g)',
+                   header="\n"+str(vectors.shape[0])+"\n(", footer=")",
+                   comments="")
+        return
+
+    # The binary format is declared in the header, the values follow the
+    # opening parenthesis as little-endian doubles
+    header = "FoamFile\n{\n    version 2.0;\n    format binary;\n" + \
+        "    class vectorField;\n}\n\n"+str(vectors.shape[0])+"\n("
+    with open(filePath, 'wb') as foamFile:
+        foamFile.write(header.encode())
+        foamFile.write(np.ascontiguousarray(vectors, dtype='<f8').tobytes())
+        foamFile.write(b")\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+                description="Create a synthetic precursor database of a \
+                             channel flow.")
+
+    parser.add_argument('--format',
+                        type=str,
+                        choices=['foamFile', 'hdf5'],
+                        help='The format of the database.',
+                        required=True)
+    parser.add_argument('--path',
+                        type=str,
+                        help='The case directory for foamFile, the file \
+                              for hdf5.',
+                        required=True)
+    parser.add_argument('--ny',
+                        type=int,
+                        help='The amount of points in the wall-normal \
+                              direction.',
+                        required=True)
+    parser.add_argument('--nz',
+                        type=int,
+                        help='The amount of points in the spanwise \
+                              direction.',
+                        required=True)
+    parser.add_argument('--ntimes',
+                        type=int,
+                        help='The amount of time-steps.',
+                        required=True)
+    parser.add_argument('--surface',
+                        type=str,
+                        default='inlet',
+                        help='The name of the surface, for foamFile.')
+    parser.add_argument('--binary',
+                        action='store_true',
+                        help='Write the foamFile data in the binary format.')
+
+    args = parser.parse_args()
+
+    if args.format == "foamFile":
+        create_foamfile_precursor(args.path, args.ny, args.nz, args.ntimes,
+                                  args.surface, binary=args.binary)
+    else:
+        create_hdf5_precursor(args.path, args.ny, args.nz, args.ntimes)
+
+if __name__ == "__main__":
+    main()
@@ -8,45 +8,20 @@ from __future__ import division
 import os
 import numpy as np
 import h5py
-from mpi4py import MPI
 from eddylicious.readers.foamfile_readers import read_structured_points_foamfile
 from eddylicious.readers.foamfile_readers import read_structured_velocity_foamfile
-from eddylicious.generators.helper_functions import chunks_and_offsets
+from eddylicious.generators.executors import get_executor
+from eddylicious.generators.executors import open_hdf5
+from eddylicious.generators.scripts import add_diagnostics_arguments
+from eddylicious.generators.scripts import run_with_diagnostics
 import argparse
 
 
-def main():
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-    nProcs = comm.Get_size()
-
+def convert(args, executor, timers):
+    """Convert the foamFile database to an HDF5 file."""
 
-# Define the command-line arguments
-    parser = argparse.ArgumentParser(
-                description="A utility for converting a database stored \
-                            as a collection of foamFile-formatted files to \
-                            a single HDF5 file."
-                                    )
-
-    parser.add_argument('--precursor',
-                        type=str,
-                        help='The location of the precusor case.',
-                        required=True)
-    parser.add_argument('--surface',
-                        type=str,
-                        help='The name of the surface that contains the data.',
-                        required=True)
-    parser.add_argument('--filename',
-                        type=str,
-                        help='The name hdf5 file to create.',
-                        required=True)
-
-    parser.add_argument('--umean',
-                        type=str,
-                        help='The file containing the mean velocity profile.',
-                        required=True)
-
-    args = parser.parse_args()
+    comm = executor.comm
+    rank = comm.Get_rank()
 
     precursorCaseDir = args.precursor
     surfaceName = args.surface
@@ -87,7 +62,9 @@ def main():
             print("HDF5 file already exists. It it will be overwritten.")
             os.remove(fileName)
 
-    dbFile = h5py.File(fileName, 'a', driver='mpio', comm=MPI.COMM_WORLD)
+    with timers("barrier"):
+        comm.Barrier()
+    dbFile = open_hdf5(fileName, 'a', executor)
 
     pointsGroup = dbFile.create_group("points")
     velocityGroup = dbFile.create_group("velocity")
@@ -118,8 +95,6 @@ def main():
     dbFile.attrs["nPointsZ"] = pointsY.shape[1]
     dbFile.attrs["nPoints"] = pointsY.size
 
-    [chunks, offsets] = chunks_and_offsets(nProcs, len(times))
-
     readFunc = read_structured_velocity_foamfile(dataDir, surfaceName,
                                                  nPointsZ, yInd, zInd,
                                                  addValBot=(uMeanX[0], uMeanY[0], 0),
@@ -127,25 +102,71 @@ def main():
                                                       0))
 
 # Read in the fluctuations
-    for i in range(chunks[rank]):
-        if rank == 0 and (np.mod(i, int(chunks[rank]/20)) == 0):
-            print("Converted about " + str(i/chunks[rank]*100)+"%")
-
-        position = offsets[rank] + i
-        # Read in U
-        [uXVal, uYVal, uZVal] = readFunc(times[position])
-
-        uX[position, :, :] = uXVal
-        uY[position, :, :] = uYVal
-        uZ[position, :, :] = uZVal
+    def compute(position):
+        with timers("read"):
+            u = readFunc(times[position])
+        timers.add_bytes("read", *u)
+        return u
+
+    def consume(position, u):
+        with timers("write"):
+            uX[position, :, :] = u[0]
+            uY[position, :, :] = u[1]
+            uZ[position, :, :] = u[2]
+        timers.add_bytes("write", *u)
+
+    executor(np.arange(len(times)), compute, consume, label="Converted",
+             timers=timers)
 
     if rank == 0:
         print("Process 0 done, waiting for the others...")
 
-    comm.Barrier()
+    with timers("barrier"):
+        comm.Barrier()
     dbFile.close()
     if rank == 0:
         print("Done")
 
+
+def main():
+
+# Define the command-line arguments
+    parser = argparse.ArgumentParser(
+                description="A utility for converting a database stored \
+                            as a collection of foamFile-formatted files to \
+                            a single HDF5 file."
+                                    )
+
+    parser.add_argument('--precursor',
+                        type=str,
+                        help='The location of the precusor case.',
+                        required=True)
+    parser.add_argument('--surface',
+                        type=str,
+                        help='The name of the surface that contains the data.',
+                        required=True)
+    parser.add_argument('--filename',
+                        type=str,
+                        help='The name hdf5 file to create.',
+                        required=True)
+
+    parser.add_argument('--umean',
+                        type=str,
+                        help='The file containing the mean velocity profile.',
+                        required=True)
+    parser.add_argument('--backend',
+                        type=str,
+                        choices=['auto', 'mpi', 'pool', 'serial'],
+                        default='auto',
+                        help='How to distribute the work among processes.')
+    add_diagnostics_arguments(parser, "reading and writing")
+
+    args = parser.parse_args()
+
+    executor = get_executor(args.backend)
+    run_with_diagnostics(
+        lambda timers: convert(args, executor, timers), args,
+        executor.comm)
+
 if __name__ == "__main__":
     main()
@@ -6,162 +6,158 @@
 from __future__ import print_function
 from __future__ import division
 import numpy as np
-import os as os
 import h5py
 import argparse
-from mpi4py import MPI
-from eddylicious.generators.helper_functions import chunks_and_offsets
+from eddylicious.generators.executors import get_executor
+from eddylicious.generators.scripts import add_diagnostics_arguments
+from eddylicious.generators.scripts import run_with_diagnostics
+from eddylicious.generators.statistics import open_text_database
+from eddylicious.generators.statistics import accumulate_statistics
+from eddylicious.generators.statistics import write_statistics
+from eddylicious.readers.foamfile_readers import structured_order
+from eddylicious.writers.hdf5_writers import get_written_positions_hdf5
 
 
-def main():
-    comm = MPI.COMM_WORLD
+def compute_statistics(args, executor, timers):
+    """Compute and write the statistics of the inflow database."""
+
+    comm = executor.comm
     rank = comm.Get_rank()
-    nProcs = comm.Get_size()
 
+    readPath = args.database
+    writeDir = args.writepath
+
+# Open the hdf5 database
+
+    if rank == 0:
+        print("Opening the database")
+
+    if args.reader == "hdf5":
+        dbFile = h5py.File(readPath, 'r')
+        times = dbFile['time'][()]
+        points = dbFile['points'][()]
+        points = points[:, 1:]
+
+        size = len(times)
+        positions = get_written_positions_hdf5(dbFile)
+
+        dbFile.close()
+    else:
+        [times, points, readFunction] = open_text_database(
+            args.reader, readPath, args.surface)
+        size = len(times)
+        positions = np.arange(size)
+
+    def read_block(block):
+        """Read consecutive time-steps, in the order of the points."""
+        if args.reader == "hdf5":
+            with h5py.File(readPath, 'r') as dbFile:
+                return dbFile['velocity'][block]
+        else:
+            return np.stack([np.column_stack(readFunction(times[i]))
+                             for i in range(block.start, block.stop)])
+
+    # Sort the points along y and then z, so that they can be reshaped
+    # into 2d arrays
+    [pointsOrder, nPointsZ] = structured_order(points[:, 0], points[:, 1])
+    pointsY = np.reshape(points[pointsOrder, 0], (-1, nPointsZ))
+    pointsZ = np.reshape(points[pointsOrder, 1], (-1, nPointsZ))
+
+    def reorder(u):
+        """Reshape a block into 2d arrays, for the spectra."""
+        return np.reshape(u[:, pointsOrder],
+                          (u.shape[0],) + pointsY.shape + (3,))
+
+    [moments, spectraMoments] = accumulate_statistics(
+        read_block, positions, executor, blockSize=args.blocksize,
+        order=4 if args.highermoments else 2, spectra=args.spectra,
+        reorder=reorder, timers=timers,
+        cachePath=readPath if args.incremental else None, size=size)
+
+    if rank == 0:
+        print("Done")
+        print("Outputting data")
+        write_statistics(writeDir, pointsY, pointsZ, moments, spectraMoments,
+                         args.hdf5, pointsOrder=pointsOrder)
+
+
+def main():
 
 # Define the command-line arguments
     parser = argparse.ArgumentParser(
                 description="A utility for calculating statistics \
-                             of a inflow field database stored in the HDF5 \
-                             format. \
+                             of a inflow field database stored in the HDF5, \
+                             ofnative or foamFile format. \
                              Outputs files with the components of mean \
-                             velocity and the diagonal components of the \
-                             Reynolds stress tensor.")
+                             velocity and of the Reynolds stress tensor, \
+                             averaged along z.")
 
     parser.add_argument('--database', '-d',
                         type=str,
-                        help='The HDF5 file with the database.',
+                        help='The HDF5 file with the database. For the \
+                              ofnative reader, the directory containing \
+                              the points file and the time directories, \
+                              commonly constant/boundaryData/nameOfPatch. \
+                              For the foamFile reader, the case with the \
+                              sampled surfaces.',
                         required=True)
+    parser.add_argument('--reader',
+                        type=str,
+                        choices=['hdf5', 'ofnative', 'foamFile'],
+                        default='hdf5',
+                        help='The format of the database (default hdf5).')
+    parser.add_argument('--surface',
+                        type=str,
+                        help='The name of the sampled surface, required by \
+                              the foamFile reader.')
     parser.add_argument('--writepath', '-w',
                         type=str,
                         help='The location where to write the \
                               produced files.',
                         required=True)
+    parser.add_argument('--backend',
+                        type=str,
+                        choices=['auto', 'mpi', 'pool', 'serial'],
+                        default='auto',
+                        help='How to distribute the work among processes.')
+    parser.add_argument('--blocksize',
+                        type=int,
+                        default=16,
+                        help='The amount of consecutive time-steps read \
+                              at once (default 16).')
+    parser.add_argument('--highermoments',
+                        action='store_true',
+                        help='Also compute the third and fourth central \
+                              moments of each component.')
+    parser.add_argument('--hdf5',
+                        type=str,
+                        help='An HDF5 file to save the statistics at each \
+                              point to, before averaging along z.')
+    parser.add_argument('--spectra',
+                        action='store_true',
+                        help='Also compute the spanwise energy spectra and \
+                              two-point correlations of each component, \
+                              assuming equidistant points and periodicity \
+                              along z.')
+    parser.add_argument('--incremental',
+                        action='store_true',
+                        help='Save the partial statistics into the stats \
+                              group of the database, and on later runs \
+                              only process the time-steps added since. \
+                              Only supported by the hdf5 reader.')
+    add_diagnostics_arguments(parser, "reading and averaging")
 
     args = parser.parse_args()
 
-    readPath = args.database
-    writeDir = args.writepath
-
-# Open the hdf5 database
-
-    if rank == 0:
-        print("Opening the database")
-
-    dbFile = h5py.File(readPath, 'r', driver='mpio', comm=MPI.COMM_WORLD)
-    times = dbFile['time'][()]
-    points = dbFile['points'][()]
-    points = points[:, 1:]
-
-    size = len(times)
-
-    uMean = np.zeros((points.shape[0], 3))
-    uSquaredMean = np.zeros((points.shape[0], 3))
-
-    if rank == 0:
-        print("Calculating the statistics")
-
-    [chunks, offsets] = chunks_and_offsets(nProcs, size)
-
-    for i in range(chunks[rank]):
-        if rank == 0 and (np.mod(i, int(chunks[rank]/10)) == 0):
-
-            print("Computed about " + str(int(i/chunks[rank]*100)) + "%")
-
-        position = offsets[rank] + i
-
-        uMean += dbFile['velocity'][position, :, :]
-        uSquaredMean += dbFile['velocity'][position, :, :]**2
-
-    comm.Barrier()
-    dbFile.close()
-    if rank == 0:
-        print("Done")
-
-    uMean = comm.gather(uMean, root=0)
-    uSquaredMean = comm.gather(uSquaredMean, root=0)
-
-    if rank == 0:
-        for i in range(nProcs-1):
-            uMean[0] += uMean[i+1]
-            uSquaredMean[0] += uSquaredMean[i+1]
-
-        uMean = uMean[0]/size
-        uSquaredMean = uSquaredMean[0]/size
-
-        uPrime2Mean = uSquaredMean - uMean**2
-
-        print("Reshaping and averaging")
-        # Sort along y first
-        yInd = np.argsort(points[:, 0])
-        points[:, 0] = points[yInd, 0]
-        points[:, 1] = points[yInd, 1]
-        uMean[:, 0] = uMean[yInd, 0]
-        uMean[:, 1] = uMean[yInd, 1]
-        uMean[:, 2] = uMean[yInd, 2]
-        uPrime2Mean[:, 0] = uPrime2Mean[yInd, 0]
-        uPrime2Mean[:, 1] = uPrime2Mean[yInd, 1]
-        uPrime2Mean[:, 2] = uPrime2Mean[yInd, 2]
-
-        # Find the number of points along z
-        nPointsZ = 0
-        for i in range(points[:, 0].size):
-            if points[i, 0] == points[0, 0]:
-                nPointsZ += 1
-            else:
-                break
-
-        # Reshape into a 2d array
-        pointsY = np.copy(np.reshape(points[:, 0], (-1, nPointsZ)))
-        pointsZ = np.copy(np.reshape(points[:, 1], (-1, nPointsZ)))
-        uMeanX = np.copy(np.reshape(uMean[:, 0], (-1, nPointsZ)))
-        uMeanY = np.copy(np.reshape(uMean[:, 1], (-1, nPointsZ)))
-        uMeanZ = np.copy(np.reshape(uMean[:, 2], (-1, nPointsZ)))
-        uPrime2MeanXX = np.copy(np.reshape(uPrime2Mean[:, 0],
-                                           (-1, nPointsZ)))
-        uPrime2MeanYY = np.copy(np.reshape(uPrime2Mean[:, 1],
-                                           (-1, nPointsZ)))
-        uPrime2MeanZZ = np.copy(np.reshape(uPrime2Mean[:, 2],
-                                           (-1, nPointsZ)))
-
-        # For each y order the points in z
-
-        zInd = np.zeros(pointsZ.shape, dtype=np.int)
-
-        for i in range(pointsZ.shape[0]):
-            zInd[i, :] = np.argsort(pointsZ[i, :])
-            pointsZ[i, :] = pointsZ[i, zInd[i, :]]
-            uMeanX[i, :] = uMeanX[i, zInd[i, :]]
-            uMeanY[i, :] = uMeanY[i, zInd[i, :]]
-            uMeanZ[i, :] = uMeanZ[i, zInd[i, :]]
-            uPrime2MeanXX[i, :] = uPrime2MeanXX[i, zInd[i, :]]
-            uPrime2MeanYY[i, :] = uPrime2MeanYY[i, zInd[i, :]]
-            uPrime2MeanZZ[i, :] = uPrime2MeanZZ[i, zInd[i, :]]
-
-        y = pointsY[:, 0]
-
-        # Average along Z
-        uMeanX = np.mean(uMeanX, axis=1)
-        uMeanY = np.mean(uMeanY, axis=1)
-        uMeanZ = np.mean(uMeanZ, axis=1)
-
-        uPrime2MeanXX = np.mean(uPrime2MeanXX, axis=1)
-        uPrime2MeanYY = np.mean(uPrime2MeanYY, axis=1)
-        uPrime2MeanZZ = np.mean(uPrime2MeanZZ, axis=1)
-
-        print("Outputting data")
+    if args.reader == "foamFile" and args.surface is None:
+        parser.error("the foamFile reader requires --surface")
+    if args.incremental and args.reader != "hdf5":
+        parser.error("--incremental requires the hdf5 reader")
 
-        if not os.path.exists(writeDir):
-            os.makedirs(writeDir)
-
-        np.savetxt(os.path.join(writeDir, "y"), y)
-        np.savetxt(os.path.join(writeDir, "uMeanX"), uMeanX)
-        np.savetxt(os.path.join(writeDir, "uMeanY"), uMeanY)
-        np.savetxt(os.path.join(writeDir, "uMeanZ"), uMeanZ)
-        np.savetxt(os.path.join(writeDir, "uPrime2MeanXX"), uPrime2MeanXX)
-        np.savetxt(os.path.join(writeDir, "uPrime2MeanYY"), uPrime2MeanYY)
-        np.savetxt(os.path.join(writeDir, "uPrime2MeanZZ"), uPrime2MeanZZ)
-        np.savetxt(os.path.join(writeDir, "y"), y)
+    executor = get_executor(args.backend)
+    run_with_diagnostics(
+        lambda timers: compute_statistics(args, executor, timers), args,
+        executor.comm)
 
 if __name__ == "__main__":
     main()
@@ -6,107 +6,157 @@
 from __future__ import print_function
 from __future__ import division
 import numpy as np
-import os as os
 import h5py as h5py
 import argparse
-from mpi4py import MPI
-from eddylicious.generators.helper_functions import chunks_and_offsets
+from eddylicious.generators.executors import get_executor
+from eddylicious.generators.scripts import add_diagnostics_arguments
+from eddylicious.generators.scripts import run_with_diagnostics
+from eddylicious.generators.statistics import open_text_database
+from eddylicious.generators.statistics import accumulate_statistics
+from eddylicious.generators.statistics import write_statistics
+from eddylicious.readers.foamfile_readers import structured_order
 
 
-def main():
-    comm = MPI.COMM_WORLD
+def compute_statistics(args, executor, timers):
+    """Compute and write the statistics of the precursor database."""
+
+    comm = executor.comm
     rank = comm.Get_rank()
-    nProcs = comm.Get_size()
 
+    readPath = args.database
+    writeDir = args.writepath
+
+
+# Open the hdf5 database
+
+    if rank == 0:
+        print("Opening the database")
+    if args.reader == "hdf5":
+        dbFile = h5py.File(readPath, 'r')
+
+        pointsY = dbFile["points"]["pointsY"][:,:]
+        pointsZ = dbFile["points"]["pointsZ"][:,:]
+
+        size = dbFile["velocity"]["uX"].shape[0]
+        positions = np.arange(size)
+
+        dbFile.close()
+    else:
+        [times, points, readFunction] = open_text_database(
+            args.reader, readPath, args.surface)
+        size = len(times)
+        positions = np.arange(size)
+
+        # Sort the points along y and then z, so that they can be
+        # reshaped into 2d arrays
+        [pointsOrder, nPointsZ] = structured_order(points[:, 0],
+                                                   points[:, 1])
+        pointsY = np.reshape(points[pointsOrder, 0], (-1, nPointsZ))
+        pointsZ = np.reshape(points[pointsOrder, 1], (-1, nPointsZ))
+
+    def read_block(block):
+        """Read consecutive time-steps, reshaped into 2d arrays."""
+        if args.reader == "hdf5":
+            with h5py.File(readPath, 'r') as dbFile:
+                return np.stack((dbFile["velocity"]["uX"][block],
+                                 dbFile["velocity"]["uY"][block],
+                                 dbFile["velocity"]["uZ"][block]), axis=-1)
+        else:
+            u = np.stack([np.column_stack(readFunction(times[i]))
+                          for i in range(block.start, block.stop)])
+            return np.reshape(u[:, pointsOrder],
+                              (u.shape[0],) + pointsY.shape + (3,))
+
+    [moments, spectraMoments] = accumulate_statistics(
+        read_block, positions, executor, blockSize=args.blocksize,
+        order=4 if args.highermoments else 2, spectra=args.spectra,
+        timers=timers, cachePath=readPath if args.incremental else None,
+        size=size)
+
+    if rank == 0:
+        print("Done")
+        print("Outputting data")
+        write_statistics(writeDir, pointsY, pointsZ, moments, spectraMoments,
+                         args.hdf5)
+
+
+def main():
 # Define the command-line arguments
     parser = argparse.ArgumentParser(
                 description="A utility for calculating the statistics of a \
-                             precursor database stored in the HDF5 format. \
+                             precursor database stored in the HDF5 or \
+                             foamFile format, or of inflow fields in the \
+                             ofnative format. \
                              Outputs files with the components of mean \
-                             velocity and the diagonal components of the \
-                             Reynolds stress tensor.")
+                             velocity and of the Reynolds stress tensor, \
+                             averaged along z.")
 
     parser.add_argument('--database', '-d',
                         type=str,
-                        help='The HDF5 file with the database.',
+                        help='The HDF5 file with the database. For the \
+                              ofnative reader, the directory containing \
+                              the points file and the time directories, \
+                              commonly constant/boundaryData/nameOfPatch. \
+                              For the foamFile reader, the case with the \
+                              sampled surfaces.',
                         required=True)
+    parser.add_argument('--reader',
+                        type=str,
+                        choices=['hdf5', 'ofnative', 'foamFile'],
+                        default='hdf5',
+                        help='The format of the database (default hdf5).')
+    parser.add_argument('--surface',
+                        type=str,
+                        help='The name of the sampled surface, required by \
+                              the foamFile reader.')
     parser.add_argument('--writepath', '-w',
                         type=str,
                         help='The location where to write the \
                              produced files.',
                         required=True)
+    parser.add_argument('--backend',
+                        type=str,
+                        choices=['auto', 'mpi', 'pool', 'serial'],
+                        default='auto',
+                        help='How to distribute the work among processes.')
+    parser.add_argument('--blocksize',
+                        type=int,
+                        default=16,
+                        help='The amount of consecutive time-steps read \
+                              at once (default 16).')
+    parser.add_argument('--highermoments',
+                        action='store_true',
+                        help='Also compute the third and fourth central \
+                              moments of each component.')
+    parser.add_argument('--hdf5',
+                        type=str,
+                        help='An HDF5 file to save the statistics at each \
+                              point to, before averaging along z.')
+    parser.add_argument('--spectra',
+                        action='store_true',
+                        help='Also compute the spanwise energy spectra and \
+                              two-point correlations of each component, \
+                              assuming equidistant points and periodicity \
+                              along z.')
+    parser.add_argument('--incremental',
+                        action='store_true',
+                        help='Save the partial statistics into the stats \
+                              group of the database, and on later runs \
+                              only process the time-steps added since. \
+                              Only supported by the hdf5 reader.')
+    add_diagnostics_arguments(parser, "reading and averaging")
 
     args = parser.parse_args()
 
-    readPath = args.database
-    writeDir = args.writepath
-
-
-# Open the hdf5 database
-
-    if rank == 0:
-        print("Opening the database")
-    dbFile = h5py.File(readPath, 'r', driver='mpio', comm=MPI.COMM_WORLD)
-
-    pointsY = dbFile["points"]["pointsY"][:,:]
-
-    size = dbFile["velocity"]["uX"].shape[0]
-    nPointsY = pointsY.shape[0]
-    nPointsZ = pointsY.shape[1]
-
-    uMean = np.zeros((nPointsY, nPointsZ, 3))
-    uSquaredMean = np.zeros((nPointsY, nPointsZ, 3))
-
-    if rank == 0:
-        print("Calculating the statistics")
-
-    [chunks, offsets] = chunks_and_offsets(nProcs, size)
-
-    for i in range(chunks[rank]):
-        if rank == 0 and (np.mod(i, int(chunks[rank]/10)) == 0):
-            print("Computed about "+str(int(i/chunks[rank]*100))+"%")
-
-        position = offsets[rank] + i
-
-        uMean[:, :, 0] += dbFile["velocity"]["uX"][position, :, :]
-        uMean[:, :, 1] += dbFile["velocity"]["uY"][position, :, :]
-        uMean[:, :, 2] += dbFile["velocity"]["uZ"][position, :, :]
-        uSquaredMean[:, :, 0] += dbFile["velocity"]["uX"][position, :, :]**2
-        uSquaredMean[:, :, 1] += dbFile["velocity"]["uY"][position, :, :]**2
-        uSquaredMean[:, :, 2] += dbFile["velocity"]["uZ"][position, :, :]**2
-
-    comm.Barrier()
-    dbFile.close()
-    uMean = comm.gather(uMean, root=0)
-    uSquaredMean = comm.gather(uSquaredMean, root=0)
-
-    if rank == 0:
-        for i in range(nProcs-1):
-            uMean[0] += uMean[i+1]
-            uSquaredMean[0] += uSquaredMean[i+1]
-
-        uMean = uMean[0]/size
-        uSquaredMean = uSquaredMean[0]/size
-
-        uPrime2Mean = uSquaredMean - uMean**2
-
-# Average along Z
-        uMean = np.mean(uMean, axis=1)
-        uPrime2Mean = np.mean(uPrime2Mean, axis=1)
-
-        print("Outputting data")
+    if args.reader == "foamFile" and args.surface is None:
+        parser.error("the foamFile reader requires --surface")
+    if args.incremental and args.reader != "hdf5":
+        parser.error("--incremental requires the hdf5 reader")
 
-        if not os.path.exists(writeDir):
-            os.makedirs(writeDir)
-
-        np.savetxt(os.path.join(writeDir, "y"), pointsY[:, 0])
-        np.savetxt(os.path.join(writeDir, "uMeanX"), uMean[:, 0])
-        np.savetxt(os.path.join(writeDir, "uMeanY"), uMean[:, 1])
-        np.savetxt(os.path.join(writeDir, "uMeanZ"), uMean[:, 2])
-        np.savetxt(os.path.join(writeDir, "uPrime2MeanXX"), uPrime2Mean[:, 0])
-        np.savetxt(os.path.join(writeDir, "uPrime2MeanYY"), uPrime2Mean[:, 1])
-        np.savetxt(os.path.join(writeDir, "uPrime2MeanZZ"), uPrime2Mean[:, 2])
-        np.savetxt(os.path.join(writeDir, "y"), pointsY[:, 0])
+    executor = get_executor(args.backend)
+    run_with_diagnostics(
+        lambda timers: compute_statistics(args, executor, timers), args,
+        executor.comm)
 
 if __name__ == "__main__":
     main()
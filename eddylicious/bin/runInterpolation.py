@@ -6,55 +6,34 @@
 from __future__ import print_function
 from __future__ import division
 import os
+import time
 import numpy as np
 import argparse
-from mpi4py import MPI
 import h5py
-from scipy.spatial import Delaunay
 from eddylicious.generators.helper_functions import *
 from eddylicious.readers.foamfile_readers import read_points_foamfile
 from eddylicious.readers.foamfile_readers import read_velocity_foamfile
 from eddylicious.readers.hdf5_readers import read_structured_points_hdf5
 from eddylicious.readers.hdf5_readers import read_structured_velocity_hdf5
-from eddylicious.writers.ofnative_writers import write_points_to_ofnative
-from eddylicious.writers.hdf5_writers import write_points_to_hdf5
+from eddylicious.readers.raw_readers import read_points_raw
+from eddylicious.readers.raw_readers import read_times_raw
+from eddylicious.readers.raw_readers import read_velocity_raw
 from eddylicious.generators.interpolation import interpolation_generate
-
-
-def set_write_path(config):
-    """Set the writePath variable in concordance with the writer.
-
-    For the ofnative writer: the path to constant/boundaryData directory.
-    For the hdf5 writer: the hdf5 file itself.
-
-    """
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-    writer = config["writer"]
-    writePath = config["writePath"]
-
-    if writer == "ofnative":
-        inletPatchName = config["inletPatchName"]
-        writePath = os.path.join(writePath, "constant", "boundaryData",
-                                 inletPatchName)
-        if rank == 0:
-            if not os.path.exists(writePath):
-                os.makedirs(writePath)
-
-    elif writer == "hdf5":
-        writePath = os.path.join(writePath, config["hdf5FileName"])
-        # If the hdf5 file exists, delete it.
-        if rank == 0 and os.path.isfile(writePath):
-            print("HDF5 database already exists. It it will be overwritten.")
-            os.remove(writePath)
-
-        # We change the writePath to be the hdf5 file itself
-        writePath = h5py.File(writePath, 'a', driver='mpio',
-                              comm=MPI.COMM_WORLD)
-    else:
-        raise ValueError("Unknown writer: "+writer)
-
-    return writePath
+from eddylicious.generators.interpolation import nearest_neighbours
+from eddylicious.generators.interpolation import rectilinear_grid
+from eddylicious.generators.interpolation import geometry_hash
+from eddylicious.generators.interpolation import save_interpolation_cache
+from eddylicious.generators.interpolation import load_interpolation_cache
+from eddylicious.generators.recycling import defaultShift
+from eddylicious.generators.executors import broadcast_array
+from eddylicious.generators.executors import call_on_root
+from eddylicious.generators.scripts import add_generator_arguments
+from eddylicious.generators.scripts import get_generator_executor
+from eddylicious.generators.scripts import set_up_dry_run
+from eddylicious.generators.scripts import prepare_output
+from eddylicious.generators.scripts import finish_output
+from eddylicious.generators.scripts import report_dry_run
+from eddylicious.generators.scripts import run_with_diagnostics
 
 
 def get_times(reader, readPath):
@@ -67,15 +46,195 @@ def get_times(reader, readPath):
         times = np.sort(times)
     elif reader == "hdf5":
         # Set the readPath to the file itself
-        readPath = h5py.File(readPath, 'r', driver='mpio', comm=MPI.COMM_WORLD)
+        readPath = h5py.File(readPath, 'r')
         times = readPath["velocity"]["times"][:]
         readPath.close()
+    elif reader == "raw":
+        times = read_times_raw(readPath)
     else:
         raise ValueError("Unknown reader: "+reader)
 
     return times
 
 
+def bounding_hyperslab(inBox):
+    """Find the smallest part of a structured plane containing the
+    points inside the bounding box.
+
+    Returns the start and end indices along y and z.
+
+    """
+    rows = np.flatnonzero(inBox.any(axis=1))
+    columns = np.flatnonzero(inBox.any(axis=0))
+
+    if rows.size == 0:
+        return [0, 0, 0, 0]
+
+    return [rows[0], rows[-1] + 1, columns[0], columns[-1] + 1]
+
+
+def interpolation_operator(configDict, times):
+    """Read the source and target points, filter them with the bounding
+    boxes and compute the interpolation operator.
+
+    If both the source and target points form rectilinear grids, the
+    operator consists of the grids, see rectilinear_grid. Otherwise, it
+    is the index of the nearest source point of each target point, which
+    is loaded from the interpolationCache file, if it was saved for the
+    same geometry, and saved to it otherwise.
+
+    Returns a dictionary with the indices of the filtered source points,
+    idxPrec, the filtered source points scaled to the unit square,
+    pointsY and pointsZ, the filtered target points, pointsYInfl and
+    pointsZInfl, and either the grids, axisY, axisZ, order, axisYInfl,
+    axisZInfl and orderInfl, or the indices of the nearest neighbours,
+    indices. For the hdf5 reader, the part of the plane to read is
+    contained in hyperslab, see bounding_hyperslab.
+
+    """
+    reader = configDict["reader"]
+    readPath = configDict["readPath"]
+
+# Read grid for the recycling plane
+    if reader == "foamFile":
+        sampleSurfaceName = configDict["sampleSurfaceName"]
+        dataDir = os.path.join(readPath, "postProcessing", "sampledSurface")
+        pointsReadPath = os.path.join(dataDir, times[0], sampleSurfaceName,
+                                      "faceCentres")
+        [pointsY, pointsZ] = read_points_foamfile(pointsReadPath)
+    elif reader == "hdf5":
+        [pointsY, pointsZ] = read_structured_points_hdf5(readPath)
+    elif reader == "raw":
+        [pointsY, pointsZ] = read_points_raw(readPath)
+    else:
+        raise ValueError("Unsupported or unknown reader: "+reader)
+
+    # Bounds for the points
+    minYPrec = float(configDict["minYPrec"])
+    maxYPrec = float(configDict["maxYPrec"])
+    minZPrec = float(configDict["minZPrec"])
+    minZPrec = pointsZ.min()
+
+    if "maxZPrec" in configDict:
+        maxZPrec = float(configDict["maxZPrec"])
+    else:
+        maxZPrec = pointsZ.max()
+
+    print("\nTotal number of source points,", pointsY.size)
+    print("Filtering source points with bounding box, y:[", minYPrec,
+          maxYPrec, "] z:[", minZPrec, maxZPrec, "]")
+
+# Read grid for the inflow plane
+    [pointsYInfl, pointsZInfl] = \
+        read_points_foamfile(configDict["inflowGeometryPath"])
+
+    # Bound the points
+    minYInfl = float(configDict["minYInfl"])
+    maxYInfl = float(configDict["maxYInfl"])
+    minZInfl = float(configDict["minZInfl"])
+    maxZInfl = float(configDict["maxZInfl"])
+
+    inBox = ((pointsY >= minYPrec) & (pointsY <= maxYPrec) &
+             (pointsZ >= minZPrec) & (pointsZ <= maxZPrec))
+
+    # Only the part of a structured plane containing the bounding box is
+    # read, the indices of the source points are relative to that part
+    hyperslab = None
+    if inBox.ndim == 2:
+        hyperslab = bounding_hyperslab(inBox)
+        [startY, endY, startZ, endZ] = hyperslab
+        if inBox[startY:endY, startZ:endZ].size < inBox.size:
+            print("Reading the part of the database with indices y:[",
+                  startY, endY, ") z:[", startZ, endZ, ")")
+        inBox = inBox[startY:endY, startZ:endZ]
+        pointsYSlab = pointsY[startY:endY, startZ:endZ]
+        pointsZSlab = pointsZ[startY:endY, startZ:endZ]
+    else:
+        pointsYSlab = pointsY
+        pointsZSlab = pointsZ
+
+    idxPrec = np.flatnonzero(inBox)
+
+    # Normalize to unit square
+    pointsYPrec = (np.ravel(pointsYSlab)[idxPrec] - minYPrec) / \
+        (maxYPrec - minYPrec)
+    pointsZPrec = (np.ravel(pointsZSlab)[idxPrec] - minZPrec) / \
+        (maxZPrec - minZPrec)
+
+    print("Source points after filtering:", pointsYPrec.shape[0])
+
+    print("\nTotal number of target points,", pointsYInfl.shape[0])
+    print("Filtering target points with bounding box, y:[", minYInfl,
+          maxYInfl, "] z:[", minZInfl, maxZInfl, "]")
+
+    # Filter the points to those inside rectangle
+    idxInfl = np.where((pointsYInfl >= minYInfl) & (pointsYInfl <= maxYInfl) &
+                       (pointsZInfl >= minZInfl) & (pointsZInfl <= maxZInfl))
+
+    print("Target points after filtering:", idxInfl[0].size)
+
+    operator = {"idxPrec": idxPrec,
+                "pointsY": pointsYPrec, "pointsZ": pointsZPrec,
+                "pointsYInfl": pointsYInfl[idxInfl],
+                "pointsZInfl": pointsZInfl[idxInfl]}
+    if hyperslab is not None:
+        operator["hyperslab"] = np.array(hyperslab, dtype=np.int64)
+
+    # Transform inflow points to square
+    pointsInfl = np.column_stack(
+        ((operator["pointsYInfl"] - minYInfl)/(maxYInfl - minYInfl),
+         (operator["pointsZInfl"] - minZInfl)/(maxZInfl - minZInfl)))
+
+    # Structured grids are interpolated bilinearly
+    grid = None
+    gridInfl = None
+    if configDict.get("rectilinear", "true") == "true":
+        grid = rectilinear_grid(pointsYPrec, pointsZPrec)
+        gridInfl = rectilinear_grid(pointsInfl[:, 0], pointsInfl[:, 1])
+
+    if grid is not None and gridInfl is not None:
+        print("Source and target points form rectilinear grids, using "
+              "bilinear interpolation")
+        for name, array in zip(["axisY", "axisZ", "order"], grid):
+            operator[name] = array
+        for name, array in zip(["axisYInfl", "axisZInfl", "orderInfl"],
+                               gridInfl):
+            operator[name] = array
+        return operator
+
+    # The nearest source point of each target point, possibly saved by a
+    # previous run with the same geometry and bounds
+    cachePath = configDict.get("interpolationCache", None)
+    cache = None
+    if cachePath is not None:
+        cacheKey = geometry_hash(pointsY, pointsZ, pointsYInfl, pointsZInfl,
+                                 [minYPrec, maxYPrec, minZPrec, maxZPrec,
+                                  minYInfl, maxYInfl, minZInfl, maxZInfl])
+        cache = load_interpolation_cache(cachePath, cacheKey)
+
+    # The cached indices refer to the filtered source points, which have
+    # to be the same, e.g. if the filtering changed since the cache was
+    # saved
+    if cache is not None and not np.array_equal(cache.get("idxPrec"),
+                                                idxPrec):
+        print("The interpolation cache in", cachePath, "was saved for "
+              "different filtered source points, computing the operator "
+              "anew")
+        cache = None
+
+    if cache is not None:
+        print("Using the interpolation operator cached in", cachePath)
+        operator["indices"] = cache["indices"]
+    else:
+        operator["indices"] = nearest_neighbours(
+            np.column_stack((pointsYPrec, pointsZPrec)), pointsInfl)
+        if cachePath is not None:
+            save_interpolation_cache(cachePath, cacheKey, idxPrec=idxPrec,
+                                     indices=operator["indices"])
+
+    return operator
+
+
 def config_to_dict(configFile):
     """Parse a config file to a dictionary."""
 
@@ -89,30 +248,20 @@ def config_to_dict(configFile):
     return configDict
 
 
-def main():
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-
-# Parse the command-line arguments
-    parser = argparse.ArgumentParser(
-            description="A script for generating inflow \
-                            velocity fields using Lund et al's rescaling.")
-
-    parser.add_argument('--config',
-                        type=str,
-                        help='The config file',
-                        required=True)
+def generate(args, configDict, executor, timers, startTime):
+    """Generate the inflow fields by interpolating the precursor."""
 
-    args = parser.parse_args()
+    comm = executor.comm
+    rank = comm.Get_rank()
 
-# PARSE THE CONFIG
-    configFile = open(args.config, mode='r')
-    configDict = config_to_dict(configFile)
+    # A dry run writes into a temporary directory in the write path
+    outputPath = None
+    if args.dry_run is not None:
+        outputPath = set_up_dry_run(configDict, args, comm)
 
 
 # Readers and writers
     readPath = configDict["readPath"]
-    inflowGeometryPath = configDict["inflowGeometryPath"]
 
     reader = configDict["reader"]
     inflowReader = configDict["inflowGeometryReader"]
@@ -134,134 +283,147 @@ def main():
     size = int((tEnd-t0)/dt+1)
 
     # get the times in the precursor database
-    times = get_times(reader, readPath)
+    times = comm.bcast(call_on_root(comm, get_times, reader, readPath),
+                       root=0)
 
     if rank == 0:
         print("Producing database with "+str(size)+" time-steps.")
         print("Reading from database with "+str(len(times)) + " time-steps.")
 
-    if size > len(times):
-        raise ValueError("desired time-span is too large!")
-
-# SET UP GEOMETRY
-# Read grid for the recycling plane
-
-    times = get_times(reader, readPath)
-    if reader == "foamFile":
-        sampleSurfaceName = configDict["sampleSurfaceName"]
-        dataDir = os.path.join(readPath, "postProcessing", "sampledSurface")
-        pointsReadPath = os.path.join(dataDir, times[0], sampleSurfaceName,
-                                      "faceCentres")
-        [pointsY, pointsZ] = read_points_foamfile(pointsReadPath)
-
+    # Interpolation of the precursor in time
+    timeInterpolation = configDict.get("timeInterpolation", None)
+    if timeInterpolation == "none":
+        timeInterpolation = None
+    if timeInterpolation not in [None, "linear", "cubic"]:
+        raise ValueError("Unknown timeInterpolation: "+timeInterpolation)
+
+    # Recycling of the precursor database
+    recycling = configDict.get("recycling", "false") == "true"
+    recyclingShift = float(configDict.get("recyclingShift", defaultShift))
+    recyclingReflect = configDict.get("recyclingReflect", "false") == "true"
+
+    # Without recycling the precursor database has to be long enough
+    if timeInterpolation is None:
+        precursorSpan = len(times)
     else:
-        raise ValueError("Unsupported or unknown reader: "+reader)
+        precursorSpan = 1.000001*np.ptp(np.asarray(times, dtype=float))/dt + 1
 
-    # Bounds for the points
+    if not recycling and size > precursorSpan:
+        raise ValueError("desired time-span is too large!")
 
-    minYPrec = float(configDict["minYPrec"])
-    maxYPrec = float(configDict["maxYPrec"])
-    minZPrec = float(configDict["minZPrec"])
-    minZPrec = pointsZ.min()
+    if reader not in ["foamFile", "hdf5", "raw"]:
+        raise ValueError("Unsupported or unknown reader: "+reader)
 
+    if inflowReader != "foamFile":
+        raise ValueError("Unknown inflow reader: "+inflowReader)
 
-    if "maxZPrec" in configDict:
-        maxZPrec = float(configDict["maxZPrec"])
+# SET UP GEOMETRY
+    # Done by the first process, the arrays are broadcast to the others
+    geometry = call_on_root(comm, interpolation_operator, configDict, times)
+
+    names = comm.bcast(sorted(geometry) if rank == 0 else None, root=0)
+    geometry = dict((name, broadcast_array(geometry[name] if rank == 0
+                                           else None, comm))
+                    for name in names)
+
+    idxPrec = geometry["idxPrec"]
+    pointsY = geometry["pointsY"]
+    pointsZ = geometry["pointsZ"]
+    pointsYInfl = geometry["pointsYInfl"]
+    pointsZInfl = geometry["pointsZInfl"]
+
+    grids = None
+    indices = None
+    if "order" in geometry:
+        grids = [[geometry["axisY"], geometry["axisZ"], geometry["order"]],
+                 [geometry["axisYInfl"], geometry["axisZInfl"],
+                  geometry["orderInfl"]]]
     else:
-        maxZPrec = pointsZ.max()
-
-    if rank == 0:
-        print("\nTotal number of source points,", pointsY.shape[0]) 
-        print("Filtering source points with bounding box, y:[", minYPrec,
-              maxYPrec, "] z:[", minZPrec, maxZPrec, "]")
-
-    idxPrec = np.where((pointsY >= minYPrec) & (pointsY <= maxYPrec) &
-                       (pointsZ >= minZPrec) & (pointsY <= maxZPrec))
-
-    # Normalize to unit square
-    pointsY = (pointsY[idxPrec] - minYPrec)/(maxYPrec - minYPrec)
-    pointsZ = (pointsZ[idxPrec] - minZPrec)/(maxZPrec - minZPrec)
-
-    if rank == 0:
-        print("Source points after filtering:", pointsY.shape[0])
-
-    triangulation = Delaunay(np.column_stack((pointsY, pointsZ)))
+        indices = geometry["indices"]
 
-# Read grid for the inflow plane
-    if inflowReader == "foamFile":
-        [pointsYInfl, pointsZInfl] = \
-            read_points_foamfile(os.path.join(inflowGeometryPath))
-    else:
-        raise ValueError("Unknown inflow reader: "+inflowReader)
+# Create the reader functions
+    if reader == "foamFile":
+        sampleSurfaceName = configDict["sampleSurfaceName"]
+        dataDir = os.path.join(readPath, "postProcessing", "sampledSurface")
+        readerFunc = read_velocity_foamfile(dataDir, sampleSurfaceName)
+    elif reader == "hdf5":
+        [startY, endY, startZ, endZ] = geometry["hyperslab"]
+        readerFunc = read_structured_velocity_hdf5(
+            readPath, hyperslab=(slice(startY, endY), slice(startZ, endZ)))
+    elif reader == "raw":
+        readerFunc = read_velocity_raw(readPath)
 
-    # Bound the points
+    # Transform inflow points to square
     minYInfl = float(configDict["minYInfl"])
     maxYInfl = float(configDict["maxYInfl"])
     minZInfl = float(configDict["minZInfl"])
     maxZInfl = float(configDict["maxZInfl"])
 
-    if rank == 0:
-        print("\nTotal number of target points,", pointsYInfl.shape[0]) 
-        print("Filtering target points with bounding box, y:[", minYInfl,
-              maxYInfl, "] z:[", minZInfl, maxZInfl, "]")
-
-    # Filter the points to those inside rectangle
-    idxInfl = np.where((pointsYInfl >= minYInfl) & (pointsYInfl <= maxYInfl) &
-                       (pointsZInfl >= minZInfl) & (pointsZInfl <= maxZInfl))
+    pointsInfl = np.column_stack(
+        ((pointsYInfl - minYInfl)/(maxYInfl - minYInfl),
+         (pointsZInfl - minZInfl)/(maxZInfl - minZInfl)))
 
+    [writePath, positions, writerOptions] = prepare_output(
+        configDict, executor, size, pointsYInfl, pointsZInfl, xOrigin,
+        append=args.append, resume=args.resume, dryRun=args.dry_run)
 
-    pointsYInfl = pointsYInfl[idxInfl]
-    pointsZInfl = pointsZInfl[idxInfl]
-
+# Generate the inflow fields
     if rank == 0:
-        print("Target points after filtering:", pointsYInfl.shape[0])
-
-# Create the reader functions
-    if reader == "foamFile":
-        dataDir = os.path.join(readPath, "postProcessing", "sampledSurface")
-        readerFunc = read_velocity_foamfile(dataDir, sampleSurfaceName)
-    else:
-        raise ValueError("Unsupported or unknown reader: "+reader)
-
-    # Get the write path appropriate for the reader
-    writePath = set_write_path(configDict)
-
-    if writer == "ofnative":
-        if rank == 0:
-            write_points_to_ofnative(os.path.join(writePath, "points"),
-                                     pointsYInfl, pointsZInfl, xOrigin)
-    elif writer == "hdf5":
-        writePath.create_dataset("time", data=t0*np.ones((size, 1)))
-        writePath.create_dataset("velocity", (size, pointsZInfl.size, 3),
-                                 dtype=np.float64)
-        write_points_to_hdf5(writePath, pointsYInfl, pointsZInfl, xOrigin)
+        print("Interpolating")
 
-    # Transform inflow points to square
-    pointsYInfl = (pointsYInfl - minYInfl)/(maxYInfl - minYInfl)
-    pointsZInfl = (pointsZInfl - minZInfl)/(maxZInfl - minZInfl)
+    with timers("barrier"):
+        comm.Barrier()
+    setupTime = time.perf_counter() - startTime
+
+    if positions.size:
+        interpolation_generate(readerFunc,
+                               writer, writePath,
+                               dt, t0, tEnd, timePrecision,
+                               np.column_stack((pointsY, pointsZ)),
+                               pointsInfl,
+                               idxPrec,
+                               times,
+                               positions=positions,
+                               writerOptions=writerOptions,
+                               timeInterpolation=timeInterpolation,
+                               recycling=recycling,
+                               recyclingShift=recyclingShift,
+                               recyclingReflect=recyclingReflect,
+                               executor=executor,
+                               timers=timers,
+                               indices=indices,
+                               grids=grids,
+                               batchSize=int(configDict.get("batchSize", 1)))
+
+    finish_output(configDict, executor, writePath, writerOptions, timers)
+
+    if args.dry_run is not None:
+        report_dry_run(configDict, executor, timers, positions.size, size,
+                       pointsZInfl.size, setupTime, outputPath)
 
 
-# Generate the inflow fields
-    if rank == 0:
-        print("Interpolating")
+def main():
+    startTime = time.perf_counter()
 
-    comm.Barrier()
+# Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="A script for generating inflow \
+                            velocity fields using Lund et al's rescaling.")
 
-    interpolation_generate(readerFunc,
-                           writer, writePath,
-                           dt, t0, tEnd, timePrecision,
-                           triangulation,
-                           np.column_stack((pointsYInfl,pointsZInfl)),
-                           idxPrec,
-                           times)
+    add_generator_arguments(parser)
 
-    if rank == 0:
-        print("Process 0 done, waiting for the others...")
+    args = parser.parse_args()
 
-    comm.Barrier()
+# PARSE THE CONFIG
+    configFile = open(args.config, mode='r')
+    configDict = config_to_dict(configFile)
 
-    if rank == 0:
-        print("Done\n")
+# Distribution of the work
+    executor = get_generator_executor(configDict, args)
+    run_with_diagnostics(
+        lambda timers: generate(args, configDict, executor, timers,
+                                startTime),
+        args, executor.comm, enabled=args.dry_run is not None)
 
 if __name__ == "__main__":
     main()
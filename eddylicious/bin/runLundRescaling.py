@@ -6,55 +6,25 @@
 from __future__ import print_function
 from __future__ import division
 import os
+import time
 import numpy as np
 import argparse
-from mpi4py import MPI
 import h5py
 from eddylicious.generators.helper_functions import *
 from eddylicious.readers.foamfile_readers import read_structured_points_foamfile
 from eddylicious.readers.foamfile_readers import read_structured_velocity_foamfile
 from eddylicious.readers.hdf5_readers import read_structured_points_hdf5
 from eddylicious.readers.hdf5_readers import read_structured_velocity_hdf5
-from eddylicious.writers.ofnative_writers import write_points_to_ofnative
-from eddylicious.writers.hdf5_writers import write_points_to_hdf5
 from eddylicious.generators.lund_rescaling import lund_generate
 from eddylicious.generators.lund_rescaling import lund_rescale_mean_velocity
-
-
-def set_write_path(config):
-    """Sets the writePath variable in concordance with the writer.
-
-    For the ofnative writer: the path to constant/boundaryData directory.
-    For the hdf5 writer: the hdf5 file itself.
-
-    """
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-    writer = config["writer"]
-    writePath = config["writePath"]
-
-    if writer == "ofnative":
-        inletPatchName = config["inletPatchName"]
-        writePath = os.path.join(writePath, "constant", "boundaryData",
-                                 inletPatchName)
-        if rank == 0:
-            if not os.path.exists(writePath):
-                os.makedirs(writePath)
-
-    elif writer == "hdf5":
-        writePath = os.path.join(writePath, config["hdf5FileName"])
-        # If the hdf5 file exists, delete it.
-        if rank == 0 and os.path.isfile(writePath):
-            print("HDF5 database already exists. It it will be overwritten.")
-            os.remove(writePath)
-
-        # We change the writePath to be the hdf5 file itself
-        writePath = h5py.File(writePath, 'a', driver='mpio',
-                              comm=MPI.COMM_WORLD)
-    else:
-        raise ValueError("Unknown writer: "+writer)
-
-    return writePath
+from eddylicious.generators.recycling import defaultShift
+from eddylicious.generators.scripts import add_generator_arguments
+from eddylicious.generators.scripts import get_generator_executor
+from eddylicious.generators.scripts import set_up_dry_run
+from eddylicious.generators.scripts import prepare_output
+from eddylicious.generators.scripts import finish_output
+from eddylicious.generators.scripts import report_dry_run
+from eddylicious.generators.scripts import run_with_diagnostics
 
 
 def get_times(reader, readPath):
@@ -67,7 +37,7 @@ def get_times(reader, readPath):
         times = np.sort(times)
     elif reader == "hdf5":
         # Set the readPath to the file itself
-        readPath = h5py.File(readPath, 'r', driver='mpio', comm=MPI.COMM_WORLD)
+        readPath = h5py.File(readPath, 'r')
         times = readPath["velocity"]["times"][:]
         readPath.close()
     else:
@@ -94,7 +64,7 @@ def get_umean_prec(reader, readPath, flip):
         else:
             uMeanY = np.zeros(uMeanX.shape)
     elif reader == "hdf5":
-        readPath = h5py.File(readPath, 'r', driver='mpio', comm=MPI.COMM_WORLD)
+        readPath = h5py.File(readPath, 'r')
         uMeanX = readPath["velocity"]["uMeanX"][:]
         uMeanY = readPath["velocity"]["uMeanY"][:]
         readPath.close()
@@ -117,7 +87,7 @@ def get_y_prec(reader, readPath):
                                        uMeanTimes[-1],
                                        "UMean_X.xy"))[:, 0]
     elif reader == "hdf5":
-        readPath = h5py.File(readPath, 'r', driver='mpio', comm=MPI.COMM_WORLD)
+        readPath = h5py.File(readPath, 'r')
         y = readPath["points"]["pointsY"][:, 0]
         readPath.close()
     else:
@@ -195,25 +165,16 @@ def config_to_dict(configFile):
     return configDict
 
 
-def main():
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-
-# Parse the command-line arguments
-    parser = argparse.ArgumentParser(
-            description="A script for generating inflow \
-                            velocity fields using Lund et al's rescaling.")
-
-    parser.add_argument('--config',
-                        type=str,
-                        help='The config file',
-                        required=True)
+def generate(args, configDict, executor, timers, startTime):
+    """Generate the inflow fields using Lund et al's rescaling."""
 
-    args = parser.parse_args()
+    comm = executor.comm
+    rank = comm.Get_rank()
 
-# PARSE THE CONFIG
-    configFile = open(args.config, mode='r')
-    configDict = config_to_dict(configFile)
+    # A dry run writes into a temporary directory in the write path
+    outputPath = None
+    if args.dry_run is not None:
+        outputPath = set_up_dry_run(configDict, args, comm)
 
 
 # Readers and writers
@@ -276,6 +237,27 @@ def main():
     if rank == 0:
         print("Reading from database with "+str(len(times)) + " time-steps.")
 
+    # Interpolation of the precursor in time
+    timeInterpolation = configDict.get("timeInterpolation", None)
+    if timeInterpolation == "none":
+        timeInterpolation = None
+    if timeInterpolation not in [None, "linear", "cubic"]:
+        raise ValueError("Unknown timeInterpolation: "+timeInterpolation)
+
+    # Recycling of the precursor database
+    recycling = configDict.get("recycling", "false") == "true"
+    recyclingShift = float(configDict.get("recyclingShift", defaultShift))
+    recyclingReflect = configDict.get("recyclingReflect", "false") == "true"
+
+    # Without recycling the precursor database has to be long enough
+    if timeInterpolation is None:
+        precursorSpan = len(times)
+    else:
+        precursorSpan = 1.000001*np.ptp(np.asarray(times, dtype=float))/dt + 1
+
+    if not recycling and size > precursorSpan:
+        raise ValueError("desired time-span is too large!")
+
     # Get the mean velocity for the precursor
     uMeanXPrec, uMeanYPrec = get_umean_prec(reader, readPath, flipPrec)
 
@@ -421,18 +403,9 @@ def main():
     else:
         raise ValueError("Unknown reader: "+reader)
 
-    # Get the write path appropriate for the reader
-    writePath = set_write_path(configDict)
-
-    if writer == "ofnative":
-        if rank == 0:
-            write_points_to_ofnative(os.path.join(writePath, "points"),
-                                     pointsYInfl, pointsZInfl, xOrigin)
-    elif writer == "hdf5":
-        writePath.create_dataset("time", data=t0*np.ones((size, 1)))
-        writePath.create_dataset("velocity", (size, pointsZInfl.size, 3),
-                                 dtype=np.float64)
-        write_points_to_hdf5(writePath, pointsYInfl, pointsZInfl, xOrigin)
+    [writePath, positions, writerOptions] = prepare_output(
+        configDict, executor, size, pointsYInfl, pointsZInfl, xOrigin,
+        append=args.append, resume=args.resume, dryRun=args.dry_run)
 
     uMeanXInfl, uMeanYInfl = lund_rescale_mean_velocity(etaPrec, yPlusPrec,
                                                         uMeanXPrec, uMeanYPrec,
@@ -452,25 +425,34 @@ def main():
     if rank == 0:
         print("Generating the inflow fields.")
 
-    comm.Barrier()
-
-    lund_generate(readerFunc,
-                  writer, writePath,
-                  dt, t0, tEnd, timePrecision,
-                  uMeanXPrec, uMeanXInfl,
-                  uMeanYPrec, uMeanYInfl,
-                  etaPrec, yPlusPrec, pointsZ,
-                  etaInfl, yPlusInfl, pointsZInfl,
-                  nInfl, gamma,
-                  times, blending)
-
-    if rank == 0:
-        print("Process 0 done, waiting for the others...")
-
-    comm.Barrier()
-
-    if rank == 0:
-        print("Done\n")
+    with timers("barrier"):
+        comm.Barrier()
+    setupTime = time.perf_counter() - startTime
+
+    if positions.size:
+        lund_generate(readerFunc,
+                      writer, writePath,
+                      dt, t0, tEnd, timePrecision,
+                      uMeanXPrec, uMeanXInfl,
+                      uMeanYPrec, uMeanYInfl,
+                      etaPrec, yPlusPrec, pointsZ,
+                      etaInfl, yPlusInfl, pointsZInfl,
+                      nInfl, gamma,
+                      times, blending,
+                      positions=positions,
+                      writerOptions=writerOptions,
+                      timeInterpolation=timeInterpolation,
+                      recycling=recycling,
+                      recyclingShift=recyclingShift,
+                      recyclingReflect=recyclingReflect,
+                      executor=executor,
+                      timers=timers)
+
+    finish_output(configDict, executor, writePath, writerOptions, timers)
+
+    if args.dry_run is not None:
+        report_dry_run(configDict, executor, timers, positions.size, size,
+                       pointsZInfl.size, setupTime, outputPath)
 
     [thetaInfl, deltaStarInfl, deltaInfl,
      uTauInfl, u0Infl, yPlus1Infl] = compute_tbl_properties(yInfl,
@@ -483,5 +465,29 @@ def main():
         print_tbl_properties(thetaInfl, deltaStarInfl, deltaInfl, uTauInfl,
                              u0Infl, nuInfl, yPlus1Infl)
 
+
+def main():
+    startTime = time.perf_counter()
+
+# Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="A script for generating inflow \
+                            velocity fields using Lund et al's rescaling.")
+
+    add_generator_arguments(parser)
+
+    args = parser.parse_args()
+
+# PARSE THE CONFIG
+    configFile = open(args.config, mode='r')
+    configDict = config_to_dict(configFile)
+
+# Distribution of the work
+    executor = get_generator_executor(configDict, args)
+    run_with_diagnostics(
+        lambda timers: generate(args, configDict, executor, timers,
+                                startTime),
+        args, executor.comm, enabled=args.dry_run is not None)
+
 if __name__ == "__main__":
     main()
@@ -9,8 +9,26 @@
 from .helper_functions import *
 from .lund_rescaling import *
 from .interpolation import *
+from .time_interpolation import *
+from .recycling import *
+from .executors import *
+from .timing import *
+from .profiling import *
+from .estimation import *
+from .statistics import *
+from .scripts import *
 
-__all__ = ["helper_functions", "lund_rescaling", "interpolation"]
+__all__ = ["helper_functions", "lund_rescaling", "interpolation",
+           "time_interpolation", "recycling", "executors", "timing",
+           "profiling", "estimation", "statistics", "scripts"]
 __all__.extend(helper_functions.__all__)
 __all__.extend(lund_rescaling.__all__)
 __all__.extend(interpolation.__all__)
+__all__.extend(time_interpolation.__all__)
+__all__.extend(recycling.__all__)
+__all__.extend(executors.__all__)
+__all__.extend(timing.__all__)
+__all__.extend(profiling.__all__)
+__all__.extend(estimation.__all__)
+__all__.extend(statistics.__all__)
+__all__.extend(scripts.__all__)
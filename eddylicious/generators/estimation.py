@@ -0,0 +1,241 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for estimating the cost of generating an inflow database
+from a few generated time-steps, used by the dry runs of the scripts.
+
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import sys
+import shutil
+import numpy as np
+
+__all__ = ["estimate_runtime", "estimate_output_size", "peak_memory",
+           "directory_size", "print_estimate"]
+
+# The largest amount of characters of a point written by the ofnative
+# writer, "(%e %e %e)" with minus signs and a newline
+ofnativePointSize = 3*13 + 5
+
+
+def estimate_runtime(computeTime, writeTime, nTimes, nProcs, backend="mpi",
+                     setupTime=0.0):
+    """Estimate the time needed to generate an inflow database.
+
+    Parameters
+    ----------
+    computeTime : float
+        The time needed to read and process a single time-step.
+    writeTime : float
+        The time needed to write a single time-step.
+    nTimes : int
+        The amount of time-steps to generate.
+    nProcs : int
+        The amount of processes.
+    backend : str, optional
+        The backend distributing the work, see
+        :func:`~eddylicious.generators.executors.get_executor`. With the
+        pool backend all the writing is done by a single process.
+    setupTime : float, optional
+        The time spent before the generation starts, e.g. reading the
+        geometry.
+
+    Returns
+    -------
+    float
+        The estimated time in seconds.
+
+    """
+    nProcs = max(1, min(nProcs, nTimes))
+
+    if backend == "pool":
+        return setupTime + max(nTimes*computeTime/nProcs, nTimes*writeTime)
+    else:
+        return setupTime + nTimes*(computeTime + writeTime)/nProcs
+
+
+def estimate_output_size(writer, nPoints, nTimes, dtype="float64"):
+    """Estimate the size of an uncompressed inflow database.
+
+    Parameters
+    ----------
+    writer : str
+        The writer, "ofnative", "hdf5" or "raw".
+    nPoints : int
+        The amount of points at the inflow boundary.
+    nTimes : int
+        The amount of time-steps.
+    dtype : str, optional
+        The data type of the velocity values, only used by the raw
+        writer (default float64).
+
+    Returns
+    -------
+    int
+        The estimated size in bytes. For the ofnative writer, which
+        saves the values as text, an upper bound.
+
+    """
+    # The points are saved once, the time value and the completed flag
+    # along with each time-step
+    if writer == "ofnative":
+        perTime = nPoints*ofnativePointSize + 200
+        return int(nTimes*perTime + nPoints*ofnativePointSize)
+    elif writer == "hdf5":
+        perTime = 3*8*nPoints + 8 + 1
+        return int(nTimes*perTime + 3*8*nPoints)
+    elif writer == "raw":
+        perTime = 3*np.dtype(dtype).itemsize*nPoints + 8 + 1
+        return int(nTimes*perTime + 3*8*nPoints)
+    else:
+        raise ValueError("Unknown writer: "+str(writer))
+
+
+def peak_memory():
+    """Get the largest amount of memory used by the current process so
+    far.
+
+    Returns
+    -------
+    int
+        The peak resident set size in bytes, None if it is not available
+        on the platform.
+
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        return int(peak)
+    else:
+        return int(peak)*1024
+
+
+def directory_size(path):
+    """Compute the space taken by the files in a directory, counting the
+    allocated blocks, so that preallocated sparse files count only with
+    the written data.
+
+    Parameters
+    ----------
+    path : str
+        The path to the directory.
+
+    Returns
+    -------
+    int
+        The size in bytes.
+
+    """
+    size = 0
+    for directory, subdirectories, fileNames in os.walk(path):
+        for fileName in fileNames:
+            stat = os.stat(os.path.join(directory, fileName))
+            if hasattr(stat, "st_blocks"):
+                size += stat.st_blocks*512
+            else:
+                size += stat.st_size
+    return size
+
+
+def print_estimate(summary, nSample, nTimes, nPoints, writer, nProcs,
+                   backend="mpi", setupTime=0.0, memory=None,
+                   writtenSize=None, writePath=None, dtype="float64"):
+    """Print the estimated runtime, output size and memory of a run,
+    based on the generation of a few time-steps.
+
+    Parameters
+    ----------
+    summary : dict
+        The timing summary of the generated time-steps, see
+        :func:`~eddylicious.generators.timing.timing_summary`.
+    nSample : int
+        The amount of generated time-steps.
+    nTimes : int
+        The amount of time-steps of the run.
+    nPoints : int
+        The amount of points at the inflow boundary.
+    writer : str
+        The writer of the run.
+    nProcs : int
+        The amount of processes that generated the time-steps.
+    backend : str, optional
+        The backend of the run.
+    setupTime : float, optional
+        The time spent before the generation starts.
+    memory : list of int, optional
+        The peak memory of each process, see :func:`peak_memory`.
+    writtenSize : int, optional
+        The space taken by the generated time-steps, used to account for
+        compression.
+    writePath : str, optional
+        Where the database is written, used to check the free space.
+    dtype : str, optional
+        The data type of the raw writer.
+
+    """
+    stages = summary["stages"]
+
+    # The time per time-step spent writing, and in all the other stages
+    # except waiting at barriers
+    writeTime = 0.0
+    computeTime = 0.0
+    for stage in stages:
+        if stage == "write":
+            writeTime += stages[stage]["total"]/nSample
+        elif stage != "barrier":
+            computeTime += stages[stage]["total"]/nSample
+
+    print("\nDry run, "+str(nSample)+" time-step(s) generated by " +
+          str(nProcs)+" process(es)")
+    print("    setup "+"{0:.3g}".format(setupTime)+" s, per time-step " +
+          "{0:.3g}".format(computeTime)+" s reading and computing, " +
+          "{0:.3g}".format(writeTime)+" s writing")
+
+    print("\nEstimated runtime of "+str(nTimes)+" time-steps with the " +
+          backend+" backend")
+    for n in sorted(set([2**i for i in range(11)] + [nProcs])):
+        if n > nTimes:
+            break
+        runtime = estimate_runtime(computeTime, writeTime, nTimes, n,
+                                   backend, setupTime)
+        print("    {0:>6d} process(es) {1:>12.4g} s {2:>10.3g} h".format(
+            n, runtime, runtime/3600))
+
+    print("\nEstimated output size")
+    outputSize = 0
+    for outputWriter in ["ofnative", "hdf5", "raw"]:
+        size = estimate_output_size(outputWriter, nPoints, nTimes, dtype)
+        note = ""
+        if outputWriter == writer and writtenSize is not None:
+            # Accounts for compression
+            size = writtenSize/nSample*nTimes
+            note = " (measured)"
+        if outputWriter == writer:
+            outputSize = size
+        print("    {0:<10}{1:>12.4g} GB{2}".format(outputWriter,
+                                                     size/1024**3, note))
+
+    if writePath is not None:
+        # The closest existing parent of the write path
+        path = os.path.abspath(writePath)
+        while not os.path.exists(path):
+            path = os.path.dirname(path)
+        free = shutil.disk_usage(path).free
+        print("    free space in "+path+" "+"{0:.4g}".format(free/1024**3) +
+              " GB")
+        if outputSize > free:
+            print("    WARNING: the output does not fit in the free space!")
+
+    if memory is not None and None not in memory:
+        print("\nPeak memory per process "+"{0:.4g}".format(
+            max(memory)/1024**2)+" MB")
@@ -0,0 +1,442 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for distributing the work among several processes.
+
+Three backends are available.
+
+    mpi :
+        The work is distributed among the MPI processes. By default, the
+        items are handed out in small blocks whenever a process is done
+        with its previous block, so slow processes take on less work.
+        Alternatively, each process handles a fixed contiguous part of
+        the items. Requires mpi4py.
+    pool :
+        The work is distributed among the processes of a pool on a
+        single machine, the results are handled by the main process.
+        The processes are created by forking the main process.
+    serial :
+        All the work is done by the current process.
+
+"""
+from __future__ import print_function
+from __future__ import division
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+import h5py
+from .helper_functions import chunks_and_offsets
+from .timing import merge_timings
+
+__all__ = ["get_executor", "open_hdf5", "broadcast_array", "call_on_root"]
+
+# The function computing the items in the processes of a pool and the
+# timers used by it, they are inherited by the processes when forked
+_poolCompute = None
+_poolTimers = None
+
+
+def get_executor(backend="auto", nWorkers=None, blockSize=8,
+                 schedule="dynamic"):
+    """Create a function distributing work among processes.
+
+    Parameters
+    ----------
+    backend : str, optional
+        The backend, "mpi", "pool", "serial" or "auto" (default). The
+        latter chooses mpi if mpi4py is available, and pool otherwise.
+    nWorkers : int, optional
+        The amount of processes in the pool, by default the amount of
+        available CPUs. Only used by the pool backend.
+    blockSize : int, optional
+        The amount of consecutive items handed to a process at a time
+        (default 8). Used by the pool backend and the dynamic schedule
+        of the mpi backend.
+    schedule : str, optional
+        How the mpi backend distributes the items, either "dynamic"
+        (default) or "static". The former hands out blocks of items on
+        demand using a shared counter, the latter gives each process a
+        contiguous part of the items up front.
+
+    Returns
+    -------
+    function
+        A function of three variables: the items, a function computing
+        the result for an item, and a function consuming the item and
+        its result. The optional keyword argument label enables printing
+        the progress. The backend's name is contained in the attribute
+        "backend". The attribute "comm" contains MPI.COMM_WORLD for the
+        mpi backend and an equivalent for a single process otherwise.
+        The amount of processes computing the results is contained in
+        the attribute "nProcs".
+
+    """
+    if backend == "auto":
+        try:
+            import mpi4py
+            backend = "mpi"
+        except ImportError:
+            backend = "pool"
+
+    if backend == "mpi":
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+    elif backend in ["pool", "serial"]:
+        comm = _SingleProcessComm()
+    else:
+        raise ValueError("Unknown backend: "+str(backend))
+
+    if schedule not in ["dynamic", "static"]:
+        raise ValueError("Unknown schedule: "+str(schedule))
+
+    if nWorkers is None:
+        nWorkers = multiprocessing.cpu_count()
+
+    if backend == "pool" and \
+            "fork" not in multiprocessing.get_all_start_methods():
+        print("Forking processes is not supported, using the serial "
+              "backend.")
+        backend = "serial"
+
+    def run(items, compute, consume, label=None, timers=None):
+        """
+        A function that will actually distribute the work.
+
+        Parameters
+        ----------
+        items : list or ndarray
+            The items to process, typically positions along the time
+            axis.
+        compute : function
+            A function of one variable, the item, returning the result.
+        consume : function
+            A function of two variables, the item and its result. It is
+            always called by the process that distributes the work.
+        label : str, optional
+            If provided, the progress is printed with the label.
+        timers : function, optional
+            The timers used by compute, see
+            :func:`~eddylicious.generators.timing.get_timers`. Only
+            needed by the pool backend, which then collects the
+            measurements made by the processes of the pool.
+
+        """
+        nItems = len(items)
+
+        # The indices of the items processed by this process, and the
+        # amount of items that the progress is relative to
+        if backend == "mpi" and schedule == "dynamic":
+            indices = (i for block in _dynamic_blocks(comm, nItems, blockSize)
+                       for i in block)
+        elif backend == "mpi":
+            [start, end] = _static_range(comm, nItems)
+            indices = range(start, end)
+            nItems = end - start
+        else:
+            indices = range(nItems)
+
+        if backend == "pool":
+            results = enumerate(_pool_results(items, compute, nWorkers,
+                                              blockSize, timers))
+        else:
+            results = ((i, [items[i], compute(items[i])]) for i in indices)
+
+        printed = -1
+        for n, [i, [item, result]] in enumerate(results):
+            # Blocks are handed out in order, so the index of the item
+            # shows the progress of all the processes
+            if schedule == "static" and backend == "mpi":
+                done = n/nItems
+            else:
+                done = i/nItems
+
+            if label is not None and comm.Get_rank() == 0 and \
+                    int(done*10) > printed:
+                printed = int(done*10)
+                print("     "+label+" about "+str(int(done*100))+"%")
+
+            consume(item, result)
+
+    run.backend = backend
+    run.comm = comm
+    if backend == "mpi":
+        run.nProcs = comm.Get_size()
+    elif backend == "pool":
+        run.nProcs = nWorkers
+    else:
+        run.nProcs = 1
+    return run
+
+
+def open_hdf5(filePath, mode, executor):
+    """Open an HDF5 file, using parallel HDF5 if several MPI processes
+    access the file.
+
+    Parameters
+    ----------
+    filePath : str
+        The path to the file.
+    mode : str
+        The mode, as for h5py.File.
+    executor : function
+        The function distributing the work, see :func:`get_executor`.
+
+    Returns
+    -------
+    h5py.File
+        The opened file.
+
+    """
+    if executor.backend == "mpi" and executor.comm.Get_size() > 1:
+        return h5py.File(filePath, mode, driver='mpio', comm=executor.comm)
+    else:
+        return h5py.File(filePath, mode)
+
+
+def broadcast_array(array, comm, root=0):
+    """Broadcast an array from one process to all the others.
+
+    The shape and the data type are broadcast first, the values are then
+    sent directly from the buffer of the array, without pickling.
+
+    Parameters
+    ----------
+    array : ndarray
+        The array, only used on the root process.
+    comm : MPI.Comm
+        The communicator, e.g. the attribute "comm" of an executor, see
+        :func:`get_executor`.
+    root : int, optional
+        The process sending the array (default 0).
+
+    Returns
+    -------
+    ndarray
+        The array on all the processes.
+
+    """
+    if comm.Get_rank() == root:
+        array = np.ascontiguousarray(array)
+        header = [array.shape, array.dtype.str]
+    else:
+        header = None
+
+    [shape, dtype] = comm.bcast(header, root=root)
+    if comm.Get_rank() != root:
+        array = np.empty(shape, dtype=dtype)
+
+    comm.Bcast(array, root=root)
+    return array
+
+
+def call_on_root(comm, function, *args):
+    """Call a function on one process only, e.g. to read the geometry
+    once for all the processes.
+
+    If the function raises an exception, it is raised on all the
+    processes, so that the others do not wait for the result forever.
+
+    Parameters
+    ----------
+    comm : MPI.Comm
+        The communicator, e.g. the attribute "comm" of an executor, see
+        :func:`get_executor`.
+    function : function
+        The function to call.
+    *args
+        The arguments of the function.
+
+    Returns
+    -------
+    object
+        The result of the function on the first process, None on the
+        others.
+
+    """
+    result = None
+    error = None
+    if comm.Get_rank() == 0:
+        try:
+            result = function(*args)
+        except Exception as exception:
+            error = exception
+
+    error = comm.bcast(error, root=0)
+    if error is not None:
+        raise error
+
+    return result
+
+
+def _static_range(comm, nItems):
+    """Compute the range of items processed by this MPI process, when
+    each process gets a contiguous part of the items.
+
+    """
+    rank = comm.Get_rank()
+
+    # If there are less items than processors some will be idle
+    nActive = min(comm.Get_size(), nItems)
+    if rank >= nActive:
+        return [0, 0]
+
+    [chunks, offsets] = chunks_and_offsets(nActive, nItems)
+    return [offsets[rank], offsets[rank] + chunks[rank]]
+
+
+def _dynamic_blocks(comm, nItems, blockSize):
+    """Yield ranges of items processed by this MPI process, handed out
+    on demand.
+
+    The index of the next block is a counter stored on the first
+    process, which is atomically fetched and incremented with one-sided
+    communication. Blocks are thus handed out in increasing order. All
+    the processes must exhaust the generator, since the counter is freed
+    collectively.
+
+    """
+    from mpi4py import MPI
+
+    # For few items, smaller blocks so that all the processes get some
+    blockSize = max(1, min(blockSize, nItems//(4*comm.Get_size())))
+
+    itemSize = MPI.INT64_T.Get_size()
+    win = MPI.Win.Allocate(itemSize if comm.Get_rank() == 0 else 0,
+                           itemSize, comm=comm)
+
+    if comm.Get_rank() == 0:
+        win.Lock(0, MPI.LOCK_EXCLUSIVE)
+        win.Put([np.zeros(1, dtype=np.int64), MPI.INT64_T], 0)
+        win.Unlock(0)
+    comm.Barrier()
+
+    # A single passive-target epoch for all the fetches, locking the
+    # window for each fetch would require the first process to progress
+    # the lock, delaying the others while it computes
+    one = np.ones(1, dtype=np.int64)
+    block = np.zeros(1, dtype=np.int64)
+    win.Lock_all()
+    while True:
+        win.Fetch_and_op([one, MPI.INT64_T], [block, MPI.INT64_T], 0, 0,
+                         MPI.SUM)
+        win.Flush(0)
+
+        start = int(block[0])*blockSize
+        if start >= nItems:
+            break
+
+        yield range(start, min(start + blockSize, nItems))
+
+    win.Unlock_all()
+    win.Free()
+
+
+def _compute_block(block):
+    """Compute the results for a block of items in a process of the
+    pool, along with the timings measured meanwhile.
+
+    """
+    results = [_poolCompute(item) for item in block]
+
+    if _poolTimers is None or not _poolTimers.enabled:
+        return [results, None, None]
+
+    records = dict(_poolTimers.records)
+    _poolTimers.records.clear()
+    events = list(_poolTimers.events)
+    del _poolTimers.events[:]
+    return [results, records, events]
+
+
+def _pool_results(items, compute, nWorkers, blockSize, timers=None):
+    """Compute the results in a pool of processes, yielding them in the
+    order of the items.
+
+    Consecutive items are sent to the processes in blocks, which allows
+    the processes to reuse data cached by the compute function. At most
+    two blocks per process are in flight, limiting the memory used by
+    the results waiting to be consumed.
+
+    """
+    global _poolCompute, _poolTimers
+    _poolCompute = compute
+    _poolTimers = timers
+
+    # For few items, smaller blocks so that all the processes get some
+    blockSize = max(1, min(blockSize, len(items)//(4*nWorkers)))
+    blocks = [items[i:i + blockSize] for i in range(0, len(items), blockSize)]
+
+    # With forking, all the processes are started at the first
+    # submission, before the consuming function possibly starts any
+    # threads
+    pool = ProcessPoolExecutor(nWorkers,
+                               mp_context=multiprocessing.get_context("fork"))
+    try:
+        pending = deque()
+        for block in blocks:
+            pending.append((block, pool.submit(_compute_block, block)))
+
+            while len(pending) > 2*nWorkers:
+                for item, itemResult in _block_results(pending.popleft(),
+                                                       timers):
+                    yield item, itemResult
+
+        while pending:
+            for item, itemResult in _block_results(pending.popleft(),
+                                                   timers):
+                yield item, itemResult
+    finally:
+        for [doneBlock, result] in pending:
+            result.cancel()
+        pool.shutdown(wait=True)
+        _poolCompute = None
+        _poolTimers = None
+
+
+def _block_results(blockAndFuture, timers):
+    """Wait for the results of a block computed by the pool, merging the
+    timings into the timers of the main process.
+
+    """
+    [block, future] = blockAndFuture
+    [results, records, events] = future.result()
+
+    if records is not None:
+        merge_timings(timers.records, records)
+        timers.events.extend(events)
+
+    return zip(block, results)
+
+
+class _SingleProcessComm(object):
+    """A replacement of MPI.COMM_WORLD for a single process."""
+
+    def Get_rank(self):
+        return 0
+
+    def Get_size(self):
+        return 1
+
+    def Barrier(self):
+        pass
+
+    def bcast(self, obj, root=0):
+        return obj
+
+    def Bcast(self, buf, root=0):
+        pass
+
+    def gather(self, obj, root=0):
+        return [obj]
+
+    def allgather(self, obj):
+        return [obj]
+
+    def reduce(self, obj, op=None, root=0):
+        return obj
+
+    def allreduce(self, obj, op=None):
+        return obj
@@ -9,14 +9,216 @@ interpolation of data (from a precursor).
 """
 from __future__ import print_function
 from __future__ import division
+import os
+import hashlib
 import numpy as np
-from mpi4py import MPI
-from scipy.interpolate import NearestNDInterpolator 
-from .helper_functions import chunks_and_offsets
+from scipy.spatial import cKDTree
+from .executors import get_executor
+from .timing import get_timers
+from .time_interpolation import time_interpolation_reader
+from .recycling import recycling_passes, recycling_shift, recycling_order
+from .recycling import cached_reader, defaultShift
 from ..writers.ofnative_writers import write_velocity_to_ofnative
-from ..writers.hdf5_writers import write_velocity_to_hdf5
+from ..writers.hdf5_writers import write_velocities_to_hdf5
+from ..writers.raw_writers import write_velocities_to_raw
+
+__all__ = ["interpolation_generate", "nearest_neighbours", "rectilinear_grid",
+           "linear_weights", "geometry_hash", "save_interpolation_cache",
+           "load_interpolation_cache"]
+
+# The maximum amount of unfinished background writes
+maxPendingWrites = 16
+
+
+def nearest_neighbours(points, pointsTarget):
+    """Find the nearest source point of each target point.
+
+    Parameters
+    ----------
+    points : ndarray or cKDTree
+        A 2d array containing the points of the source geometry, or a
+        KD-tree built from them.
+    pointsTarget : ndarray
+        A 2d array containing the points of the target geometry.
+
+    Returns
+    -------
+    ndarray
+        The index of the nearest source point for each target point.
+
+    """
+    if not isinstance(points, cKDTree):
+        points = cKDTree(points)
+
+    return points.query(pointsTarget)[1]
+
+
+def rectilinear_grid(pointsY, pointsZ, tolerance=1e-8):
+    """Detect whether the points form a rectilinear grid.
+
+    Coordinates differing by less than the tolerance, relative to the
+    extent of the points, are considered equal. The grid is rectilinear
+    if each combination of the distinct values of y and z is present
+    exactly once.
+
+    Parameters
+    ----------
+    pointsY : ndarray
+        A 1d array containing the y coordinates of the points.
+    pointsZ : ndarray
+        A 1d array containing the z coordinates of the points.
+    tolerance : float, optional
+        The relative tolerance (default 1e-8).
+
+    Returns
+    -------
+    List of ndarrays
+        The list contains 3 items, or is None if the grid is not
+        rectilinear.
+
+        axisY :
+        The distinct values of y, in increasing order.
+
+        axisZ :
+        The distinct values of z, in increasing order.
+
+        order :
+        A 2d array containing the index of the point at each node of
+        the grid, the axes corresponding to y and z.
+
+    """
+    pointsY = np.asarray(pointsY, dtype=np.float64)
+    pointsZ = np.asarray(pointsZ, dtype=np.float64)
+    if pointsY.size == 0:
+        return None
+
+    scale = max(np.ptp(pointsY), np.ptp(pointsZ))
+    [axisY, labelsY] = _distinct_values(pointsY, tolerance*scale)
+    [axisZ, labelsZ] = _distinct_values(pointsZ, tolerance*scale)
+
+    if axisY.size*axisZ.size != pointsY.size:
+        return None
+
+    # With as many points as nodes, all the nodes are filled only if
+    # each is filled once
+    order = -np.ones((axisY.size, axisZ.size), dtype=np.int64)
+    order[labelsY, labelsZ] = np.arange(pointsY.size)
+    if np.any(order < 0):
+        return None
+
+    return [axisY, axisZ, order]
+
+
+def linear_weights(axis, values):
+    """Compute the weights of the linear interpolation along an axis.
+
+    Values outside of the axis get the value at the closest end.
+
+    Parameters
+    ----------
+    axis : ndarray
+        The coordinates of the source points along the axis, in
+        increasing order.
+    values : ndarray
+        The coordinates of the target points.
+
+    Returns
+    -------
+    ndarray
+        A 2d array, which multiplied by the values at the source points
+        gives the interpolated values at the target points.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.zeros((values.size, axis.size))
+    rows = np.arange(values.size)
+
+    if axis.size == 1:
+        weights[:, 0] = 1
+        return weights
+
+    # The source points to the left and right of each target point
+    right = np.clip(np.searchsorted(axis, values), 1, axis.size - 1)
+    left = right - 1
+    fraction = np.clip((values - axis[left])/(axis[right] - axis[left]), 0, 1)
+
+    weights[rows, left] = 1 - fraction
+    weights[rows, right] += fraction
+    return weights
+
+
+def geometry_hash(*arrays):
+    """Compute a key identifying a set of arrays, e.g. the points of the
+    source and target geometries and the bounding boxes.
+
+    Parameters
+    ----------
+    *arrays : ndarray
+        The arrays, converted to float64 before hashing.
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-1 digest of the shapes and values.
+
+    """
+    sha = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        sha.update(str(array.shape).encode())
+        sha.update(array.tobytes())
+
+    return sha.hexdigest()
+
+
+def save_interpolation_cache(filePath, key, **arrays):
+    """Save the interpolation operator to an npz file.
+
+    The file is written under a temporary name and then renamed, so that
+    an interrupted run does not leave a corrupted cache behind.
+
+    Parameters
+    ----------
+    filePath : str
+        The path to the cache file.
+    key : str
+        The key identifying the geometry, see :func:`geometry_hash`.
+    **arrays : ndarray
+        The arrays defining the operator, e.g. the indices of the
+        filtered source points and of the nearest neighbours.
+
+    """
+    tmpPath = filePath+".tmp.npz"
+    np.savez(tmpPath, key=np.array(key), **arrays)
+    os.replace(tmpPath, filePath)
+
+
+def load_interpolation_cache(filePath, key):
+    """Load the interpolation operator saved to an npz file.
+
+    Parameters
+    ----------
+    filePath : str
+        The path to the cache file.
+    key : str
+        The key identifying the geometry, see :func:`geometry_hash`.
+
+    Returns
+    -------
+    dict
+        The saved arrays, or None if the file does not exist or was
+        saved for a different key.
+
+    """
+    if not os.path.isfile(filePath):
+        return None
+
+    with np.load(filePath) as cacheFile:
+        if "key" not in cacheFile or str(cacheFile["key"]) != key:
+            return None
+        return {name: cacheFile[name] for name in cacheFile.files
+                if name != "key"}
 
-__all__ = ["interpolation_generate"]
 
 def interpolation_generate(readerFunction,
                            writer, writePath,
@@ -24,7 +226,12 @@ def interpolation_generate(readerFunction,
                            points,
                            pointsInfl,
                            idxPrec,
-                           times):
+                           times,
+                           positions=None, writerOptions=None,
+                           timeInterpolation=None, recycling=False,
+                           recyclingShift=defaultShift, recyclingReflect=False,
+                           executor=None, timers=None, indices=None,
+                           grids=None, batchSize=1):
     """Generate the the inflow velocity interpolation.
 
     This function will take some precursor data and interpolate it
@@ -53,60 +260,289 @@ def interpolation_generate(readerFunction,
         The ending time for the simulation.
     points : ndarray
         A 2d array containing the values the points of the
-        source geometry or their Delaunay triangulation.
+        source geometry, or an object containing them in the attribute
+        "points". Used to find the nearest source point of each inlet
+        point or, if the points form rectilinear grids, the weights of
+        the bilinear interpolation.
     pointsInfl : ndarray
         A 2d array containing the values the points of the
         inlet geometry.
     idxPrec : ndarray
-        Indices for filtering the read-in velocity
+        Indices for filtering the read-in velocity, into the flattened
+        velocity arrays, so that structured readers returning 2d arrays
+        are supported.
     times : list of floats or strings
         The times for which the velocity field was sampled in the
         precursor simulation.
+    positions : ndarray, optional
+        The positions along the time axis of the inflow database that
+        should be generated. By default all the positions between t0
+        and tEnd are generated.
+    writerOptions : dict, optional
+        Additional keyword arguments passed on to the writer function.
+    timeInterpolation : str, optional
+        If "linear" or "cubic", the precursor velocity is interpolated
+        in time between the sampled frames. Position i along the time
+        axis is then associated with the time times[0] + i*dt in the
+        precursor. By default position i is associated with times[i].
+    recycling : bool, optional
+        Whether to start again from the beginning of the precursor
+        database when its end is reached, see
+        :mod:`~eddylicious.generators.recycling`. (default False)
+    recyclingShift : float, optional
+        The spanwise shift between two passes through the precursor
+        database, as a fraction of the spanwise period.
+    recyclingReflect : bool, optional
+        Whether to reflect the precursor velocity fields in the spanwise
+        direction every other pass. (default False)
+    executor : function, optional
+        The function distributing the work among processes, see
+        :func:`~eddylicious.generators.executors.get_executor`. By
+        default MPI is used if available.
+    timers : function, optional
+        The timers measuring the time spent reading, interpolating and
+        writing, see :func:`~eddylicious.generators.timing.get_timers`.
+        By default nothing is measured.
+    indices : ndarray, optional
+        The index of the nearest source point for each target point, see
+        :func:`nearest_neighbours`, e.g. loaded from a cache. Computed if
+        not provided.
+    grids : list, optional
+        The rectilinear grids formed by the source and target points,
+        each as returned by :func:`rectilinear_grid`. If provided, the
+        velocity is interpolated bilinearly, as two products with the
+        interpolation weights along y and z, instead of taking the value
+        at the nearest source point.
+    batchSize : int, optional
+        The amount of consecutive positions interpolated together, with
+        a single gather or product for all of them, and written with a
+        single call to the writer (default 1). Larger batches reduce the
+        overhead per time-step for inflow patches with few points.
 
     """
-    # Grab info regarding parallelization
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-    nProcs = comm.Get_size()
+    if executor is None:
+        executor = get_executor()
+
+    if timers is None:
+        timers = get_timers(False)
 
     # Get the total amount of rescalings to be done
     size = int((tEnd-t0)/dt+1)
-    
-    # Calculate the amount of rescalings each processor is responsible for
-    [chunks, offsets] = chunks_and_offsets(nProcs, size)
 
-    # Perform the rescaling
-    for i in range(chunks[rank]):
-        t = t0 + dt*i + dt*int(offsets[rank])
-        t = float(("{0:."+str(timePrecision)+"f}").format(t))
-        position = int(offsets[rank]) + i
+    if positions is None:
+        positions = np.arange(size)
 
-        if (rank == 0) and (np.mod(i, int(chunks[rank]/10)) == 0):
-            print("     Interpolated about "+str(int(i/chunks[rank]*100))+"%")
+    if writerOptions is None:
+        writerOptions = {}
 
-        # Read U data
-        if readerFunction.reader == "foamFile":
-            assert position < len(times)
-            [uX, uY, uZ] = readerFunction(times[position])
-        elif readerFunction.reader == "hdf5":
-            assert position < len(times)
-            [uX, uY, uZ] = readerFunction(position)
+    points = getattr(points, "points", points)
+
+    nPointsInfl = np.shape(pointsInfl)[0]
+    idxPrec = np.ravel(idxPrec)
+
+    # The interpolation operator is computed once, the recycling passes
+    # moving the target points have their own. For rectilinear grids,
+    # only the weights along z change. Otherwise, the operator is the
+    # index of the source value of each target point, before filtering.
+    if grids is not None:
+        [[axisY, axisZ, order], [axisYInfl, axisZInfl, orderInfl]] = grids
+        sourceOrder = idxPrec[order]
+        weightsY = linear_weights(axisY, axisYInfl)
+        passOperators = {0: linear_weights(axisZ, axisZInfl).T}
+    else:
+        if indices is None:
+            indices = nearest_neighbours(points, pointsInfl)
+        passOperators = {0: idxPrec[indices]}
+    sourceTree = []
+
+    if timeInterpolation is not None:
+        readerFunction = time_interpolation_reader(readerFunction, times,
+                                                   timeInterpolation)
+        tPrec0 = np.min(np.asarray(times, dtype=np.float64))
+
+    # Positions using the same precursor time-steps are grouped together
+    if recycling:
+        if timeInterpolation is not None:
+            period = np.ptp(np.asarray(times, dtype=np.float64))/dt
         else:
-            raise ValueError("Unknown reader")
+            period = len(times)
+            readerFunction = cached_reader(readerFunction, times)
+        positions = recycling_order(positions, period)
+
+    # Consecutive positions are interpolated and written together
+    batches = [positions[i:i + batchSize]
+               for i in range(0, len(positions), batchSize)]
+
+    # Writes performed in the background, which are not finished yet
+    pending = []
+
+    def pass_operator(recyclingPass, reflect):
+        """Compute the interpolation operator for a recycling pass.
+
+        The target points are reflected and shifted instead of the
+        recycled fields, the points are scaled to the unit square.
+
+        """
+        if recyclingPass not in passOperators:
+            shift = recycling_shift(recyclingPass, recyclingShift)
+
+            if grids is not None:
+                pointsZTarget = axisZInfl
+                if reflect:
+                    pointsZTarget = 1 - pointsZTarget
+                pointsZTarget = np.mod(pointsZTarget + shift, 1)
+
+                passOperators[recyclingPass] = \
+                    linear_weights(axisZ, pointsZTarget).T
+            else:
+                if not sourceTree:
+                    sourceTree.append(cKDTree(points))
+
+                pointsTarget = np.array(pointsInfl, dtype=np.float64)
+                if reflect:
+                    pointsTarget[:, 1] = 1 - pointsTarget[:, 1]
+                pointsTarget[:, 1] = np.mod(pointsTarget[:, 1] + shift, 1)
+
+                passOperators[recyclingPass] = \
+                    idxPrec[nearest_neighbours(sourceTree[0], pointsTarget)]
+        return passOperators[recyclingPass]
+
+    def read(position):
+        """Read the precursor velocity field for a position, returning
+        the recycling pass and the flattened components.
+
+        """
+        recyclingPass = 0
+        location = position
+        if recycling:
+            [recyclingPass, location] = recycling_passes(position, period)
 
-        uXInterp = NearestNDInterpolator(points.points, uX[idxPrec])
-        uYInterp = NearestNDInterpolator(points.points, uY[idxPrec])
-        uZInterp = NearestNDInterpolator(points.points, uZ[idxPrec])
+        # Read U data
+        with timers("read"):
+            if timeInterpolation is not None:
+                [uX, uY, uZ] = readerFunction(tPrec0 + dt*location)
+            elif recycling:
+                [uX, uY, uZ] = readerFunction(int(round(location)))
+            elif readerFunction.reader == "foamFile":
+                assert position < len(times)
+                [uX, uY, uZ] = readerFunction(times[position])
+            elif readerFunction.reader in ["hdf5", "raw"]:
+                assert position < len(times)
+                [uX, uY, uZ] = readerFunction(position)
+            else:
+                raise ValueError("Unknown reader")
+        timers.add_bytes("read", uX, uY, uZ)
+
+        return [recyclingPass, np.stack((np.ravel(uX), np.ravel(uY),
+                                         np.ravel(uZ)))]
+
+    def compute(batch):
+        """Interpolate the velocity fields for a batch of positions."""
+        passes = np.zeros(len(batch), dtype=np.int64)
+        u = None
+        for i, position in enumerate(batch):
+            [passes[i], uPosition] = read(position)
+            if u is None:
+                u = np.empty((len(batch),) + uPosition.shape)
+            u[i] = uPosition
+
+        # All the positions of a recycling pass and all the components
+        # are interpolated at once
+        with timers("interpolate"):
+            uInfl = np.empty((len(batch), 3, nPointsInfl))
+
+            for recyclingPass in np.unique(passes):
+                inPass = passes == recyclingPass
+                reflect = recyclingReflect and recyclingPass % 2 == 1
+                operator = pass_operator(recyclingPass, reflect)
+
+                uPass = u[inPass]
+                if reflect:
+                    uPass[:, 2] = -uPass[:, 2]
+
+                if grids is not None:
+                    uInfl[inPass] = _bilinear(uPass[..., sourceOrder],
+                                              weightsY, operator, orderInfl)
+                else:
+                    uInfl[inPass] = uPass[..., operator]
 
-        uXInfl = uXInterp(pointsInfl)
-        uYInfl = uYInterp(pointsInfl)
-        uZInfl = uZInterp(pointsInfl)
+        return uInfl
+
+    def consume(batch, uInfl):
+        """Write the velocity fields for a batch of positions."""
+        t = [float(("{0:."+str(timePrecision)+"f}").format(t0 + dt*position))
+             for position in batch]
 
         # Write
-        if writer == "ofnative":
-            write_velocity_to_ofnative(writePath, t, uXInfl, uYInfl, uZInfl)
-        elif writer == "hdf5":
-            write_velocity_to_hdf5(writePath, t, uXInfl, uYInfl, uZInfl,
-                                   position)
-        else:
-            raise ValueError("Unknown writer")
+        with timers("write"):
+            if writer == "ofnative":
+                for i in range(len(batch)):
+                    future = write_velocity_to_ofnative(writePath, t[i],
+                                                        uInfl[i, 0],
+                                                        uInfl[i, 1],
+                                                        uInfl[i, 2],
+                                                        **writerOptions)
+                    if future is not None:
+                        pending.append(future)
+            elif writer in ["hdf5", "raw"]:
+                if writer == "hdf5":
+                    write = write_velocities_to_hdf5
+                else:
+                    write = write_velocities_to_raw
+
+                # Consecutive positions are written at once
+                for [start, end] in _consecutive_runs(batch):
+                    write(writePath, t[start:end], uInfl[start:end, 0],
+                          uInfl[start:end, 1], uInfl[start:end, 2],
+                          batch[start], **writerOptions)
+            else:
+                raise ValueError("Unknown writer")
+
+            # Limit the amount of data waiting to be written
+            while len(pending) > maxPendingWrites:
+                pending.pop(0).result()
+        timers.add_bytes("write", uInfl)
+
+    executor(batches, compute, consume, label="Interpolated",
+             timers=timers)
+
+    for future in pending:
+        future.result()
+
+
+def _bilinear(u, weightsY, weightsZ, orderInfl):
+    """Interpolate fields given on a rectilinear grid to the target
+    points, also forming a rectilinear grid. The last two axes of the
+    fields correspond to y and z.
+
+    """
+    uInfl = np.empty(u.shape[:-2] + (orderInfl.size,))
+    uInfl[..., orderInfl] = np.matmul(np.matmul(weightsY, u), weightsZ)
+    return uInfl
+
+
+def _consecutive_runs(positions):
+    """Split positions into runs of consecutive ones, returning the
+    start and end index of each run.
+
+    """
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    bounds = np.concatenate(([0], breaks, [len(positions)]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _distinct_values(coordinates, tolerance):
+    """Find the distinct values of a coordinate and the label of each
+    point, i.e. the position of its value among the distinct ones.
+
+    """
+    order = np.argsort(coordinates, kind="mergesort")
+    sortedCoordinates = coordinates[order]
+
+    labels = np.empty(coordinates.size, dtype=np.int64)
+    labels[order] = np.concatenate(
+        ([0], np.cumsum(np.diff(sortedCoordinates) > tolerance)))
+
+    # The mean of the values considered equal
+    values = np.bincount(labels, coordinates)/np.bincount(labels)
+    return [values, labels]
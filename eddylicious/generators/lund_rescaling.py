@@ -14,16 +14,23 @@ J. Comp. Phys. 1998; 140:233-58.
 from __future__ import print_function
 from __future__ import division
 import numpy as np
-from mpi4py import MPI
 from scipy.interpolate import interp1d
 from scipy.interpolate import interp2d
-from .helper_functions import chunks_and_offsets
+from .executors import get_executor
+from .timing import get_timers
+from .time_interpolation import time_interpolation_reader
+from .recycling import recycling_passes, recycling_shift, recycling_order
+from .recycling import cached_reader, defaultShift
 from ..writers.ofnative_writers import write_velocity_to_ofnative
 from ..writers.hdf5_writers import write_velocity_to_hdf5
+from ..writers.raw_writers import write_velocity_to_raw
 
 __all__ = ["lund_rescale_mean_velocity", "lund_rescale_fluctuations",
            "lund_generate"]
 
+# The maximum amount of unfinished background writes
+maxPendingWrites = 16
+
 
 def lund_rescale_mean_velocity(etaPrec, yPlusPrec,
                                uMeanXPrec, uMeanYPrec,
@@ -253,7 +260,11 @@ def lund_generate(readerFunction,
                   etaPrec, yPlusPrec, pointsZ,
                   etaInfl, yPlusInfl, pointsZInfl,
                   nInfl, gamma,
-                  times, blending):
+                  times, blending,
+                  positions=None, writerOptions=None,
+                  timeInterpolation=None, recycling=False,
+                  recyclingShift=defaultShift, recyclingReflect=False,
+                  executor=None, timers=None):
     """Generate the the inflow velocity using Lund's
     rescaling.
 
@@ -320,64 +331,157 @@ def lund_generate(readerFunction,
         precursor simulation.
     blending : ndarray
         The weights for blending the inner and outer profiles.
+    positions : ndarray, optional
+        The positions along the time axis of the inflow database that
+        should be generated. By default all the positions between t0
+        and tEnd are generated.
+    writerOptions : dict, optional
+        Additional keyword arguments passed on to the writer function.
+    timeInterpolation : str, optional
+        If "linear" or "cubic", the precursor velocity is interpolated
+        in time between the sampled frames. Position i along the time
+        axis is then associated with the time times[0] + i*dt in the
+        precursor. By default position i is associated with times[i].
+    recycling : bool, optional
+        Whether to start again from the beginning of the precursor
+        database when its end is reached, see
+        :mod:`~eddylicious.generators.recycling`. (default False)
+    recyclingShift : float, optional
+        The spanwise shift between two passes through the precursor
+        database, as a fraction of the spanwise period.
+    recyclingReflect : bool, optional
+        Whether to reflect the precursor velocity fields in the spanwise
+        direction every other pass. (default False)
+    executor : function, optional
+        The function distributing the work among processes, see
+        :func:`~eddylicious.generators.executors.get_executor`. By
+        default MPI is used if available.
+    timers : function, optional
+        The timers measuring the time spent reading, subtracting the
+        mean, rescaling and writing, see
+        :func:`~eddylicious.generators.timing.get_timers`.
+        By default nothing is measured.
 
     """
-    # Grab info regarding parallelization
-    comm = MPI.COMM_WORLD
-    rank = comm.Get_rank()
-    nProcs = comm.Get_size()
+    if executor is None:
+        executor = get_executor()
+
+    if timers is None:
+        timers = get_timers(False)
 
     # Get the total amount of rescalings to be done
     size = int((tEnd-t0)/dt+1)
-    
-    # Calculate the amount of rescalings each processor is responsible for
-    [chunks, offsets] = chunks_and_offsets(nProcs, size)
 
-    # Perform the rescaling
-    for i in range(chunks[rank]):
-        t = t0 + dt*i + dt*int(offsets[rank])
-        t = float(("{0:."+str(timePrecision)+"f}").format(t))
-        position = int(offsets[rank]) + i
+    if positions is None:
+        positions = np.arange(size)
 
-        if (rank == 0) and (np.mod(i, int(chunks[rank]/10)) == 0):
-            print("     Rescaled about "+str(int(i/chunks[rank]*100))+"%")
+    if writerOptions is None:
+        writerOptions = {}
 
-        # Read U data
-        if readerFunction.reader == "foamFile":
-            assert position < len(times)
-            [uPrimeX, uPrimeY, uPrimeZ] = readerFunction(times[position])
-        elif readerFunction.reader == "hdf5":
-            assert position < len(times)
-            [uPrimeX, uPrimeY, uPrimeZ] = readerFunction(position)
+    if timeInterpolation is not None:
+        readerFunction = time_interpolation_reader(readerFunction, times,
+                                                   timeInterpolation)
+        tPrec0 = np.min(np.asarray(times, dtype=np.float64))
+
+    # Positions using the same precursor time-steps are grouped together
+    if recycling:
+        if timeInterpolation is not None:
+            period = np.ptp(np.asarray(times, dtype=np.float64))/dt
         else:
-            raise ValueError("Unknown reader")
+            period = len(times)
+            readerFunction = cached_reader(readerFunction, times)
+        positions = recycling_order(positions, period)
+
+    # Writes performed in the background, which are not finished yet
+    pending = []
+
+    def compute(position):
+        """Rescale the velocity field for a position."""
+        recyclingPass = 0
+        location = position
+        if recycling:
+            [recyclingPass, location] = recycling_passes(position, period)
+
+        # Read U data
+        with timers("read"):
+            if timeInterpolation is not None:
+                [uPrimeX, uPrimeY, uPrimeZ] = \
+                    readerFunction(tPrec0 + dt*location)
+            elif recycling:
+                [uPrimeX, uPrimeY, uPrimeZ] = \
+                    readerFunction(int(round(location)))
+            elif readerFunction.reader == "foamFile":
+                assert position < len(times)
+                [uPrimeX, uPrimeY, uPrimeZ] = readerFunction(times[position])
+            elif readerFunction.reader == "hdf5":
+                assert position < len(times)
+                [uPrimeX, uPrimeY, uPrimeZ] = readerFunction(position)
+            else:
+                raise ValueError("Unknown reader")
+        timers.add_bytes("read", uPrimeX, uPrimeY, uPrimeZ)
+
+        # Reflect and shift the recycled fields along the spanwise index
+        if recyclingPass > 0:
+            if recyclingReflect and recyclingPass % 2 == 1:
+                uPrimeX = uPrimeX[:, ::-1]
+                uPrimeY = uPrimeY[:, ::-1]
+                uPrimeZ = -uPrimeZ[:, ::-1]
+
+            shift = int(round(recycling_shift(recyclingPass, recyclingShift) *
+                              uPrimeX.shape[1]))
+            uPrimeX = np.roll(uPrimeX, shift, axis=1)
+            uPrimeY = np.roll(uPrimeY, shift, axis=1)
+            uPrimeZ = np.roll(uPrimeZ, shift, axis=1)
 
         # Subtract mean
-        uPrimeX -= uMeanXPrec[:, np.newaxis]
-        uPrimeY -= uMeanYPrec[:, np.newaxis]
-
-        [uXInfl, uYInfl, uZInfl] = lund_rescale_fluctuations(etaPrec,
-                                                             yPlusPrec,
-                                                             pointsZ,
-                                                             uPrimeX,
-                                                             uPrimeY,
-                                                             uPrimeZ,
-                                                             gamma,
-                                                             etaInfl,
-                                                             yPlusInfl,
-                                                             pointsZInfl,
-                                                             nInfl,
-                                                             blending)
+        with timers("mean"):
+            uPrimeX -= uMeanXPrec[:, np.newaxis]
+            uPrimeY -= uMeanYPrec[:, np.newaxis]
+
+        with timers("rescale"):
+            [uXInfl, uYInfl, uZInfl] = \
+                lund_rescale_fluctuations(etaPrec, yPlusPrec, pointsZ,
+                                          uPrimeX, uPrimeY, uPrimeZ,
+                                          gamma,
+                                          etaInfl, yPlusInfl, pointsZInfl,
+                                          nInfl, blending)
 
         # Add mean
-        uXInfl += uMeanXInfl
-        uYInfl += uMeanYInfl
+        with timers("mean"):
+            uXInfl += uMeanXInfl
+            uYInfl += uMeanYInfl
+
+        return [uXInfl, uYInfl, uZInfl]
+
+    def consume(position, u):
+        """Write the velocity field for a position."""
+        [uXInfl, uYInfl, uZInfl] = u
+        t = t0 + dt*position
+        t = float(("{0:."+str(timePrecision)+"f}").format(t))
 
         # Write
-        if writer == "ofnative":
-            write_velocity_to_ofnative(writePath, t, uXInfl, uYInfl, uZInfl)
-        elif writer == "hdf5":
-            write_velocity_to_hdf5(writePath, t, uXInfl, uYInfl, uZInfl,
-                                   position)
-        else:
-            raise ValueError("Unknown writer")
+        with timers("write"):
+            if writer == "ofnative":
+                future = write_velocity_to_ofnative(writePath, t,
+                                                    uXInfl, uYInfl, uZInfl,
+                                                    **writerOptions)
+                if future is not None:
+                    pending.append(future)
+            elif writer == "hdf5":
+                write_velocity_to_hdf5(writePath, t, uXInfl, uYInfl, uZInfl,
+                                       position, **writerOptions)
+            elif writer == "raw":
+                write_velocity_to_raw(writePath, t, uXInfl, uYInfl, uZInfl,
+                                      position, **writerOptions)
+            else:
+                raise ValueError("Unknown writer")
+
+            # Limit the amount of data waiting to be written
+            while len(pending) > maxPendingWrites:
+                pending.pop(0).result()
+        timers.add_bytes("write", uXInfl, uYInfl, uZInfl)
+
+    executor(positions, compute, consume, label="Rescaled", timers=timers)
+
+    for future in pending:
+        future.result()
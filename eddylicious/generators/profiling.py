@@ -0,0 +1,119 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for profiling the scripts with cProfile, each process
+separately.
+
+"""
+from __future__ import print_function
+import cProfile
+import pstats
+
+__all__ = ["start_profiling", "stop_profiling", "get_rank_profile_path",
+           "merge_profiles"]
+
+
+def start_profiling():
+    """Start profiling the current process.
+
+    Returns
+    -------
+    cProfile.Profile
+        The enabled profiler.
+
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiling(profiler, profilePath, comm, nFunctions=30,
+                   sortKey="tottime", merge=True):
+    """Stop profiling and save the profile of each process. The first
+    process then merges the profiles and prints the most expensive
+    functions.
+
+    Parameters
+    ----------
+    profiler : cProfile.Profile
+        The profiler created by :func:`start_profiling`.
+    profilePath : str
+        The common beginning of the paths of the saved profiles, see
+        :func:`get_rank_profile_path`. The merged profile is saved to
+        profilePath.pstats.
+    comm : MPI communicator
+        The communicator of the processes, e.g. the attribute "comm" of
+        the executor.
+    nFunctions : int, optional
+        The amount of functions to print (default 30).
+    sortKey : str, optional
+        The key to sort the functions by, as for pstats.Stats.sort_stats.
+        By default the time spent in the function itself.
+    merge : bool, optional
+        Whether to merge the profiles, which waits for all the processes
+        (default True). Only the profile of each process is saved
+        otherwise, e.g. when the run failed and the other processes may
+        never arrive.
+
+    """
+    profiler.disable()
+    profiler.dump_stats(get_rank_profile_path(profilePath, comm.Get_rank()))
+
+    if not merge:
+        return
+
+    comm.Barrier()
+
+    if comm.Get_rank() == 0:
+        stats = merge_profiles([get_rank_profile_path(profilePath, rank)
+                                for rank in range(comm.Get_size())],
+                               profilePath + ".pstats")
+
+        print("Profile of " + str(comm.Get_size()) + " process(es), saved " +
+              "to " + profilePath + ".pstats")
+        stats.sort_stats(sortKey).print_stats(nFunctions)
+
+
+def get_rank_profile_path(profilePath, rank):
+    """Get the path to the profile of a process.
+
+    Parameters
+    ----------
+    profilePath : str
+        The common beginning of the paths of the profiles.
+    rank : int
+        The rank of the process.
+
+    Returns
+    -------
+    str
+        The path, profilePath.rankNNNNN.pstats.
+
+    """
+    return profilePath + ".rank{0:05d}.pstats".format(rank)
+
+
+def merge_profiles(paths, mergedPath=None):
+    """Merge the profiles saved by several processes.
+
+    Parameters
+    ----------
+    paths : list of str
+        The paths to the profiles.
+    mergedPath : str, optional
+        If provided, the merged profile is saved to this path.
+
+    Returns
+    -------
+    pstats.Stats
+        The merged profile.
+
+    """
+    stats = pstats.Stats(*paths)
+
+    if mergedPath is not None:
+        stats.dump_stats(mergedPath)
+
+    return stats
@@ -0,0 +1,151 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for recycling the precursor database, in order to generate
+inflow fields for a longer time-span than that of the database.
+
+Each time the end of the database is reached, the generation continues
+from its beginning. The precursor velocity fields are then shifted in
+the spanwise direction, by a different amount each pass, and optionally
+reflected, so that the generated fields do not simply repeat.
+
+"""
+from __future__ import division
+from collections import OrderedDict
+import numpy as np
+
+__all__ = ["recycling_passes", "recycling_shift", "recycling_order",
+           "cached_reader"]
+
+# The default shift between two passes, as a fraction of the spanwise
+# period. Using the golden ratio, the shifts of different passes differ.
+defaultShift = (3 - np.sqrt(5))/2
+
+
+def recycling_passes(positions, period):
+    """Compute the pass through the precursor database and the location
+    within the pass for positions along the time axis.
+
+    Parameters
+    ----------
+    positions : ndarray
+        The positions along the time axis of the inflow database.
+    period : float
+        The amount of positions covered by a single pass through the
+        precursor database. Equal to the amount of precursor time-steps,
+        or, when interpolating in time, the time-span of the precursor
+        divided by the time-step.
+
+    Returns
+    -------
+    List of ndarrays
+        The list contains 2 items
+
+        passes :
+        The pass for each position, starting from 0.
+
+        locations :
+        The location of each position within its pass, in the units of
+        positions.
+
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    passes = np.floor(positions/period + 1e-9).astype(np.int64)
+    locations = np.maximum(positions - passes*period, 0)
+
+    return [passes, locations]
+
+
+def recycling_shift(recyclingPass, shift=defaultShift):
+    """Compute the spanwise shift for a pass through the precursor
+    database.
+
+    Parameters
+    ----------
+    recyclingPass : int
+        The pass through the precursor database.
+    shift : float, optional
+        The shift between two consecutive passes, as a fraction of the
+        spanwise period.
+
+    Returns
+    -------
+    float
+        The shift as a fraction of the spanwise period, between 0
+        and 1.
+
+    """
+    return np.mod(recyclingPass*shift, 1.0)
+
+
+def recycling_order(positions, period):
+    """Order the positions according to their location within the pass.
+
+    The positions using the same precursor time-steps then follow each
+    other, so the time-steps are read only once, even if the positions
+    are distributed among several processes.
+
+    Parameters
+    ----------
+    positions : ndarray
+        The positions along the time axis of the inflow database.
+    period : float
+        The amount of positions covered by a single pass through the
+        precursor database, see :func:`recycling_passes`.
+
+    Returns
+    -------
+    ndarray
+        The reordered positions.
+
+    """
+    positions = np.asarray(positions)
+    locations = recycling_passes(positions, period)[1]
+
+    return positions[np.argsort(locations, kind='mergesort')]
+
+
+def cached_reader(readerFunction, times, cacheSize=1):
+    """Create a reader function of the index of the precursor time-step,
+    which keeps the last read time-steps in memory.
+
+    Parameters
+    ----------
+    readerFunction : function
+        The function to use for reading in data, generated by the
+        reader. Should contain the reader's name in the attribute
+        "reader".
+    times : list of floats or strings
+        The times for which the velocity field was sampled in the
+        precursor simulation.
+    cacheSize : int, optional
+        The maximum amount of time-steps kept in memory (default 1).
+
+    Returns
+    -------
+    function
+        A function of one variable (the time-index) that will perform
+        the reading. Copies of the cached arrays are returned, so they
+        can be modified.
+
+    """
+    cache = OrderedDict()
+
+    def read(timeIndex):
+        if timeIndex not in cache:
+            if readerFunction.reader == "foamFile":
+                cache[timeIndex] = readerFunction(times[timeIndex])
+            elif readerFunction.reader in ["hdf5", "raw"]:
+                cache[timeIndex] = readerFunction(timeIndex)
+            else:
+                raise ValueError("Unknown reader")
+
+            while len(cache) > cacheSize:
+                cache.popitem(last=False)
+
+        return [np.array(u) for u in cache[timeIndex]]
+
+    read.reader = readerFunction.reader
+    return read
@@ -0,0 +1,660 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions shared by the command-line scripts.
+
+All the scripts can measure and profile their run, see
+:func:`add_diagnostics_arguments` and :func:`run_with_diagnostics`.
+
+The rest is shared by the scripts generating inflow fields,
+runLundRescaling and runInterpolation. These parse the command-line
+arguments common to both scripts, create the executor distributing the
+work, and prepare the output database: creating it, or finding the
+time-steps it already contains when appending or resuming. After the
+generation, the output is finalised and the estimates of a dry run are
+reported.
+
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import h5py
+from .executors import get_executor
+from .executors import open_hdf5
+from .timing import get_timers
+from .timing import timing_summary
+from .timing import print_timing_summary
+from .timing import write_timing_json
+from .timing import write_trace
+from .profiling import start_profiling
+from .profiling import stop_profiling
+from .estimation import estimate_output_size
+from .estimation import peak_memory
+from .estimation import directory_size
+from .estimation import print_estimate
+from ..readers.raw_readers import read_header_raw
+from ..writers.ofnative_writers import write_points_to_ofnative
+from ..writers.ofnative_writers import get_written_times_ofnative
+from ..writers.hdf5_writers import write_points_to_hdf5
+from ..writers.hdf5_writers import create_velocity_datasets_hdf5
+from ..writers.hdf5_writers import extend_velocity_datasets_hdf5
+from ..writers.hdf5_writers import get_written_positions_hdf5
+from ..writers.hdf5_writers import get_rank_file_path_hdf5
+from ..writers.hdf5_writers import get_rank_file_paths_hdf5
+from ..writers.hdf5_writers import create_virtual_datasets_hdf5
+from ..writers.raw_writers import write_points_to_raw
+from ..writers.raw_writers import create_velocity_files_raw
+from ..writers.raw_writers import extend_velocity_files_raw
+from ..writers.raw_writers import get_written_positions_raw
+
+__all__ = ["add_diagnostics_arguments", "start_diagnostics",
+           "finish_diagnostics", "run_with_diagnostics",
+           "add_generator_arguments", "get_generator_executor",
+           "set_up_dry_run", "set_write_path", "prepare_output",
+           "finish_output", "report_dry_run"]
+
+
+def add_diagnostics_arguments(parser,
+                              stages="reading, computing and writing"):
+    """Add the command-line arguments measuring and profiling a run.
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        The parser of the script.
+    stages : str, optional
+        The measured stages, as listed in the help of --timing.
+
+    """
+    parser.add_argument('--timing',
+                        action='store_true',
+                        help='Measure the time spent '+stages+', and \
+                              print a summary.')
+    parser.add_argument('--timingfile',
+                        type=str,
+                        help='A JSON file to save the timing summary to, \
+                              implies --timing.')
+    parser.add_argument('--tracefile',
+                        type=str,
+                        help='A JSON file to save the timeline of the \
+                              run to, in the trace event format viewable \
+                              in chrome://tracing or Perfetto. Implies \
+                              --timing.')
+    parser.add_argument('--profile',
+                        type=str,
+                        nargs='?',
+                        const='profile',
+                        metavar='PATH',
+                        help='Profile each process with cProfile, saving \
+                              the profiles to PATH.rankNNNNN.pstats and \
+                              the merged one to PATH.pstats (default \
+                              PATH is profile).')
+
+
+def start_diagnostics(args, enabled=False):
+    """Create the timers and start profiling, as requested by the
+    command-line arguments, see :func:`add_diagnostics_arguments`.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed command-line arguments.
+    enabled : bool, optional
+        Whether to enable the timers even if not requested, e.g. for a
+        dry run.
+
+    Returns
+    -------
+    List
+        The timers, see :func:`~eddylicious.generators.timing.get_timers`,
+        and the profiler, None if profiling is not requested.
+
+    """
+    timers = get_timers(enabled or args.timing or
+                        args.timingfile is not None,
+                        trace=args.tracefile is not None)
+
+    profiler = None
+    if args.profile is not None:
+        profiler = start_profiling()
+
+    return [timers, profiler]
+
+
+def finish_diagnostics(args, timers, profiler, comm, completed=True):
+    """Report the timings, save the trace and stop profiling, as
+    requested by the command-line arguments.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        The parsed command-line arguments.
+    timers : function
+        The timers, see :func:`start_diagnostics`.
+    profiler : cProfile.Profile
+        The profiler, see :func:`start_diagnostics`.
+    comm : MPI.Comm
+        The communicator, e.g. the attribute "comm" of an executor.
+    completed : bool, optional
+        Whether the run completed. If not, only the profile of each
+        process is saved, since the other processes may never arrive.
+
+    """
+    try:
+        if completed and timers.enabled:
+            summary = timing_summary(timers, comm)
+            if comm.Get_rank() == 0:
+                print_timing_summary(summary)
+                if args.timingfile is not None:
+                    write_timing_json(summary, args.timingfile)
+
+        if completed and args.tracefile is not None:
+            write_trace(timers, comm, args.tracefile)
+    finally:
+        if profiler is not None:
+            stop_profiling(profiler, args.profile, comm, merge=completed)
+
+
+def run_with_diagnostics(run, args, comm, enabled=False):
+    """Run the body of a script, measuring and profiling it as requested
+    by the command-line arguments.
+
+    The profile of each process is saved even if the run raises an
+    exception.
+
+    Parameters
+    ----------
+    run : function
+        The body of the script, a function of the timers.
+    args : argparse.Namespace
+        The parsed command-line arguments, see
+        :func:`add_diagnostics_arguments`.
+    comm : MPI.Comm
+        The communicator, e.g. the attribute "comm" of an executor.
+    enabled : bool, optional
+        Whether to enable the timers even if not requested.
+
+    """
+    [timers, profiler] = start_diagnostics(args, enabled)
+
+    completed = False
+    try:
+        run(timers)
+        completed = True
+    finally:
+        finish_diagnostics(args, timers, profiler, comm, completed)
+
+
+def add_generator_arguments(parser):
+    """Add the command-line arguments shared by the generation scripts,
+    including those of :func:`add_diagnostics_arguments`.
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        The parser of the script.
+
+    """
+    parser.add_argument('--config',
+                        type=str,
+                        help='The config file',
+                        required=True)
+    parser.add_argument('--append',
+                        action='store_true',
+                        help='Extend an existing inflow database, only \
+                              generating the time-steps it does not \
+                              contain.')
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='Resume an interrupted run, only generating \
+                              the time-steps missing from the existing \
+                              database.')
+    parser.add_argument('--backend',
+                        type=str,
+                        choices=['auto', 'mpi', 'pool', 'serial'],
+                        help='How to distribute the work among processes, \
+                              overrides the backend in the config file.')
+    add_diagnostics_arguments(parser)
+    parser.add_argument('--dry-run',
+                        type=int,
+                        nargs='?',
+                        const=4,
+                        metavar='N',
+                        help='Generate N time-steps per process (default \
+                              4) into a temporary directory, removed at \
+                              the end, and estimate the runtime, output \
+                              size and peak memory of the full run.')
+
+
+def get_generator_executor(config, args):
+    """Create the executor distributing the work.
+
+    The backend is given by the command-line arguments or the config
+    file, the amount of processes of the pool, the size of the blocks
+    and the schedule by the config file, see
+    :func:`~eddylicious.generators.executors.get_executor`.
+
+    Parameters
+    ----------
+    config : dict
+        The parsed config file.
+    args : argparse.Namespace
+        The parsed command-line arguments, see
+        :func:`add_generator_arguments`.
+
+    Returns
+    -------
+    function
+        The executor.
+
+    """
+    backend = args.backend
+    if backend is None:
+        backend = config.get("backend", "auto")
+    nWorkers = config.get("nWorkers", None)
+    if nWorkers is not None:
+        nWorkers = int(nWorkers)
+    blockSize = int(config.get("blockSize", 8))
+    schedule = config.get("schedule", "dynamic")
+
+    return get_executor(backend, nWorkers, blockSize, schedule)
+
+
+def set_up_dry_run(config, args, comm):
+    """Redirect the output of a dry run into a temporary directory.
+
+    The directory is created in the write path if it exists, and the
+    write path in the config is replaced by it. Appending and resuming
+    are disabled.
+
+    Parameters
+    ----------
+    config : dict
+        The parsed config file, modified in place.
+    args : argparse.Namespace
+        The parsed command-line arguments, modified in place.
+    comm : MPI.Comm
+        The communicator, e.g. the attribute "comm" of an executor.
+
+    Returns
+    -------
+    str
+        The original write path.
+
+    """
+    outputPath = config["writePath"]
+    scratchPath = None
+    if comm.Get_rank() == 0:
+        scratchPath = tempfile.mkdtemp(
+            prefix="dryRun",
+            dir=outputPath if os.path.isdir(outputPath) else None)
+    config["writePath"] = comm.bcast(scratchPath, root=0)
+    args.append = False
+    args.resume = False
+
+    return outputPath
+
+
+def set_write_path(config, executor, keep=False):
+    """Set the writePath variable in concordance with the writer.
+
+    For the ofnative writer: the path to constant/boundaryData directory.
+    For the hdf5 writer: the hdf5 file itself, or, if hdf5Output is
+    perRank, the file written by this process.
+    For the raw writer: the directory of the store.
+
+    If keep is True, an existing hdf5 file is kept.
+
+    """
+    comm = executor.comm
+    rank = comm.Get_rank()
+    writer = config["writer"]
+    writePath = config["writePath"]
+
+    if writer == "ofnative":
+        inletPatchName = config["inletPatchName"]
+        writePath = os.path.join(writePath, "constant", "boundaryData",
+                                 inletPatchName)
+        if rank == 0:
+            if not os.path.exists(writePath):
+                os.makedirs(writePath)
+
+    elif writer == "hdf5":
+        writePath = os.path.join(writePath, config["hdf5FileName"])
+        # If the hdf5 file exists, delete it, unless we should keep it.
+        if rank == 0 and os.path.isfile(writePath) and not keep:
+            print("HDF5 database already exists. It it will be overwritten.")
+            os.remove(writePath)
+
+        if config.get("hdf5Output", "single") == "perRank":
+            if keep and os.path.isfile(writePath):
+                with h5py.File(writePath, 'r') as hdf5File:
+                    if ("velocity" in hdf5File and
+                            not hdf5File["velocity"].is_virtual):
+                        raise ValueError("The existing HDF5 database was "
+                                         "not written with hdf5Output "
+                                         "perRank.")
+
+            if rank == 0:
+                if not keep:
+                    for rankPath in get_rank_file_paths_hdf5(writePath):
+                        os.remove(rankPath)
+                if not os.path.exists(writePath+".ranks"):
+                    os.makedirs(writePath+".ranks")
+            comm.Barrier()
+
+            # Each process writes to its own file, no parallel HDF5 needed
+            writePath = h5py.File(get_rank_file_path_hdf5(writePath, rank),
+                                  'a')
+        else:
+            # We change the writePath to be the hdf5 file itself
+            writePath = open_hdf5(writePath, 'a', executor)
+    elif writer == "raw":
+        writePath = os.path.join(writePath, config["rawStoreName"])
+        if rank == 0:
+            # The whole store is removed, it may lack the header or
+            # contain stale files after an interrupted run
+            if os.path.isdir(writePath) and not keep:
+                print("Raw store already exists. It will be overwritten.")
+                shutil.rmtree(writePath)
+            if not os.path.exists(writePath):
+                os.makedirs(writePath)
+        comm.Barrier()
+    else:
+        raise ValueError("Unknown writer: "+writer)
+
+    return writePath
+
+
+def prepare_output(config, executor, size, pointsYInfl, pointsZInfl,
+                   xOrigin, append=False, resume=False, dryRun=None):
+    """Prepare the output database and find the time-steps to generate.
+
+    A new database is created with the points of the inflow plane. When
+    appending or resuming, the time-steps contained in the existing
+    database are found instead, and the database is extended if needed.
+
+    Parameters
+    ----------
+    config : dict
+        The parsed config file, providing the writer, the write path,
+        the time-step, the initial time, and the options of the output.
+    executor : function
+        The function distributing the work, see
+        :func:`~eddylicious.generators.executors.get_executor`.
+    size : int
+        The amount of time-steps of the database.
+    pointsYInfl : ndarray
+        The y coordinates of the points of the inflow plane.
+    pointsZInfl : ndarray
+        The z coordinates of the points of the inflow plane.
+    xOrigin : float
+        The x coordinate of the inflow plane.
+    append : bool, optional
+        Whether to only generate the time-steps following those contained
+        in the existing database.
+    resume : bool, optional
+        Whether to only generate the time-steps missing from the existing
+        database.
+    dryRun : int, optional
+        For a dry run, the amount of time-steps generated per process.
+        The database is created with only the generated time-steps.
+
+    Returns
+    -------
+    List
+        The write path, see :func:`set_write_path`, the positions along
+        the time axis to generate, and the options of the writer.
+
+    """
+    comm = executor.comm
+    rank = comm.Get_rank()
+    nProcs = comm.Get_size()
+    writer = config["writer"]
+    t0 = float(config["t0"])
+    dt = float(config["dt"])
+
+    # Compression of the output
+    compression = config.get("compression", None)
+    if compression == "none":
+        compression = None
+    compressionLevel = config.get("compressionLevel", None)
+    if compressionLevel is not None:
+        compressionLevel = int(compressionLevel)
+
+    # Whether each process writes its own hdf5 file
+    hdf5Output = config.get("hdf5Output", "single")
+    if hdf5Output not in ["single", "perRank"]:
+        raise ValueError("Unknown hdf5Output: "+hdf5Output)
+    if writer == "hdf5":
+        hdf5Path = os.path.join(config["writePath"], config["hdf5FileName"])
+
+    # Parallel HDF5 writes to compressed datasets only collectively, while
+    # the processes write their time-steps independently
+    sharedHdf5 = writer == "hdf5" and hdf5Output == "single" and \
+        executor.backend == "mpi" and nProcs > 1
+    if sharedHdf5 and compression is not None:
+        raise ValueError("Compression of the hdf5 output with several MPI "
+                         "processes requires hdf5Output perRank.")
+
+    # A dry run only allocates the time-steps it generates, the size of
+    # the full database is extrapolated from them
+    nTimes = size
+    if dryRun is not None:
+        nTimes = min(dryRun*executor.nProcs, size)
+
+    # Get the write path appropriate for the reader
+    writePath = set_write_path(config, executor, append or resume)
+
+    # The time-steps already present in the database
+    nExisting = 0
+    writtenPositions = np.array([], dtype=np.int64)
+
+    if writer == "ofnative":
+        if rank == 0:
+            write_points_to_ofnative(os.path.join(writePath, "points"),
+                                     pointsYInfl, pointsZInfl, xOrigin)
+        if append or resume:
+            writtenTimes = get_written_times_ofnative(writePath)
+            writtenPositions = np.rint((writtenTimes - t0)/dt).astype(np.int64)
+            if writtenPositions.size:
+                nExisting = writtenPositions[-1] + 1
+    elif writer == "hdf5":
+        if (append or resume) and "velocity" in writePath:
+            if writePath["velocity"].shape[1] != pointsZInfl.size:
+                raise ValueError("The number of points in the existing "
+                                 "database does not match the inflow "
+                                 "geometry.")
+            if sharedHdf5 and writePath["velocity"].compression is not None:
+                raise ValueError("The existing HDF5 database is compressed, "
+                                 "which requires hdf5Output perRank to "
+                                 "extend it with several MPI processes.")
+            nExisting = writePath["time"].shape[0]
+            writtenPositions = get_written_positions_hdf5(writePath)
+            extend_velocity_datasets_hdf5(writePath, max(size, nExisting))
+        else:
+            chunkSize = config.get("hdf5ChunkSize", None)
+            if chunkSize is not None:
+                chunkSize = int(chunkSize)
+
+            create_velocity_datasets_hdf5(writePath, nTimes, pointsZInfl.size,
+                                          t0, chunkSize=chunkSize,
+                                          compression=compression,
+                                          compressionLevel=compressionLevel)
+            write_points_to_hdf5(writePath, pointsYInfl, pointsZInfl, xOrigin)
+
+    elif writer == "raw":
+        headerExists = os.path.isfile(os.path.join(writePath, "header.json"))
+        if (append or resume) and headerExists:
+            if read_header_raw(writePath)["nPoints"] != pointsZInfl.size:
+                raise ValueError("The number of points in the existing "
+                                 "database does not match the inflow "
+                                 "geometry.")
+            nExisting = read_header_raw(writePath)["nTimes"]
+            writtenPositions = get_written_positions_raw(writePath)
+
+        comm.Barrier()
+
+        if rank == 0:
+            if (append or resume) and headerExists:
+                extend_velocity_files_raw(writePath, max(size, nExisting))
+            else:
+                create_velocity_files_raw(writePath, nTimes, pointsZInfl.size,
+                                          t0, config.get("rawDtype",
+                                                         "float64"))
+                write_points_to_raw(writePath, pointsYInfl, pointsZInfl,
+                                    xOrigin)
+        comm.Barrier()
+
+    # With per-process files, the existing time-steps are scattered
+    # across the files, including those of processes no longer present
+    if writer == "hdf5" and hdf5Output == "perRank" and (append or resume):
+        if rank == 0:
+            ownPaths = [get_rank_file_path_hdf5(hdf5Path, i)
+                        for i in range(nProcs)]
+            for rankPath in get_rank_file_paths_hdf5(hdf5Path):
+                if rankPath in ownPaths:
+                    continue
+                with h5py.File(rankPath, 'r') as rankFile:
+                    nExisting = max(nExisting, rankFile["time"].shape[0])
+                    writtenPositions = np.union1d(
+                        writtenPositions,
+                        get_written_positions_hdf5(rankFile))
+
+        existing = comm.allgather((nExisting, writtenPositions))
+        nExisting = max([i[0] for i in existing])
+        writtenPositions = np.unique(np.concatenate([i[1]
+                                                     for i in existing]))
+
+    writerOptions = {}
+
+    # The raw writers map the files given by the header, read only once
+    if writer == "raw":
+        writerOptions["header"] = read_header_raw(writePath)
+
+    # Compress the ofnative output in a pool of threads
+    if writer == "ofnative" and compression is not None:
+        writerOptions["compression"] = compression
+        if compressionLevel is not None:
+            writerOptions["compressionLevel"] = compressionLevel
+        # In a dry run the compression is timed as a part of writing
+        if dryRun is None:
+            writerOptions["executor"] = \
+                ThreadPoolExecutor(int(config.get("writeThreads", 4)))
+
+    if resume:
+        positions = np.setdiff1d(np.arange(nTimes), writtenPositions)
+    else:
+        positions = np.arange(nExisting, nTimes)
+
+    if resume and rank == 0:
+        print("Resuming, "+str(positions.size)+" of "+str(size) +
+              " time-steps are missing.")
+    elif append and rank == 0:
+        print("Appending "+str(positions.size)+" time-steps to the "
+              "existing "+str(nExisting)+".")
+
+    return [writePath, positions, writerOptions]
+
+
+def finish_output(config, executor, writePath, writerOptions, timers=None):
+    """Finalise the output database once the time-steps are generated.
+
+    Waits for the compression of the ofnative output and for the other
+    processes, closes the hdf5 file and, if hdf5Output is perRank, exposes
+    the files of the processes as a single database.
+
+    Parameters
+    ----------
+    config : dict
+        The parsed config file.
+    executor : function
+        The function distributing the work, see
+        :func:`~eddylicious.generators.executors.get_executor`.
+    writePath : str or h5py.File
+        The write path, see :func:`prepare_output`.
+    writerOptions : dict
+        The options of the writer, see :func:`prepare_output`.
+    timers : function, optional
+        The timers measuring the time spent waiting for the others.
+
+    """
+    if timers is None:
+        timers = get_timers(False)
+
+    comm = executor.comm
+    rank = comm.Get_rank()
+    writer = config["writer"]
+
+    if "executor" in writerOptions:
+        writerOptions["executor"].shutdown()
+
+    if rank == 0:
+        print("Process 0 done, waiting for the others...")
+
+    if writer == "hdf5":
+        writePath.close()
+
+    with timers("barrier"):
+        comm.Barrier()
+
+    # Expose the per-process files as a single database
+    if writer == "hdf5" and config.get("hdf5Output", "single") == "perRank" \
+            and rank == 0:
+        hdf5Path = os.path.join(config["writePath"], config["hdf5FileName"])
+        with h5py.File(hdf5Path, 'a') as hdf5File:
+            create_virtual_datasets_hdf5(hdf5File,
+                                         get_rank_file_paths_hdf5(hdf5Path))
+
+    if rank == 0:
+        print("Done\n")
+
+
+def report_dry_run(config, executor, timers, nSample, size, nPoints,
+                   setupTime, outputPath):
+    """Report the estimates of a dry run and remove its output.
+
+    The cost of the full run is estimated from the timings of the dry
+    run, see :func:`~eddylicious.generators.estimation.print_estimate`,
+    and the temporary directory is removed.
+
+    Parameters
+    ----------
+    config : dict
+        The parsed config file.
+    executor : function
+        The function distributing the work.
+    timers : function
+        The timers of the run, enabled.
+    nSample : int
+        The amount of generated time-steps.
+    size : int
+        The amount of time-steps of the full database.
+    nPoints : int
+        The amount of points of the inflow plane.
+    setupTime : float
+        The time spent before the generation started.
+    outputPath : str
+        The original write path, see :func:`set_up_dry_run`.
+
+    """
+    comm = executor.comm
+    writer = config["writer"]
+
+    summary = timing_summary(timers, comm)
+    memory = comm.gather(peak_memory(), root=0)
+    if comm.Get_rank() == 0:
+        rawDtype = config.get("rawDtype", "float64")
+        # The size of the time-steps, without the points
+        writtenSize = directory_size(config["writePath"]) - \
+            estimate_output_size(writer, nPoints, 0, rawDtype)
+        print_estimate(summary, nSample, size, nPoints, writer,
+                       executor.nProcs, executor.backend, setupTime,
+                       memory, max(0, writtenSize), outputPath, rawDtype)
+        shutil.rmtree(config["writePath"])
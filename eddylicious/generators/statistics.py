@@ -0,0 +1,756 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for computing the statistics of a database of fields in a
+single pass over the time-steps, used by the statistics utilities.
+
+The statistics are accumulated as partial moments: the amount of
+samples, the mean and the sum of the squared deviations from the mean.
+The partial moments of a block of time-steps are computed from the
+values in memory, and the partial moments of different blocks, or of
+different processes, are then merged using the formulas of Chan et al.
+Unlike sums of squares, this does not suffer from cancellation when the
+fluctuations are small compared to the mean.
+
+Optionally, the sums of the products of the deviations of different
+components, and the sums of the third and fourth powers of the
+deviations, are accumulated as well, merged using the formulas of
+Pebay.
+
+The spanwise spectra are accumulated in the same way, as the partial
+moments of the Fourier coefficients along z. The spectra of the
+fluctuations are the variances of the coefficients, and the two-point
+correlations along z their inverse transforms.
+
+Since merging is exact, the partial moments can be saved in the stats
+group of the database, along with the positions along the time axis
+they include. After time-steps are appended to the database, only these
+have to be processed and merged with the saved partial moments.
+
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import numpy as np
+import h5py
+from .executors import broadcast_array
+from .executors import call_on_root
+from .timing import get_timers
+from ..readers.foamfile_readers import read_points_foamfile
+from ..readers.foamfile_readers import read_times_foamfile
+from ..readers.foamfile_readers import read_velocity_foamfile
+from ..readers.ofnative_readers import read_points_ofnative
+from ..readers.ofnative_readers import read_times_ofnative
+from ..readers.ofnative_readers import read_velocity_ofnative
+from ..writers.hdf5_writers import write_statistics_to_hdf5
+
+__all__ = ["block_moments", "merge_moments", "reduce_moments",
+           "time_blocks", "moments_statistics", "write_spanwise_averages",
+           "block_spectra", "spectra_statistics", "write_spectra",
+           "position_blocks", "read_statistics_cache",
+           "write_statistics_cache", "open_text_database",
+           "accumulate_statistics", "write_statistics",
+           "symmTensorComponents"]
+
+# The components of the products of the deviations when the cross terms
+# are accumulated, in the order of OpenFOAM's symmTensor
+symmTensorComponents = ["XX", "XY", "XZ", "YY", "YZ", "ZZ"]
+_symmTensorPairs = [(0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2)]
+
+
+def block_moments(u, crossTerms=False, order=2):
+    """Compute the partial moments of a block of samples.
+
+    Parameters
+    ----------
+    u : ndarray
+        The samples, the first axis being the time. If crossTerms is
+        True or order is larger than 2, the last axis should contain the
+        three components of the velocity. Complex samples are supported
+        only if both are left at their defaults, "m2" is then the sum of
+        the squared magnitudes of the deviations.
+    crossTerms : bool, optional
+        Whether to accumulate the products of the deviations of different
+        components, i.e. the whole Reynolds stress tensor (default
+        False).
+    order : int, optional
+        The highest order of the accumulated moments, 2 (default), 3 or
+        4.
+
+    Returns
+    -------
+    dict
+        The partial moments, with the keys "count", the amount of
+        samples, "mean", the mean along the time axis, and "m2", the sum
+        of the squared deviations from the mean. If crossTerms is True,
+        the last axis of "m2" contains the sums of products of the
+        components listed in :data:`symmTensorComponents`. The sums of
+        the third and fourth powers of the deviations are stored under
+        "m3" and "m4". None if there are no samples.
+
+    """
+    if np.iscomplexobj(u):
+        u = np.asarray(u, dtype=np.complex128)
+    else:
+        u = np.asarray(u, dtype=np.float64)
+    if u.shape[0] == 0:
+        return None
+
+    mean = np.mean(u, axis=0)
+    deviation = u - mean
+
+    moments = {"count": u.shape[0], "mean": mean}
+    if crossTerms:
+        moments["m2"] = np.stack([np.sum(deviation[..., i]*deviation[..., j],
+                                         axis=0)
+                                  for [i, j] in _symmTensorPairs], axis=-1)
+    else:
+        moments["m2"] = np.sum(np.abs(deviation)**2, axis=0)
+
+    for power in range(3, order + 1):
+        moments["m"+str(power)] = np.sum(deviation**power, axis=0)
+
+    return moments
+
+
+def merge_moments(moments, otherMoments):
+    """Merge the partial moments of two disjoint sets of samples.
+
+    Parameters
+    ----------
+    moments : dict
+        The partial moments of the first set, see :func:`block_moments`,
+        or None for an empty set.
+    otherMoments : dict
+        The partial moments of the second set, accumulated in the same
+        way, or None.
+
+    Returns
+    -------
+    dict
+        The partial moments of the union of the sets.
+
+    """
+    if moments is None:
+        return otherMoments
+    if otherMoments is None:
+        return moments
+
+    nA = moments["count"]
+    nB = otherMoments["count"]
+    n = nA + nB
+    delta = otherMoments["mean"] - moments["mean"]
+
+    merged = {"count": n, "mean": moments["mean"] + delta*(nB/n)}
+
+    # The sums of the squared deviations of each component, needed by the
+    # higher moments, are a part of the cross terms
+    crossTerms = moments["m2"].shape != delta.shape
+    if crossTerms:
+        deltaProducts = np.stack([delta[..., i]*delta[..., j]
+                                  for [i, j] in _symmTensorPairs], axis=-1)
+        diagonal = [0, 3, 5]
+        m2A = moments["m2"][..., diagonal]
+        m2B = otherMoments["m2"][..., diagonal]
+    else:
+        deltaProducts = np.abs(delta)**2
+        m2A = moments["m2"]
+        m2B = otherMoments["m2"]
+
+    merged["m2"] = moments["m2"] + otherMoments["m2"] + \
+        deltaProducts*(nA*nB/n)
+
+    if "m3" in moments:
+        m3A = moments["m3"]
+        m3B = otherMoments["m3"]
+        merged["m3"] = m3A + m3B + delta**3*(nA*nB*(nA - nB)/n**2) + \
+            3*delta*(nA*m2B - nB*m2A)/n
+
+    if "m4" in moments:
+        merged["m4"] = moments["m4"] + otherMoments["m4"] + \
+            delta**4*(nA*nB*(nA**2 - nA*nB + nB**2)/n**3) + \
+            6*delta**2*(nA**2*m2B + nB**2*m2A)/n**2 + \
+            4*delta*(nA*m3B - nB*m3A)/n
+
+    return merged
+
+
+def reduce_moments(moments, comm, root=0):
+    """Merge the partial moments accumulated by all the processes.
+
+    The moments are merged pairwise along a tree, so the memory needed by
+    each process does not grow with the amount of processes.
+
+    Parameters
+    ----------
+    moments : dict
+        The partial moments of this process, see :func:`block_moments`,
+        or None if it has processed no samples.
+    comm : MPI.Comm
+        The communicator, e.g. the attribute "comm" of an executor, see
+        :func:`~eddylicious.generators.executors.get_executor`.
+    root : int, optional
+        The process receiving the result (default 0).
+
+    Returns
+    -------
+    dict
+        The partial moments of all the samples on the root process, None
+        on the others.
+
+    """
+    return comm.reduce(moments, op=merge_moments, root=root)
+
+
+def time_blocks(size, blockSize):
+    """Split the time-steps of a database into blocks of consecutive
+    time-steps, which are read with a single call.
+
+    Parameters
+    ----------
+    size : int
+        The amount of time-steps.
+    blockSize : int
+        The largest amount of time-steps in a block.
+
+    Returns
+    -------
+    list of slices
+        The blocks.
+
+    """
+    return position_blocks(np.arange(size), blockSize)
+
+
+def position_blocks(positions, blockSize):
+    """Split positions along the time axis into blocks of consecutive
+    positions, see :func:`time_blocks`.
+
+    Parameters
+    ----------
+    positions : ndarray
+        The sorted positions.
+    blockSize : int
+        The largest amount of positions in a block.
+
+    Returns
+    -------
+    list of slices
+        The blocks, each containing consecutive positions only.
+
+    """
+    blockSize = max(1, int(blockSize))
+    positions = np.asarray(positions, dtype=np.int64)
+
+    # The beginnings of the runs of consecutive positions
+    starts = np.flatnonzero(np.diff(positions) != 1) + 1
+    starts = np.concatenate(([0], starts, [positions.size]))
+
+    blocks = []
+    for [start, end] in zip(starts[:-1], starts[1:]):
+        for blockStart in range(start, end, blockSize):
+            blockEnd = min(blockStart + blockSize, end)
+            blocks.append(slice(int(positions[blockStart]),
+                                int(positions[blockEnd - 1]) + 1))
+    return blocks
+
+
+def moments_statistics(moments):
+    """Compute the statistics from the partial moments of all the
+    samples.
+
+    Parameters
+    ----------
+    moments : dict
+        The partial moments, see :func:`block_moments`.
+
+    Returns
+    -------
+    dict
+        The mean "uMean", the central second moments "uPrime2Mean" and,
+        if accumulated, the central third and fourth moments
+        "uPrime3Mean" and "uPrime4Mean".
+
+    """
+    count = moments["count"]
+    statistics = {"uMean": moments["mean"],
+                  "uPrime2Mean": moments["m2"]/count}
+    for power in [3, 4]:
+        if "m"+str(power) in moments:
+            statistics["uPrime"+str(power)+"Mean"] = \
+                moments["m"+str(power)]/count
+    return statistics
+
+
+def write_spanwise_averages(writePath, y, statistics):
+    """Average the statistics along z and write each component into a
+    text file, as uMeanX, uPrime2MeanXY, uPrime3MeanZ etc.
+
+    Parameters
+    ----------
+    writePath : str
+        The directory where to write the files, created if needed.
+    y : ndarray
+        The values of y of the rows of the statistics, written into the
+        file y.
+    statistics : dict
+        The statistics, see :func:`moments_statistics`, each a 3d array,
+        the axes corresponding to y, z and the components.
+
+    """
+    if not os.path.exists(writePath):
+        os.makedirs(writePath)
+
+    np.savetxt(os.path.join(writePath, "y"), y)
+
+    for name in sorted(statistics):
+        profiles = np.mean(statistics[name], axis=1)
+        if profiles.shape[-1] == len(symmTensorComponents):
+            components = symmTensorComponents
+        elif name == "uPrime2Mean":
+            components = ["XX", "YY", "ZZ"]
+        else:
+            components = ["X", "Y", "Z"]
+
+        for i, component in enumerate(components):
+            np.savetxt(os.path.join(writePath, name+component),
+                       profiles[:, i])
+
+
+def block_spectra(u, axis):
+    """Compute the partial moments of the Fourier coefficients of a block
+    of samples along the spanwise direction.
+
+    Parameters
+    ----------
+    u : ndarray
+        The samples, the first axis being the time. The values along the
+        spanwise axis should be equidistant, the direction is assumed to
+        be periodic.
+    axis : int
+        The spanwise axis of u.
+
+    Returns
+    -------
+    dict
+        The partial moments of the coefficients of the real Fourier
+        transform along the spanwise axis, see :func:`block_moments`.
+
+    """
+    return block_moments(np.fft.rfft(u, axis=axis))
+
+
+def spectra_statistics(moments, nPointsZ, lengthZ, axis):
+    """Compute the spanwise spectra and the two-point correlations of the
+    fluctuations from the partial moments of the Fourier coefficients.
+
+    Parameters
+    ----------
+    moments : dict
+        The partial moments of the Fourier coefficients of all the
+        samples, see :func:`block_spectra`.
+    nPointsZ : int
+        The amount of points along z.
+    lengthZ : float
+        The spanwise size of the domain, i.e. the amount of points along
+        z times their distance.
+    axis : int
+        The spanwise axis of the moments, i.e. that of the samples minus
+        one.
+
+    Returns
+    -------
+    dict
+        The wavenumbers "kz" and the one-sided spectral densities "E",
+        which integrate to the variance along the wavenumber axis. The
+        spanwise separations "dz", up to half of the domain, and the
+        two-point correlation coefficients "R" for them. The axes of "E"
+        and "R" correspond to those of the moments.
+
+    """
+    # The variance of each coefficient is the mean squared magnitude of
+    # the coefficient of the fluctuations
+    power = moments["m2"]/moments["count"]
+    nModes = power.shape[axis]
+    dk = 2*np.pi/lengthZ
+
+    # The energy of the negative wavenumbers is added to the positive
+    # ones, the mean and the Nyquist wavenumber have no counterpart
+    weights = 2*np.ones(nModes)
+    weights[0] = 1
+    if nPointsZ % 2 == 0:
+        weights[-1] = 1
+    shape = [1]*power.ndim
+    shape[axis] = nModes
+    energy = np.reshape(weights, shape)*power/nPointsZ**2
+
+    # The spanwise average of the products of the fluctuations at points
+    # separated by dz
+    covariance = np.fft.irfft(power, n=nPointsZ, axis=axis)/nPointsZ
+    covariance = np.take(covariance, np.arange(nPointsZ//2 + 1), axis=axis)
+    variance = np.take(covariance, [0], axis=axis)
+
+    return {"kz": np.arange(nModes)*dk,
+            "E": energy/dk,
+            "dz": np.arange(nPointsZ//2 + 1)*lengthZ/nPointsZ,
+            "R": covariance/np.where(variance == 0, 1, variance)}
+
+
+def write_spectra(writePath, spectra):
+    """Write the spanwise spectra and two-point correlations of each
+    component into text files, as Euu and Ruu for the streamwise one.
+
+    Parameters
+    ----------
+    writePath : str
+        The directory where to write the files, created if needed.
+    spectra : dict
+        The spectra, see :func:`spectra_statistics`, the axes of "E" and
+        "R" corresponding to y, z and the components. Written as 2d
+        arrays with a row for each value of y, along with the
+        wavenumbers into kz and the separations into dz.
+
+    """
+    if not os.path.exists(writePath):
+        os.makedirs(writePath)
+
+    np.savetxt(os.path.join(writePath, "kz"), spectra["kz"])
+    np.savetxt(os.path.join(writePath, "dz"), spectra["dz"])
+
+    for i, component in enumerate(["uu", "vv", "ww"]):
+        np.savetxt(os.path.join(writePath, "E"+component),
+                   spectra["E"][..., i])
+        np.savetxt(os.path.join(writePath, "R"+component),
+                   spectra["R"][..., i])
+
+
+def read_statistics_cache(hdf5File, key, size):
+    """Read the partial moments saved in the stats group of a database.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The database.
+    key : str
+        Identifies which moments are accumulated, e.g. the highest
+        order.
+    size : int
+        The current amount of positions along the time axis of the
+        database.
+
+    Returns
+    -------
+    List of two items
+        included :
+        A boolean array with an element for each position along the
+        time axis, True for the positions included in the moments.
+
+        moments :
+        A dictionary with the partial moments saved under each name,
+        see :func:`write_statistics_cache`.
+
+        None if the group does not exist or was saved for a different
+        key.
+
+    """
+    if "stats" not in hdf5File:
+        return None
+
+    group = hdf5File["stats"]
+    if group.attrs.get("key") != key:
+        return None
+
+    included = np.zeros(size, dtype=bool)
+    savedIncluded = group["included"][()]
+    included[:min(size, savedIncluded.size)] = savedIncluded[:size]
+
+    moments = {}
+    for name in group:
+        if name == "included":
+            continue
+        moments[name] = {field: group[name][field][()]
+                         for field in group[name]}
+        moments[name]["count"] = int(group[name].attrs["count"])
+
+    return [included, moments]
+
+
+def write_statistics_cache(hdf5File, key, included, moments):
+    """Save partial moments into the stats group of a database, replacing
+    the existing group.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The database.
+    key : str
+        Identifies which moments are accumulated, see
+        :func:`read_statistics_cache`.
+    included : ndarray
+        A boolean array with an element for each position along the
+        time axis, True for the positions included in the moments.
+    moments : dict
+        The partial moments to save under each name, see
+        :func:`block_moments`. None values are skipped.
+
+    """
+    if "stats" in hdf5File:
+        hdf5File.__delitem__("stats")
+
+    group = hdf5File.create_group("stats")
+    group.attrs["key"] = key
+    group.create_dataset("included", data=np.asarray(included, dtype=bool))
+
+    for name in moments:
+        if moments[name] is None:
+            continue
+        momentsGroup = group.create_group(name)
+        momentsGroup.attrs["count"] = moments[name]["count"]
+        for field in moments[name]:
+            if field != "count":
+                momentsGroup.create_dataset(field, data=moments[name][field])
+
+
+def open_text_database(reader, readPath, surfaceName=None):
+    """Find the time directories and read the points of a database
+    stored in the ofnative or the foamFile format.
+
+    Parameters
+    ----------
+    reader : str
+        The format, "ofnative" or "foamFile".
+    readPath : str
+        For the ofnative format, the directory containing the points file
+        and the time directories, commonly
+        constant/boundaryData/nameOfPatch. For the foamFile format, the
+        case with the sampled surfaces.
+    surfaceName : str, optional
+        The name of the sampled surface, required by the foamFile format.
+
+    Returns
+    -------
+    List
+        The names of the time directories, the y and z coordinates of the
+        points as the columns of an ndarray, and the function reading the
+        velocity at a given time.
+
+    """
+    if reader == "ofnative":
+        times = read_times_ofnative(readPath)
+        points = read_points_ofnative(readPath)
+        readFunction = read_velocity_ofnative(readPath)
+    elif reader == "foamFile":
+        if surfaceName is None:
+            raise ValueError("The foamFile reader requires the name of the "
+                             "sampled surface.")
+        dataDir = os.path.join(readPath, "postProcessing", "sampledSurface")
+        times = read_times_foamfile(dataDir, surfaceName)
+        points = read_points_foamfile(os.path.join(dataDir, times[0],
+                                                   surfaceName,
+                                                   "faceCentres"))
+        readFunction = read_velocity_foamfile(dataDir, surfaceName)
+    else:
+        raise ValueError("Unknown reader: "+str(reader))
+
+    return [times, np.column_stack(points), readFunction]
+
+
+def accumulate_statistics(readBlock, positions, executor, blockSize=16,
+                          order=2, spectra=False, reorder=None, timers=None,
+                          cachePath=None, size=None):
+    """Compute the partial moments of the velocity in a database, and
+    optionally of its Fourier coefficients along z.
+
+    The positions are split into blocks of consecutive time-steps, which
+    are distributed among the processes by the executor. The partial
+    moments of the processes are then merged on the first one.
+    A ValueError is raised if there are no time-steps at all, neither
+    among the positions nor in the saved moments.
+
+    Parameters
+    ----------
+    readBlock : function
+        A function of a slice of positions along the time axis, returning
+        the velocity at these time-steps. The first axis of the returned
+        array is the time and the last one the components.
+    positions : ndarray
+        The sorted positions of the time-steps to process.
+    executor : function
+        The function distributing the work, see
+        :func:`~eddylicious.generators.executors.get_executor`.
+    blockSize : int, optional
+        The largest amount of time-steps read at once (default 16).
+    order : int, optional
+        The highest order of the moments, see :func:`block_moments`.
+        The cross terms are always accumulated.
+    spectra : bool, optional
+        Whether to accumulate the moments of the Fourier coefficients
+        along z as well (default False).
+    reorder : function, optional
+        A function of a block of velocity values returning them reshaped
+        into a structured grid, with the axes time, y, z and the
+        components, before the Fourier transform. By default, the blocks
+        returned by readBlock are assumed to be structured already.
+    timers : function, optional
+        The timers measuring the stages, see
+        :func:`~eddylicious.generators.timing.get_timers`.
+    cachePath : str, optional
+        If provided, the HDF5 database in which the partial moments are
+        saved, see :func:`read_statistics_cache`. The positions included
+        in the moments saved by a previous run are skipped.
+    size : int, optional
+        The amount of time-steps in the database, required if cachePath
+        is provided.
+
+    Returns
+    -------
+    List of dicts
+        The partial moments of the velocity and of its Fourier
+        coefficients, the latter None unless spectra is True, on the
+        first process. Both are None on the others.
+
+    """
+    if timers is None:
+        timers = get_timers(False)
+
+    comm = executor.comm
+    rank = comm.Get_rank()
+    positions = np.asarray(positions, dtype=np.int64)
+
+    # The partial moments saved by a previous run, only read by the first
+    # process, and the positions they include
+    cacheKey = "order "+str(order)+(" spectra" if spectra else "")
+    cached = None
+
+    def read_cache():
+        with h5py.File(cachePath, 'r') as dbFile:
+            return read_statistics_cache(dbFile, cacheKey, size)
+
+    if cachePath is not None:
+        included = np.zeros(size, dtype=np.uint8)
+        cached = call_on_root(comm, read_cache)
+        if cached is not None:
+            included = cached[0].astype(np.uint8)
+            print("Reusing the statistics of " +
+                  str(np.count_nonzero(included)) +
+                  " time-step(s) saved in the database")
+        included = broadcast_array(included, comm)
+        positions = positions[included[positions] == 0]
+
+    # The partial moments of the time-steps processed by this process,
+    # and of their Fourier coefficients along z
+    moments = [None]
+    spectraMoments = [None]
+
+    if rank == 0:
+        print("Calculating the statistics")
+
+    def compute(block):
+        with timers("read"):
+            u = readBlock(block)
+        timers.add_bytes("read", u)
+
+        with timers("average"):
+            blockMoments = block_moments(u, crossTerms=True, order=order)
+
+        blockSpectra = None
+        if spectra:
+            with timers("spectra"):
+                if reorder is not None:
+                    u = reorder(u)
+                blockSpectra = block_spectra(u, axis=2)
+
+        return [blockMoments, blockSpectra]
+
+    def consume(block, blockResults):
+        [blockMoments, blockSpectra] = blockResults
+        with timers("average"):
+            moments[0] = merge_moments(moments[0], blockMoments)
+            spectraMoments[0] = merge_moments(spectraMoments[0],
+                                              blockSpectra)
+
+    executor(position_blocks(positions, blockSize), compute, consume,
+             label="Computed", timers=timers)
+
+    with timers("barrier"):
+        comm.Barrier()
+
+    moments = reduce_moments(moments[0], comm)
+    spectraMoments = reduce_moments(spectraMoments[0], comm)
+
+    if rank == 0 and cached is not None:
+        moments = merge_moments(cached[1].get("moments"), moments)
+        spectraMoments = merge_moments(cached[1].get("spectra"),
+                                       spectraMoments)
+
+    # Raised on all the processes, so that none waits for the others
+    if comm.bcast(rank == 0 and moments is None, root=0):
+        raise ValueError("There are no time-steps to compute the "
+                         "statistics of.")
+
+    if rank != 0:
+        return [None, None]
+
+    if cachePath is not None:
+        print("Saving the statistics into the database")
+        included[positions] = 1
+        with h5py.File(cachePath, 'a') as dbFile:
+            write_statistics_cache(dbFile, cacheKey, included,
+                                   {"moments": moments,
+                                    "spectra": spectraMoments})
+
+    return [moments, spectraMoments]
+
+
+def write_statistics(writePath, pointsY, pointsZ, moments,
+                     spectraMoments=None, hdf5Path=None, pointsOrder=None):
+    """Compute the statistics from the partial moments and write them.
+
+    The spanwise averages are written into text files, see
+    :func:`write_spanwise_averages`, the spectra, if provided, as well,
+    see :func:`write_spectra`.
+
+    Parameters
+    ----------
+    writePath : str
+        The directory where to write the files.
+    pointsY : ndarray
+        The y coordinates of the points, a 2d array with a row for each
+        value of y.
+    pointsZ : ndarray
+        The z coordinates of the points, equidistant along the rows.
+    moments : dict
+        The partial moments of the velocity, see
+        :func:`accumulate_statistics`.
+    spectraMoments : dict, optional
+        The partial moments of the Fourier coefficients along z.
+    hdf5Path : str, optional
+        An HDF5 file to save the statistics at each point to, see
+        :func:`~eddylicious.writers.hdf5_writers.write_statistics_to_hdf5`.
+    pointsOrder : ndarray, optional
+        The indices sorting the points of the moments into the structured
+        grid of pointsY and pointsZ, see
+        :func:`~eddylicious.readers.foamfile_readers.structured_order`.
+        By default the moments are structured already.
+
+    """
+    statistics = moments_statistics(moments)
+
+    if pointsOrder is not None:
+        for name in statistics:
+            statistics[name] = np.reshape(statistics[name][pointsOrder],
+                                          pointsY.shape + (-1,))
+
+    write_spanwise_averages(writePath, pointsY[:, 0], statistics)
+
+    if spectraMoments is not None:
+        nPointsZ = pointsZ.shape[1]
+        lengthZ = nPointsZ*(pointsZ[0, 1] - pointsZ[0, 0])
+        write_spectra(writePath, spectra_statistics(spectraMoments, nPointsZ,
+                                                    lengthZ, axis=1))
+
+    if hdf5Path is not None:
+        with h5py.File(hdf5Path, 'w') as statsFile:
+            write_statistics_to_hdf5(statsFile, pointsY, pointsZ, statistics)
@@ -0,0 +1,172 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for interpolating the precursor velocity fields in time.
+
+"""
+from __future__ import division
+from collections import OrderedDict
+import numpy as np
+
+__all__ = ["time_interpolation_weights", "time_interpolation_reader"]
+
+
+def time_interpolation_weights(times, t, method="linear"):
+    """Compute the weights of the precursor frames used to interpolate
+    the velocity field to a given time.
+
+    Linear interpolation uses the two frames surrounding the time. The
+    cubic interpolation is a cubic Hermite spline, with the derivatives
+    at the frames estimated by central differences (one-sided at the
+    ends of the database), and uses up to four frames. The frames need
+    not be equally spaced in time.
+
+    Parameters
+    ----------
+    times : ndarray
+        The sorted time values of the precursor frames.
+    t : float
+        The time to interpolate to.
+    method : str, optional
+        Either "linear" (default) or "cubic".
+
+    Returns
+    -------
+    List of ndarrays
+        The list contains 2 items
+
+        indices :
+        The indices of the frames used for the interpolation.
+
+        weights :
+        The weight of each of the frames.
+
+    """
+    times = np.asarray(times, dtype=np.float64)
+
+    if method not in ["linear", "cubic"]:
+        raise ValueError("Unknown time interpolation: "+str(method))
+
+    if times.size < 2:
+        raise ValueError("At least two precursor frames are needed for "
+                         "interpolating in time.")
+
+    tol = 1e-9*(times[-1] - times[0])
+    if (t < times[0] - tol) or (t > times[-1] + tol):
+        raise ValueError("The time "+str(t)+" is outside of the time-span "
+                         "of the precursor database.")
+
+    i = np.searchsorted(times, t, side='right') - 1
+    i = int(min(max(i, 0), times.size - 2))
+    h = times[i+1] - times[i]
+    s = min(max((t - times[i])/h, 0.0), 1.0)
+
+    if method == "linear":
+        return [np.array([i, i+1]), np.array([1 - s, s])]
+
+    h00 = 2*s**3 - 3*s**2 + 1
+    h10 = s**3 - 2*s**2 + s
+    h01 = -2*s**3 + 3*s**2
+    h11 = s**3 - s**2
+
+    weights = dict.fromkeys(range(max(i-1, 0), min(i+3, times.size)), 0.0)
+    weights[i] += h00
+    weights[i+1] += h01
+
+    # The derivatives are differences of the neighbouring frames
+    for j, hj in [(i, h10), (i+1, h11)]:
+        lower = max(j-1, 0)
+        upper = min(j+1, times.size - 1)
+        weight = hj*h/(times[upper] - times[lower])
+        weights[upper] += weight
+        weights[lower] -= weight
+
+    indices = np.array(sorted(weights))
+    return [indices, np.array([weights[j] for j in indices])]
+
+
+def time_interpolation_reader(readerFunction, times, method="linear",
+                              cacheSize=4):
+    """Create a reader function interpolating the precursor velocity
+    fields in time.
+
+    The frames read by the original reader are kept in a small cache.
+    Since consecutive times use mostly the same frames, each frame is
+    read only once when the requested times increase.
+
+    Parameters
+    ----------
+    readerFunction : function
+        The function to use for reading in data, generated by the
+        reader. Should contain the reader's name in the attribute
+        "reader".
+    times : list of floats or strings
+        The times for which the velocity field was sampled in the
+        precursor simulation.
+    method : str, optional
+        Either "linear" (default) or "cubic", see
+        :func:`time_interpolation_weights`.
+    cacheSize : int, optional
+        The maximum amount of frames kept in memory (default 4).
+
+    Returns
+    -------
+    function
+        A function of one variable (the precursor time) that will
+        perform the reading and the interpolation.
+
+    """
+    # foamFile times are strings, which are not necessarily sorted as
+    # numbers
+    order = np.argsort(np.asarray(times, dtype=np.float64), kind='mergesort')
+    sortedTimes = np.asarray(times, dtype=np.float64)[order]
+    cache = OrderedDict()
+
+    def read_frame(index):
+        """Read the frame with the given position in the sorted times,
+        using the cache if possible.
+
+        """
+        if index in cache:
+            return cache[index]
+
+        if readerFunction.reader == "foamFile":
+            frame = readerFunction(times[order[index]])
+        elif readerFunction.reader in ["hdf5", "raw"]:
+            frame = readerFunction(int(order[index]))
+        else:
+            raise ValueError("Unknown reader")
+
+        cache[index] = frame
+        while len(cache) > cacheSize:
+            cache.popitem(last=False)
+
+        return frame
+
+    def read(t):
+        """
+        A function that will actually perform the reading.
+
+        Parameters
+        ----------
+        t : float
+            The time in the precursor database to interpolate to.
+
+        Returns
+        -------
+        List of ndarrays
+            Three arrays corresponding to the three components of
+            velocity. The arrays are always newly allocated.
+
+        """
+        [indices, weights] = time_interpolation_weights(sortedTimes, t,
+                                                        method)
+        frames = [read_frame(j) for j in indices]
+
+        return [sum(w*frame[c] for w, frame in zip(weights, frames))
+                for c in range(3)]
+
+    read.reader = readerFunction.reader
+    return read
@@ -0,0 +1,314 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for measuring the time spent in the different stages of
+the generation, e.g. reading, rescaling and writing.
+
+Optionally, the beginning and the duration of each measured interval
+can be recorded and saved as a timeline in the trace event format, which
+can be viewed in Chrome's chrome://tracing or in Perfetto.
+
+"""
+from __future__ import print_function
+from __future__ import division
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import os
+import time
+import numpy as np
+
+__all__ = ["get_timers", "merge_timings", "timing_summary",
+           "print_timing_summary", "write_timing_json", "write_trace"]
+
+# Converts the values of the performance counter to seconds since the
+# epoch, so that the timelines of different processes can be aligned
+_clockOffset = time.time() - time.perf_counter()
+
+
+def get_timers(enabled=True, trace=False):
+    """Create a function measuring the time spent in named stages.
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Whether to measure anything (default True). If False, the
+        returned function does nothing, which has negligible overhead.
+    trace : bool, optional
+        Whether to also record each measured interval, see
+        :func:`write_trace` (default False). Implies enabled.
+
+    Returns
+    -------
+    function
+        A function of one variable, the name of the stage, returning a
+        context manager which measures the time spent within it. The
+        attribute "add_bytes" is a function of the stage and arrays,
+        which counts the size of the arrays as processed by the stage.
+        The measurements are contained in the attribute "records", a
+        dictionary with stage names as keys and, as values, dictionaries
+        with the list of durations and the amount of bytes. The recorded
+        intervals are contained in the attribute "events", a list of
+        tuples with the stage, the beginning in seconds since the epoch,
+        the duration and the id of the process.
+
+    """
+    records = OrderedDict()
+    events = []
+
+    enabled = enabled or trace
+
+    if enabled:
+        def timed(stage):
+            return _timing(records, stage, events if trace else None)
+
+        def add_bytes(stage, *arrays):
+            record = _get_record(records, stage)
+            record["bytes"] += sum(np.asarray(a).nbytes for a in arrays)
+    else:
+        def timed(stage):
+            return _noTiming
+
+        def add_bytes(stage, *arrays):
+            pass
+
+    timed.add_bytes = add_bytes
+    timed.records = records
+    timed.events = events
+    timed.enabled = enabled
+    timed.trace = trace
+    return timed
+
+
+def merge_timings(records, otherRecords):
+    """Add the measurements in otherRecords to records.
+
+    Parameters
+    ----------
+    records : dict
+        The measurements to add to, the attribute "records" of the
+        function created by :func:`get_timers`.
+    otherRecords : dict
+        The measurements to add.
+
+    """
+    for stage in otherRecords:
+        record = _get_record(records, stage)
+        record["durations"].extend(otherRecords[stage]["durations"])
+        record["bytes"] += otherRecords[stage]["bytes"]
+
+
+def timing_summary(timers, comm):
+    """Gather the measurements of all the processes and summarize them.
+
+    Parameters
+    ----------
+    timers : function
+        The function created by :func:`get_timers`.
+    comm : MPI communicator
+        The communicator of the processes, e.g. the attribute "comm" of
+        the executor.
+
+    Returns
+    -------
+    dict
+        On the first process, a dictionary with the keys "stages" and
+        "ranks". The former contains the statistics of each stage over
+        all the processes, the latter a list with the statistics of each
+        stage for each process. None on the other processes.
+
+    """
+    allRecords = comm.gather(timers.records, root=0)
+
+    if comm.Get_rank() != 0:
+        return None
+
+    stages = []
+    for records in allRecords:
+        for stage in records:
+            if stage not in stages:
+                stages.append(stage)
+
+    ranks = []
+    for records in allRecords:
+        ranks.append(OrderedDict(
+            (stage, _stage_statistics(records[stage]["durations"],
+                                      records[stage]["bytes"]))
+            for stage in stages if stage in records))
+
+    summary = OrderedDict()
+    for stage in stages:
+        durations = []
+        nBytes = 0
+        totals = []
+        for records in allRecords:
+            if stage in records:
+                durations.extend(records[stage]["durations"])
+                nBytes += records[stage]["bytes"]
+                totals.append(np.sum(records[stage]["durations"]))
+            else:
+                totals.append(0.0)
+
+        summary[stage] = _stage_statistics(durations, nBytes)
+
+        # The spread of the total time among the processes shows the
+        # load imbalance
+        summary[stage]["minRankTotal"] = float(np.min(totals))
+        summary[stage]["maxRankTotal"] = float(np.max(totals))
+
+    return {"stages": summary, "ranks": ranks}
+
+
+def print_timing_summary(summary):
+    """Print a table with the statistics of each stage.
+
+    Parameters
+    ----------
+    summary : dict
+        The summary created by :func:`timing_summary`.
+
+    """
+    columns = ["count", "total", "min", "p50", "p95", "max", "MB",
+               "rank min", "rank max"]
+    print("Timing summary over " + str(len(summary["ranks"])) +
+          " process(es), times in seconds")
+    print("{0:<12}".format("stage") +
+          "".join("{0:>10}".format(column) for column in columns))
+
+    for stage, statistics in summary["stages"].items():
+        values = [statistics["count"], statistics["total"],
+                  statistics["min"], statistics["p50"], statistics["p95"],
+                  statistics["max"], statistics["bytes"]/1024**2,
+                  statistics["minRankTotal"], statistics["maxRankTotal"]]
+        print("{0:<12}".format(stage) +
+              "{0:>10d}".format(values[0]) +
+              "".join("{0:>10.4g}".format(value) for value in values[1:]))
+
+
+def write_timing_json(summary, filePath):
+    """Write the summary created by :func:`timing_summary` to a JSON
+    file.
+
+    Parameters
+    ----------
+    summary : dict
+        The summary created by :func:`timing_summary`.
+    filePath : str
+        The path to the file.
+
+    """
+    with open(filePath, 'w') as jsonFile:
+        json.dump(summary, jsonFile, indent=4)
+
+
+def write_trace(timers, comm, filePath):
+    """Gather the intervals recorded by all the processes and write them
+    as a timeline in the trace event format.
+
+    Each MPI process is shown as a separate process in the timeline. The
+    processes of a pool, if any, are shown as threads of the process
+    that started them.
+
+    Parameters
+    ----------
+    timers : function
+        The function created by :func:`get_timers` with trace enabled.
+    comm : MPI communicator
+        The communicator of the processes, e.g. the attribute "comm" of
+        the executor.
+    filePath : str
+        The path to the JSON file, written by the first process.
+
+    """
+    allEvents = comm.gather([os.getpid(), timers.events], root=0)
+
+    if comm.Get_rank() != 0:
+        return
+
+    starts = [event[1] for [pid, events] in allEvents for event in events]
+    origin = min(starts) if starts else 0.0
+
+    traceEvents = []
+    for rank, [mainPid, events] in enumerate(allEvents):
+        traceEvents.append({"name": "process_name", "ph": "M", "pid": rank,
+                            "tid": 0, "args": {"name": "rank " + str(rank)}})
+
+        # The main process is the first thread, pool workers follow
+        threads = {mainPid: 0}
+        for [stage, start, duration, pid] in events:
+            if pid not in threads:
+                threads[pid] = len(threads)
+
+        for pid, tid in threads.items():
+            name = "main" if tid == 0 else "worker " + str(tid)
+            traceEvents.append({"name": "thread_name", "ph": "M",
+                                "pid": rank, "tid": tid,
+                                "args": {"name": name}})
+
+        for [stage, start, duration, pid] in events:
+            traceEvents.append({"name": stage, "ph": "X", "pid": rank,
+                                "tid": threads[pid],
+                                "ts": (start - origin)*1e6,
+                                "dur": duration*1e6})
+
+    with open(filePath, 'w') as traceFile:
+        json.dump({"traceEvents": traceEvents, "displayTimeUnit": "ms"},
+                  traceFile)
+
+
+def _get_record(records, stage):
+    """Get the measurements of a stage, creating them if needed."""
+    if stage not in records:
+        records[stage] = {"durations": [], "bytes": 0}
+    return records[stage]
+
+
+@contextmanager
+def _timing(records, stage, events=None):
+    """Measure the time spent within the context, recording the interval
+    if events is provided.
+
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _get_record(records, stage)["durations"].append(duration)
+
+        if events is not None:
+            events.append((stage, start + _clockOffset, duration,
+                           os.getpid()))
+
+
+class _NoTiming(object):
+    """A reusable context manager that does nothing."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *args):
+        return False
+
+
+_noTiming = _NoTiming()
+
+
+def _stage_statistics(durations, nBytes):
+    """Compute the statistics of the durations of a stage."""
+    durations = np.asarray(durations, dtype=np.float64)
+
+    if durations.size == 0:
+        return OrderedDict([("count", 0), ("total", 0.0), ("min", 0.0),
+                            ("p50", 0.0), ("p95", 0.0), ("max", 0.0),
+                            ("bytes", int(nBytes))])
+
+    return OrderedDict([("count", int(durations.size)),
+                        ("total", float(np.sum(durations))),
+                        ("min", float(np.min(durations))),
+                        ("p50", float(np.percentile(durations, 50))),
+                        ("p95", float(np.percentile(durations, 95))),
+                        ("max", float(np.max(durations))),
+                        ("bytes", int(nBytes))])
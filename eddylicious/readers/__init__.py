@@ -8,7 +8,12 @@
 """
 from .foamfile_readers import *
 from .hdf5_readers import *
+from .raw_readers import *
+from .ofnative_readers import *
 
-__all__ = ["foamfile_readers", "hdf5_readers"]
+__all__ = ["foamfile_readers", "hdf5_readers", "raw_readers",
+           "ofnative_readers"]
 __all__.extend(foamfile_readers.__all__)
 __all__.extend(hdf5_readers.__all__)
+__all__.extend(raw_readers.__all__)
+__all__.extend(ofnative_readers.__all__)
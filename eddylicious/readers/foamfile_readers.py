@@ -8,10 +8,130 @@
 """
 import numpy as np
 import os
+import re
+import gzip
 
 __all__ = ["read_structured_points_foamfile",
            "read_structured_velocity_foamfile",
-           "read_points_foamfile", "read_velocity_foamfile"]
+           "read_points_foamfile", "read_velocity_foamfile",
+           "read_times_foamfile", "read_vector_field_foamfile",
+           "structured_order"]
+
+# The beginning of the list of values, i.e. a line with the amount of
+# values followed by an opening parenthesis
+_listStart = re.compile(br"^[ \t]*(\d+)\s*\(", re.MULTILINE)
+_binaryFormat = re.compile(br"\bformat\s+binary\s*;")
+
+
+def read_vector_field_foamfile(readPath):
+    """Read a list of vectors, e.g. points or velocity values, from a
+    file in the format of OpenFOAM.
+
+    Both the ascii and the binary format are supported, the latter
+    assuming double precision. Files with a .gz extension are
+    decompressed. The values are parsed with a single call to numpy,
+    instead of line by line.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the file.
+
+    Returns
+    -------
+    ndarray
+        A 2d array with a row for each vector.
+
+    """
+    if readPath.endswith(".gz"):
+        with gzip.open(readPath, 'rb') as gzFile:
+            data = gzFile.read()
+    else:
+        with open(readPath, 'rb') as dataFile:
+            data = dataFile.read()
+
+    match = _listStart.search(data)
+    if match is None:
+        raise ValueError("No list of values found in "+readPath)
+    size = int(match.group(1))
+
+    if _binaryFormat.search(data, 0, match.start()):
+        values = np.frombuffer(data, dtype='<f8', count=3*size,
+                               offset=match.end())
+        return np.array(values).reshape((size, 3))
+
+    body = data[match.end():data.rindex(b")")]
+    values = np.fromstring(body.translate(None, b"()").decode(), sep=" ")
+    if values.size != 3*size:
+        raise ValueError("Expected "+str(size)+" vectors in "+readPath)
+
+    return values.reshape((size, 3))
+
+
+def read_times_foamfile(baseReadPath, surfaceName):
+    """Find the time directories containing the velocity sampled on a
+    surface, either as U or U.gz.
+
+    Parameters
+    ----------
+    baseReadPath : str
+        The path where the time-directories with the velocity values are
+        located.
+    surfaceName: str
+        The name of the surface that was used for sampling.
+
+    Returns
+    -------
+    list of str
+        The names of the time directories, sorted by the time value.
+
+    """
+    times = []
+    for name in os.listdir(baseReadPath):
+        readUPath = os.path.join(baseReadPath, name, surfaceName,
+                                 "vectorField", "U")
+        if not (os.path.isfile(readUPath) or
+                os.path.isfile(readUPath+".gz")):
+            continue
+        try:
+            times.append([float(name), name])
+        except ValueError:
+            continue
+
+    return [name for [value, name] in sorted(times)]
+
+
+def structured_order(pointsY, pointsZ):
+    """Find the order of points forming a structured grid, so that
+    they can be reshaped into 2d arrays.
+
+    The points are sorted along y, and then along z for each value of y,
+    with a single lexicographic sort.
+
+    Parameters
+    ----------
+    pointsY : ndarray
+        The y coordinates of the points.
+    pointsZ : ndarray
+        The z coordinates of the points.
+
+    Returns
+    -------
+    List of two items
+        order :
+        The sorting indices of the points. The sorted points, and any
+        values associated with them, can be reshaped into 2d arrays
+        with nPointsZ columns.
+
+        nPointsZ :
+        The amount of points along z, found as the amount of points with
+        the smallest y.
+
+    """
+    pointsY = np.ravel(pointsY)
+    order = np.lexsort((np.ravel(pointsZ), pointsY))
+    nPointsZ = int(np.count_nonzero(pointsY == pointsY[order[0]]))
+    return [order, nPointsZ]
 
 
 def read_structured_points_foamfile(readPath, addValBot=float('nan'),
@@ -69,12 +189,7 @@ def read_structured_points_foamfile(readPath, addValBot=float('nan'),
         The sorting indices from the sorting performed.
 
     """
-    with open(readPath) as pointsFile:
-        points = [line.rstrip(')\n') for line in pointsFile]
-
-    points = [line.lstrip('(') for line in points]
-    points = points[3:-1]
-    points = np.genfromtxt(points)[:, 1:]
+    points = read_vector_field_foamfile(readPath)[:, 1:]
 
 # Sort the points
 # Sort along y first
@@ -83,23 +198,15 @@ def read_structured_points_foamfile(readPath, addValBot=float('nan'),
     points[:, 1] = points[yInd, 1]
 
 # Find the number of points along z
-    nPointsZ = 0
-    for i in range(points[:, 0].size):
-        if points[i, 0] == points[0, 0]:
-            nPointsZ += 1
-        else:
-            break
+    nPointsZ = int(np.count_nonzero(points[:, 0] == points[0, 0]))
 
 # Reshape into a 2d array
     pointsY = np.copy(np.reshape(points[:, 0], (-1, nPointsZ)))
     pointsZ = np.copy(np.reshape(points[:, 1], (-1, nPointsZ)))
 
 # For each y order the points in z
-    zInd = np.zeros(pointsZ.shape, dtype=np.int)
-
-    for i in range(pointsZ.shape[0]):
-        zInd[i, :] = np.argsort(pointsZ[i, :])
-        pointsZ[i, :] = pointsZ[i, zInd[i, :]]
+    zInd = np.argsort(pointsZ, axis=1)
+    pointsZ = np.take_along_axis(pointsZ, zInd, axis=1)
 
 
 # Add points at y = 0 and y = max(y)
@@ -205,28 +312,17 @@ def read_structured_velocity_foamfile(baseReadPath, surfaceName, nPointsZ,
         """
         readUPath = os.path.join(baseReadPath, str(time), surfaceName,
                                  "vectorField", "U")
-        with open(readUPath) as UFile:
-            u = [line.rstrip(')\n') for line in UFile]
+        if not os.path.isfile(readUPath):
+            readUPath += ".gz"
 
-        u = [line.lstrip('(') for line in u]
-        u = u[3:-1]
-        u = np.genfromtxt(u)
+        u = read_vector_field_foamfile(readUPath)
 
-        # Sort along y
-        u[:, 0] = u[yInd, 0]
-        u[:, 1] = u[yInd, 1]
-        u[:, 2] = u[yInd, 2]
-
-        # Reshape to 2d
-        uX = np.copy(np.reshape(u[:, 0], (-1, nPointsZ)))
-        uY = np.copy(np.reshape(u[:, 1], (-1, nPointsZ)))
-        uZ = np.copy(np.reshape(u[:, 2], (-1, nPointsZ)))
-
-        # Sort along z
-        for i in range(uX.shape[0]):
-            uX[i, :] = uX[i, zInd[i, :]]
-            uY[i, :] = uY[i, zInd[i, :]]
-            uZ[i, :] = uZ[i, zInd[i, :]]
+        # Sort along y, reshape to 2d and sort along z
+        u = np.reshape(u[yInd, :], (-1, nPointsZ, 3))
+        u = np.take_along_axis(u, zInd[:, :, np.newaxis], axis=1)
+        uX = np.copy(u[:, :, 0])
+        uY = np.copy(u[:, :, 1])
+        uZ = np.copy(u[:, :, 2])
 
         if not np.isnan(addValBot[0]):
             uX = np.append(addValBot[0]*np.ones((1, nPointsZ)), uX, axis=0)
@@ -291,12 +387,7 @@ def read_points_foamfile(readPath):
         Two arrays corresponding to y and z components of the points.
 
     """
-    with open(readPath) as pointsFile:
-        points = [line.rstrip(')\n') for line in pointsFile]
-
-    points = [line.lstrip('(') for line in points]
-    points = points[3:-1]
-    points = np.genfromtxt(points)[:, 1:]
+    points = read_vector_field_foamfile(readPath)[:, 1:]
 
     return [points[:, 0], points[:, 1]]
 
@@ -340,12 +431,10 @@ def read_velocity_foamfile(baseReadPath, surfaceName):
         """
         readUPath = os.path.join(baseReadPath, str(time), surfaceName,
                                  "vectorField", "U")
-        with open(readUPath) as UFile:
-            u = [line.rstrip(')\n') for line in UFile]
+        if not os.path.isfile(readUPath):
+            readUPath += ".gz"
 
-        u = [line.lstrip('(') for line in u]
-        u = u[3:-1]
-        u = np.genfromtxt(u)
+        u = read_vector_field_foamfile(readUPath)
 
 
         return [u[:, 0], u[:, 1], u[:, 2]]
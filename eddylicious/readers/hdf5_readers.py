@@ -57,10 +57,10 @@ def read_structured_points_hdf5(readPath, addValBot=float('nan'),
         A 2d ndarray containing the z coordinates of the points.
 
     """
-    dbFile = h5py.File(readPath, 'a')
-
-    pointsY = dbFile["points"]["pointsY"]
-    pointsZ = dbFile["points"]["pointsZ"]
+    # Read-only, so that several processes can open the file
+    with h5py.File(readPath, 'r') as dbFile:
+        pointsY = dbFile["points"]["pointsY"][()]
+        pointsZ = dbFile["points"]["pointsZ"][()]
 
     nPointsZ = pointsY.shape[1]
 
@@ -98,7 +98,8 @@ def read_structured_velocity_hdf5(readPath,
                                   addValTop=(float('nan'), float('nan'),
                                              float('nan')),
                                   excludeBot=0, excludeTop=0,
-                                  interpValBot=False, interpValTop=False):
+                                  interpValBot=False, interpValTop=False,
+                                  hyperslab=None):
     """ Read the values of the velocity field from a foamFile-format
     file.
 
@@ -128,6 +129,11 @@ def read_structured_velocity_hdf5(readPath,
     interpValTop : bool, optional
         Whether to interpolate the last value in the wall-normal
         direction using two points. (default False)
+    hyperslab : tuple of two slices, optional
+        The part of the plane to read, along the wall-normal and the
+        spanwise directions. Only the selected values are read from the
+        file, before the other manipulations are performed. By default
+        the whole plane is read.
 
     Returns
     -------
@@ -136,6 +142,9 @@ def read_structured_velocity_hdf5(readPath,
         perform the reading.
     """
 
+    if hyperslab is None:
+        hyperslab = (slice(None), slice(None))
+
     def read(timeIndex):
         """
         A function that will actually perform the reading.
@@ -154,11 +163,10 @@ def read_structured_velocity_hdf5(readPath,
             the order of the components in the list is x, y and the z.
 
         """
-        dbFile = h5py.File(readPath, 'r')
-
-        uX = dbFile["velocity"]["uX"][timeIndex, :, :]
-        uY = dbFile["velocity"]["uY"][timeIndex, :, :]
-        uZ = dbFile["velocity"]["uZ"][timeIndex, :, :]
+        with h5py.File(readPath, 'r') as dbFile:
+            uX = dbFile["velocity"]["uX"][(timeIndex,) + tuple(hyperslab)]
+            uY = dbFile["velocity"]["uY"][(timeIndex,) + tuple(hyperslab)]
+            uZ = dbFile["velocity"]["uZ"][(timeIndex,) + tuple(hyperslab)]
 
         nPointsZ = uX.shape[1]
 
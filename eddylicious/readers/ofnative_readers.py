@@ -0,0 +1,109 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for reading fields stored in the native format of the
+timeVaryingMappedFixedValue boundary in OpenFOAM, see
+:mod:`eddylicious.writers.ofnative_writers`.
+
+"""
+import os
+from .foamfile_readers import read_vector_field_foamfile
+
+__all__ = ["read_points_ofnative", "read_times_ofnative",
+           "read_velocity_ofnative"]
+
+
+def read_points_ofnative(readPath):
+    """Read the coordinates of the points of a boundary.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory containing the points file and the
+        time directories, commonly constant/boundaryData/nameOfPatch.
+
+    Returns
+    -------
+    List of ndarrays
+        Two arrays corresponding to y and z components of the points.
+
+    """
+    points = read_vector_field_foamfile(os.path.join(readPath, "points"))
+
+    return [points[:, 1], points[:, 2]]
+
+
+def read_times_ofnative(readPath):
+    """Find the time directories containing the velocity values of a
+    boundary, either as U or U.gz.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory containing the points file and the
+        time directories.
+
+    Returns
+    -------
+    list of str
+        The names of the time directories, sorted by the time value.
+
+    """
+    times = []
+    for name in os.listdir(readPath):
+        if not (os.path.isfile(os.path.join(readPath, name, "U")) or
+                os.path.isfile(os.path.join(readPath, name, "U.gz"))):
+            continue
+        try:
+            times.append([float(name), name])
+        except ValueError:
+            continue
+
+    return [name for [value, name] in sorted(times)]
+
+
+def read_velocity_ofnative(readPath):
+    """Read the values of the velocity field of a boundary.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory containing the points file and the
+        time directories.
+
+    Returns
+    -------
+    function
+        A function of one variable (the time-value) that will actually
+        perform the reading.
+
+    """
+    def read(time):
+        """
+        A function that will actually perform the reading.
+
+        Parameters
+        ----------
+        time, float or string
+            The value of the time, will be converted to a string. It
+            should match the name of the time directory.
+
+        Returns
+        -------
+        List of ndarrays
+            Three arrays corresponding to the three components of
+            velocity, in the order of the points.
+
+        """
+        readUPath = os.path.join(readPath, str(time), "U")
+        if not os.path.isfile(readUPath):
+            readUPath += ".gz"
+
+        u = read_vector_field_foamfile(readUPath)
+
+        return [u[:, 0], u[:, 1], u[:, 2]]
+
+    read.reader = "ofnative"
+    return read
@@ -0,0 +1,122 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for reading fields stored in the raw format, see
+:mod:`eddylicious.writers.raw_writers`.
+
+"""
+import os
+import json
+import numpy as np
+
+__all__ = ["read_header_raw", "read_points_raw", "read_times_raw",
+           "read_velocity_raw"]
+
+
+def read_header_raw(readPath):
+    """Read the header of a raw store.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory of the store.
+
+    Returns
+    -------
+    dict
+        The contents of the header.
+
+    """
+    with open(os.path.join(readPath, "header.json")) as headerFile:
+        return json.load(headerFile)
+
+
+def read_points_raw(readPath):
+    """Read the coordinates of the points from a raw store.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory of the store.
+
+    Returns
+    -------
+    List of ndarrays
+        Two arrays corresponding to y and z components of the points.
+
+    """
+    header = read_header_raw(readPath)
+    points = np.load(os.path.join(readPath, header["points"]))
+
+    return [points[:, 1], points[:, 2]]
+
+
+def read_times_raw(readPath):
+    """Read the time values from a raw store.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory of the store.
+
+    Returns
+    -------
+    ndarray
+        The time values.
+
+    """
+    header = read_header_raw(readPath)
+
+    return np.fromfile(os.path.join(readPath, header["time"]),
+                       dtype=np.float64, count=header["nTimes"])
+
+
+def read_velocity_raw(readPath):
+    """Read the values of the velocity field from a raw store.
+
+    The velocity file is memory-mapped once, when this function is
+    called. The returned arrays are read-only views into the mapping,
+    so no data is copied until it is actually used.
+
+    Parameters
+    ----------
+    readPath : str
+        The path to the directory of the store.
+
+    Returns
+    -------
+    function
+        A function of one variable (the time-index) that will actually
+        perform the reading.
+
+    """
+    header = read_header_raw(readPath)
+    velocity = np.memmap(os.path.join(readPath, header["velocity"]),
+                         dtype=np.dtype(header["dtype"]), mode='r',
+                         shape=(header["nTimes"], header["nPoints"], 3))
+
+    def read(timeIndex):
+        """
+        A function that will actually perform the reading.
+
+        Parameters
+        ----------
+        timeIndex: int
+            The value of the time-index, i.e. the location in the
+            times-array.
+
+        Returns
+        -------
+        List of ndarrays
+            Three arrays corresponding to the three components of
+            velocity.
+
+        """
+        u = velocity[timeIndex]
+
+        return [u[:, 0], u[:, 1], u[:, 2]]
+
+    read.reader = "raw"
+    return read
@@ -10,7 +10,9 @@ file formats.
 
 from .hdf5_writers import *
 from .ofnative_writers import *
+from .raw_writers import *
 
-__all__ = ["hdf5_writers", "ofnative_writers"]
+__all__ = ["hdf5_writers", "ofnative_writers", "raw_writers"]
 __all__.extend(hdf5_writers.__all__)
-__all__.extend(ofnative_writers.__all__)
\ No newline at end of file
+__all__.extend(ofnative_writers.__all__)
+__all__.extend(raw_writers.__all__)
\ No newline at end of file
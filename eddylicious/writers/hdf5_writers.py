@@ -6,11 +6,18 @@
 """Functions for writing to an hdf5 file.
 
 """
+import os
+import glob
 import numpy as np
 import h5py as h5py
 
 
-__all__ = ["write_points_to_hdf5", "write_velocity_to_hdf5"]
+__all__ = ["write_points_to_hdf5", "write_velocity_to_hdf5",
+           "write_velocities_to_hdf5", "create_velocity_datasets_hdf5",
+           "extend_velocity_datasets_hdf5",
+           "get_written_positions_hdf5", "get_rank_file_path_hdf5",
+           "get_rank_file_paths_hdf5", "create_virtual_datasets_hdf5",
+           "write_statistics_to_hdf5"]
 
 
 def write_points_to_hdf5(hdf5File, pointsY, pointsZ, xVal):
@@ -47,7 +54,8 @@ def write_points_to_hdf5(hdf5File, pointsY, pointsZ, xVal):
 def write_velocity_to_hdf5(hdf5File, t, uX, uY, uZ, iteration):
     """Write the velocity field into an HDF5 file.
 
-    Will also write the corresponding time value.
+    Will also write the corresponding time value. If the file contains
+    a completed dataset, the position is marked as written.
 
     Parameters
     ----------
@@ -84,3 +92,300 @@ def write_velocity_to_hdf5(hdf5File, t, uX, uY, uZ, iteration):
 
     hdf5File["time"][iteration] = t
     hdf5File["velocity"][iteration, :, :] = u
+
+    if "completed" in hdf5File:
+        hdf5File["completed"][iteration] = 1
+
+
+def write_velocities_to_hdf5(hdf5File, t, uX, uY, uZ, start):
+    """Write the velocity fields of several consecutive positions along
+    the time axis into an HDF5 file.
+
+    The positions are written as a single hyperslab of each dataset.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The the HDF5 file.
+    t : ndarray
+        The values of time associated with the written velocity fields.
+    uX : ndarray
+        A 2d ndarray containing the streamwise component of the velocity
+        fields, a row for each position.
+    uY : ndarray
+        A 2d ndarray containing the wall-normal component of the
+        velocity fields, a row for each position.
+    uZ : ndarray
+        A 2d ndarray containing the spanwise component of the velocity
+        fields, a row for each position.
+    start : int
+        The first position along the time axis.
+
+    """
+    nSteps = len(t)
+    end = start + nSteps
+
+    if end > hdf5File["time"].size:
+        raise ValueError("Write position larger than total database size.")
+
+    time = hdf5File["time"]
+    time[start:end] = np.reshape(t, (nSteps,) + time.shape[1:])
+    hdf5File["velocity"][start:end, :, :] = np.stack((uX, uY, uZ), axis=2)
+
+    if "completed" in hdf5File:
+        hdf5File["completed"][start:end] = 1
+
+
+def create_velocity_datasets_hdf5(hdf5File, size, nPoints, t0,
+                                  chunkSize=None, compression=None,
+                                  compressionLevel=None):
+    """Create the time and velocity datasets in an HDF5 file.
+
+    The datasets are chunked and resizable along the time axis, so that
+    the database can later be extended with
+    :func:`extend_velocity_datasets_hdf5`. A dataset called completed
+    is also created, it marks which positions along the time axis have
+    been written.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The the HDF5 file.
+    size : int
+        The amount of time-steps in the database.
+    nPoints : int
+        The amount of points at the inflow boundary.
+    t0 : float
+        The value used to initialize the time dataset.
+    chunkSize : int, optional
+        The amount of time-steps in a single chunk. By default the size
+        of a chunk is chosen to be around 1 MB.
+    compression : str, optional
+        The compression filter, either "gzip" or "lzf". By default the
+        data is not compressed.
+    compressionLevel : int, optional
+        The compression level, only used by the gzip filter.
+
+    """
+    if chunkSize is None:
+        chunkSize = max(1, 2**20//(8*3*nPoints))
+    chunkSize = int(min(chunkSize, max(size, 1)))
+
+    if compression not in [None, "gzip", "lzf"]:
+        raise ValueError("Unknown compression filter: "+str(compression))
+
+    if compression != "gzip":
+        compressionLevel = None
+
+    hdf5File.create_dataset("time", data=t0*np.ones((size, 1)),
+                            maxshape=(None, 1), chunks=(chunkSize, 1))
+    hdf5File.create_dataset("velocity", (size, nPoints, 3),
+                            dtype=np.float64,
+                            maxshape=(None, nPoints, 3),
+                            chunks=(chunkSize, nPoints, 3),
+                            compression=compression,
+                            compression_opts=compressionLevel)
+    hdf5File.create_dataset("completed", (size,), dtype=np.uint8,
+                            maxshape=(None,), chunks=(max(chunkSize, 1024),))
+
+
+def extend_velocity_datasets_hdf5(hdf5File, size):
+    """Resize the time and velocity datasets in an HDF5 file.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The the HDF5 file.
+    size : int
+        The new amount of time-steps in the database.
+
+    Returns
+    -------
+    int
+        The amount of time-steps in the database before resizing.
+
+    """
+    oldSize = hdf5File["time"].shape[0]
+
+    if hdf5File["velocity"].maxshape[0] is not None:
+        raise ValueError("The velocity dataset is not resizable.")
+
+    if size < oldSize:
+        raise ValueError("The database can not be shrunk.")
+
+    hdf5File["time"].resize(size, axis=0)
+    hdf5File["velocity"].resize(size, axis=0)
+    if "completed" in hdf5File:
+        hdf5File["completed"].resize(size, axis=0)
+
+    return oldSize
+
+
+def get_written_positions_hdf5(hdf5File):
+    """Get the positions along the time axis for which the velocity
+    field has been written into an HDF5 file.
+
+    If the file does not contain the completed dataset, all the
+    positions are assumed to be written.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The the HDF5 file.
+
+    Returns
+    -------
+    ndarray
+        The sorted written positions.
+
+    """
+    if "completed" not in hdf5File:
+        return np.arange(hdf5File["time"].shape[0])
+
+    return np.nonzero(hdf5File["completed"][()])[0]
+
+
+def get_rank_file_path_hdf5(hdf5Path, rank):
+    """Get the path of the file written by a single process, when each
+    process writes its own HDF5 file.
+
+    The files are located in a directory next to the HDF5 file, named
+    as the file with the suffix ".ranks".
+
+    Parameters
+    ----------
+    hdf5Path : str
+        The path to the HDF5 file exposing the whole database.
+    rank : int
+        The rank of the process.
+
+    Returns
+    -------
+    str
+        The path to the file.
+
+    """
+    return os.path.join(hdf5Path+".ranks", "rank{0:05d}.hdf5".format(rank))
+
+
+def get_rank_file_paths_hdf5(hdf5Path):
+    """Get the paths of all the existing files written by single
+    processes, see :func:`get_rank_file_path_hdf5`.
+
+    Parameters
+    ----------
+    hdf5Path : str
+        The path to the HDF5 file exposing the whole database.
+
+    Returns
+    -------
+    list of str
+        The sorted paths to the files.
+
+    """
+    return sorted(glob.glob(os.path.join(hdf5Path+".ranks",
+                                         "rank[0-9]*.hdf5")))
+
+
+def create_virtual_datasets_hdf5(hdf5File, sourcePaths):
+    """Create the time, velocity and completed datasets as virtual
+    datasets combining the files written by single processes.
+
+    Each of the source files should contain the datasets created by
+    :func:`create_velocity_datasets_hdf5`. The positions along the time
+    axis marked as completed in a source file are mapped to the virtual
+    datasets. The source files are referenced relative to the
+    location of the HDF5 file. The points are copied from the first
+    source file containing them.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The the HDF5 file.
+    sourcePaths : list of str
+        The paths to the source files.
+
+    """
+    sizes = []
+    written = []
+    points = None
+    for sourcePath in sourcePaths:
+        with h5py.File(sourcePath, 'r') as sourceFile:
+            sizes.append(sourceFile["velocity"].shape[0])
+            nPoints = sourceFile["velocity"].shape[1]
+            written.append(get_written_positions_hdf5(sourceFile))
+            if points is None and "points" in sourceFile:
+                points = sourceFile["points"][()]
+
+    size = max(sizes)
+    shapes = {"time": (1,), "velocity": (nPoints, 3), "completed": ()}
+    dtypes = {"time": np.float64, "velocity": np.float64,
+              "completed": np.uint8}
+
+    layouts = dict((name, h5py.VirtualLayout((size,)+shapes[name],
+                                             dtypes[name]))
+                   for name in shapes)
+
+    fileDir = os.path.dirname(os.path.abspath(hdf5File.filename))
+
+    for sourcePath, sourceSize, positions in zip(sourcePaths, sizes,
+                                                 written):
+        relPath = os.path.relpath(os.path.abspath(sourcePath), fileDir)
+        sources = dict((name, h5py.VirtualSource(relPath, name,
+                                                 (sourceSize,)+shapes[name],
+                                                 dtypes[name]))
+                       for name in shapes)
+
+        # Map each contiguous range of written positions
+        breaks = np.nonzero(np.diff(positions) != 1)[0] + 1
+        for run in np.split(positions, breaks):
+            if run.size == 0:
+                continue
+            for name in shapes:
+                layouts[name][run[0]:run[-1]+1] = \
+                    sources[name][run[0]:run[-1]+1]
+
+    for name in shapes:
+        if name in hdf5File:
+            del hdf5File[name]
+        hdf5File.create_virtual_dataset(name, layouts[name], fillvalue=0)
+
+    if points is not None:
+        if "points" in hdf5File:
+            del hdf5File["points"]
+        hdf5File.create_dataset("points", data=points)
+
+
+def write_statistics_to_hdf5(hdf5File, pointsY, pointsZ, statistics):
+    """Write the statistics at each point of a structured grid into an
+    HDF5 file.
+
+    The points are saved as 2d datasets pointsY and pointsZ in the
+    points group, as in the precursor database. Each statistic is saved
+    as a dataset in the root of the file, the first two axes
+    corresponding to those of the points and the last one to the
+    components. Existing datasets are replaced.
+
+    Parameters
+    ----------
+    hdf5File : h5py.File
+        The HDF5 file.
+    pointsY : ndarray
+        A 2d array containing the values of y for the face centres.
+    pointsZ : ndarray
+        A 2d array containing the values of z for the face centres.
+    statistics : dict
+        The statistics, with the names of the datasets as keys.
+
+    """
+    if "/points" in hdf5File:
+        hdf5File.__delitem__("points")
+
+    pointsGroup = hdf5File.create_group("points")
+    pointsGroup.create_dataset("pointsY", data=pointsY)
+    pointsGroup.create_dataset("pointsZ", data=pointsZ)
+
+    for name in statistics:
+        if name in hdf5File:
+            hdf5File.__delitem__(name)
+        hdf5File.create_dataset(name, data=statistics[name])
@@ -8,9 +8,12 @@ timeVaryingMappedFixedValue boundary in OpenFOAM.
 
 """
 import os
+import gzip
+import io
 import numpy as np
 
-__all__ = ["write_points_to_ofnative", "write_velocity_to_ofnative"]
+__all__ = ["write_points_to_ofnative", "write_velocity_to_ofnative",
+           "get_written_times_ofnative"]
 
 
 def write_points_to_ofnative(writePath, pointsY, pointsZ, xVal):
@@ -44,7 +47,8 @@ def write_points_to_ofnative(writePath, pointsY, pointsZ, xVal):
                comments="", fmt='(%e %e %e)')
 
 
-def write_velocity_to_ofnative(writePath, t, uX, uY, uZ):
+def write_velocity_to_ofnative(writePath, t, uX, uY, uZ, compression=None,
+                               compressionLevel=6, executor=None):
     """Write the velocity field in a format used by OpenFOAM's
     timeVaryingMappedFixedValue boundary condition.
 
@@ -64,12 +68,30 @@ def write_velocity_to_ofnative(writePath, t, uX, uY, uZ):
     uZ : ndarray
         A 2d ndarray containing the spanwise component of the velocity
         field.
+    compression : str, optional
+        If "gzip", the file is compressed and saved as U.gz, which
+        OpenFOAM reads transparently. By default the data is not
+        compressed.
+    compressionLevel : int, optional
+        The gzip compression level, 1 to 9 (default 6).
+    executor : concurrent.futures.Executor, optional
+        If provided, the compression and writing of the file are
+        submitted to the executor, which is typically a thread pool.
+
+    Returns
+    -------
+    concurrent.futures.Future or None
+        The future of the submitted write if an executor is provided,
+        otherwise None.
 
     """
     vectorHeader = \
         "FoamFile\n{\nversion 2.0;\nformat ascii;\n\
         class vectorAverageField;\nobject points;\n}\n\n(0 0 0)\n"
 
+    if compression not in [None, "gzip"]:
+        raise ValueError("Unknown compression filter: "+str(compression))
+
     if not os.path.exists(os.path.join(writePath, str(t))):
         os.mkdir(os.path.join(writePath, str(t)))
 
@@ -79,6 +101,76 @@ def write_velocity_to_ofnative(writePath, t, uX, uY, uZ):
 
     u = np.concatenate((uX, uY, uZ), axis=1)
 
-    np.savetxt(os.path.join(writePath, str(t), "U"), u,
+    uPath = os.path.join(writePath, str(t), "U")
+
+    # Formatting holds the GIL, so it is done here, the compression
+    # and the writing can then be performed in the background
+    text = io.BytesIO()
+    np.savetxt(text, u,
                header=vectorHeader+str(u.shape[0])+"\n(", footer=")\n",
                comments="", fmt='(%e %e %e)')
+
+    if compression == "gzip":
+        uPath += ".gz"
+
+    if executor is None:
+        _write_file(uPath, text.getvalue(), compression, compressionLevel)
+        return None
+    else:
+        return executor.submit(_write_file, uPath, text.getvalue(),
+                               compression, compressionLevel)
+
+
+def _write_file(filePath, data, compression, compressionLevel):
+    """Write the data to a file, compressing it if required.
+
+    The data is first written to a temporary file, which is then
+    renamed, so that an interrupted write never leaves a partial file
+    behind.
+
+    """
+    if compression == "gzip":
+        with open(filePath+".tmp", 'wb') as rawFile:
+            with gzip.GzipFile(os.path.basename(filePath)[:-3], 'wb',
+                               compressionLevel, rawFile) as gzFile:
+                gzFile.write(data)
+    else:
+        with open(filePath+".tmp", 'wb') as rawFile:
+            rawFile.write(data)
+
+    os.rename(filePath+".tmp", filePath)
+
+
+def get_written_times_ofnative(writePath):
+    """Get the time values for which the velocity field has been
+    written in the format used by OpenFOAM's
+    timeVaryingMappedFixedValue boundary condition.
+
+    Only time directories containing a U or U.gz file are considered.
+
+    Parameters
+    ----------
+    writePath : str
+        The path where the time directories containing the U files are
+        located. Commonly constant/boundaryData/nameOfInletPatch.
+
+    Returns
+    -------
+    ndarray
+        The sorted time values.
+
+    """
+    times = []
+    if not os.path.isdir(writePath):
+        return np.array(times)
+
+    for name in os.listdir(writePath):
+        if not (os.path.isfile(os.path.join(writePath, name, "U")) or
+                os.path.isfile(os.path.join(writePath, name, "U.gz"))):
+            continue
+        try:
+            times.append(float(name))
+        except ValueError:
+            continue
+
+    return np.sort(times)
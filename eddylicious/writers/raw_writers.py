@@ -0,0 +1,316 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+"""Functions for writing to a store of raw binary files, which can be
+memory-mapped by the reading application.
+
+The store is a directory containing the following files.
+
+    header.json :
+        The amount of time-steps and points, the data type of the
+        velocity values and the names of the other files.
+    points.npy :
+        The points, an (nPoints, 3) array in the npy format.
+    time.raw :
+        The values of time, nTimes float64 values.
+    velocity.raw :
+        The velocity field, a C-ordered (nTimes, nPoints, 3) array.
+    completed.raw :
+        nTimes uint8 values marking the written positions.
+
+All the binary files are in the native byte order.
+
+The velocity and the time are flushed to the disk before a position is
+marked as written, so that a position marked in completed.raw is never
+missing its values, e.g. when resuming after a crash.
+
+"""
+import os
+import json
+import numpy as np
+from ..readers.raw_readers import read_header_raw
+
+__all__ = ["write_points_to_raw", "write_velocity_to_raw",
+           "write_velocities_to_raw", "create_velocity_files_raw",
+           "extend_velocity_files_raw",
+           "get_written_positions_raw"]
+
+
+def write_points_to_raw(writePath, pointsY, pointsZ, xVal):
+    """Write the points into a raw store.
+
+    The points are saved in the same layout as by
+    :func:`~eddylicious.writers.hdf5_writers.write_points_to_hdf5`.
+
+    Parameters
+    ----------
+    writePath : str
+        The path to the directory of the store.
+    pointsY : ndarray
+        A 2d array containing the values of y for the face centres.
+    pointsZ : ndarray
+        A 2d array containing the values of z for the face centres.
+    xVal : float
+        The x-location of the inflow plane.
+
+    """
+    points = np.zeros((pointsY.size, 2))
+    points[:, 0] = np.reshape(pointsY, (pointsY.size, -1), order='F')[:, 0]
+    points[:, 1] = np.reshape(pointsZ, (pointsZ.size, -1), order='F')[:, 0]
+    points = np.concatenate((xVal*np.ones((points.shape[0], 1)), points),
+                            axis=1)
+
+    np.save(os.path.join(writePath, "points.npy"), points)
+
+
+def write_velocity_to_raw(writePath, t, uX, uY, uZ, iteration, header=None):
+    """Write the velocity field into a raw store.
+
+    Only the part of the files associated with the given position is
+    memory-mapped, so several processes can write into the store
+    simultaneously. The corresponding time value is also written and
+    the position is marked as completed.
+
+    Parameters
+    ----------
+    writePath : str
+        The path to the directory of the store.
+    t : float
+        The value of time associated with the written
+        velocity field.
+    uX : ndarray
+        A 2d ndarray containing the streamwise component of the velocity
+        field.
+    uY : ndarray
+        A 2d ndarray containing the wall-normal component of the
+        velocity field.
+    uZ : ndarray
+        A 2d ndarray containing the spanwise component of the velocity
+        field.
+    iteration: int
+        The position of along the time axis.
+    header : dict, optional
+        The header of the store, see
+        :func:`~eddylicious.readers.raw_readers.read_header_raw`. By
+        default it is read from the store, pass it to avoid reading it
+        for each time-step.
+
+    """
+    if header is None:
+        header = read_header_raw(writePath)
+    nPoints = header["nPoints"]
+    dtype = np.dtype(header["dtype"])
+
+    if iteration >= header["nTimes"]:
+        raise ValueError("Write position larger than total database size.")
+
+    velocity = np.memmap(os.path.join(writePath, header["velocity"]),
+                         dtype=dtype, mode='r+', shape=(nPoints, 3),
+                         offset=iteration*nPoints*3*dtype.itemsize)
+    velocity[:, 0] = np.reshape(uX, uX.size, order='F')
+    velocity[:, 1] = np.reshape(uY, uY.size, order='F')
+    velocity[:, 2] = np.reshape(uZ, uZ.size, order='F')
+    velocity.flush()
+    del velocity
+
+    time = np.memmap(os.path.join(writePath, header["time"]),
+                     dtype=np.float64, mode='r+', shape=(1,),
+                     offset=iteration*8)
+    time[0] = t
+    time.flush()
+    del time
+
+    completed = np.memmap(os.path.join(writePath, header["completed"]),
+                          dtype=np.uint8, mode='r+', shape=(1,),
+                          offset=iteration)
+    completed[0] = 1
+    completed.flush()
+    del completed
+
+
+def write_velocities_to_raw(writePath, t, uX, uY, uZ, start, header=None):
+    """Write the velocity fields of several consecutive positions along
+    the time axis into a raw store.
+
+    The positions are written at once, memory-mapping a single part of
+    each file.
+
+    Parameters
+    ----------
+    writePath : str
+        The path to the directory of the store.
+    t : ndarray
+        The values of time associated with the written velocity fields.
+    uX : ndarray
+        A 2d ndarray containing the streamwise component of the velocity
+        fields, a row for each position.
+    uY : ndarray
+        A 2d ndarray containing the wall-normal component of the
+        velocity fields, a row for each position.
+    uZ : ndarray
+        A 2d ndarray containing the spanwise component of the velocity
+        fields, a row for each position.
+    start : int
+        The first position along the time axis.
+    header : dict, optional
+        The header of the store, see
+        :func:`~eddylicious.readers.raw_readers.read_header_raw`. By
+        default it is read from the store, pass it to avoid reading it
+        for each time-step.
+
+    """
+    if header is None:
+        header = read_header_raw(writePath)
+    nPoints = header["nPoints"]
+    dtype = np.dtype(header["dtype"])
+    nSteps = len(t)
+
+    if start + nSteps > header["nTimes"]:
+        raise ValueError("Write position larger than total database size.")
+
+    velocity = np.memmap(os.path.join(writePath, header["velocity"]),
+                         dtype=dtype, mode='r+', shape=(nSteps, nPoints, 3),
+                         offset=start*nPoints*3*dtype.itemsize)
+    velocity[:, :, 0] = uX
+    velocity[:, :, 1] = uY
+    velocity[:, :, 2] = uZ
+    velocity.flush()
+    del velocity
+
+    time = np.memmap(os.path.join(writePath, header["time"]),
+                     dtype=np.float64, mode='r+', shape=(nSteps,),
+                     offset=start*8)
+    time[:] = t
+    time.flush()
+    del time
+
+    completed = np.memmap(os.path.join(writePath, header["completed"]),
+                          dtype=np.uint8, mode='r+', shape=(nSteps,),
+                          offset=start)
+    completed[:] = 1
+    completed.flush()
+    del completed
+
+
+def create_velocity_files_raw(writePath, size, nPoints, t0,
+                              dtype="float64"):
+    """Create the header and preallocate the time, velocity and
+    completed files of a raw store.
+
+    The files are preallocated by setting their size, which on most
+    file systems does not write any data.
+
+    Parameters
+    ----------
+    writePath : str
+        The path to the directory of the store.
+    size : int
+        The amount of time-steps in the store.
+    nPoints : int
+        The amount of points at the inflow boundary.
+    t0 : float
+        The value used to initialize the time values.
+    dtype : str, optional
+        The data type of the velocity values, float64 (default) or
+        float32.
+
+    """
+    if np.dtype(dtype) not in [np.float64, np.float32]:
+        raise ValueError("Unsupported data type: "+str(dtype))
+
+    header = {"nTimes": int(size),
+              "nPoints": int(nPoints),
+              "dtype": np.dtype(dtype).str,
+              "layout": ["time", "point", "component"],
+              "points": "points.npy",
+              "time": "time.raw",
+              "velocity": "velocity.raw",
+              "completed": "completed.raw"}
+
+    for name in ["time", "velocity", "completed"]:
+        filePath = os.path.join(writePath, header[name])
+        if os.path.exists(filePath):
+            os.remove(filePath)
+
+    _allocate_files(writePath, header)
+    _write_header(writePath, header)
+
+    time = np.memmap(os.path.join(writePath, header["time"]),
+                     dtype=np.float64, mode='r+', shape=(size,))
+    time[:] = t0
+    del time
+
+
+def extend_velocity_files_raw(writePath, size):
+    """Enlarge the time, velocity and completed files of a raw store.
+
+    Parameters
+    ----------
+    writePath : str
+        The path to the directory of the store.
+    size : int
+        The new amount of time-steps in the store.
+
+    Returns
+    -------
+    int
+        The amount of time-steps in the store before enlarging.
+
+    """
+    header = read_header_raw(writePath)
+    oldSize = header["nTimes"]
+
+    if size < oldSize:
+        raise ValueError("The database can not be shrunk.")
+
+    header["nTimes"] = int(size)
+    _allocate_files(writePath, header)
+    _write_header(writePath, header)
+
+    return oldSize
+
+
+def get_written_positions_raw(writePath):
+    """Get the positions along the time axis for which the velocity
+    field has been written into a raw store.
+
+    Parameters
+    ----------
+    writePath : str
+        The path to the directory of the store.
+
+    Returns
+    -------
+    ndarray
+        The sorted written positions.
+
+    """
+    header = read_header_raw(writePath)
+    completed = np.fromfile(os.path.join(writePath, header["completed"]),
+                            dtype=np.uint8, count=header["nTimes"])
+    return np.nonzero(completed)[0]
+
+
+def _allocate_files(writePath, header):
+    """Set the size of the binary files according to the header."""
+    itemSizes = {"time": 8,
+                 "velocity": 3*header["nPoints"]*np.dtype(
+                     header["dtype"]).itemsize,
+                 "completed": 1}
+
+    for name in itemSizes:
+        with open(os.path.join(writePath, header[name]), 'ab') as rawFile:
+            rawFile.truncate(header["nTimes"]*itemSizes[name])
+
+
+def _write_header(writePath, header):
+    """Write the header, replacing the old one only once it is complete.
+
+    """
+    headerPath = os.path.join(writePath, "header.json")
+    with open(headerPath+".tmp", 'w') as headerFile:
+        json.dump(header, headerFile, indent=4)
+
+    os.rename(headerPath+".tmp", headerPath)
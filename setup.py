@@ -7,7 +7,7 @@ setup(name='eddylicious',
       url='https://github.com/timofeymukha/eddylicious',
       author='Timofey Mukha',
       author_email='timofey.mukha@it.uu.se',
-      packages=find_packages(),
+      packages=find_packages(exclude=['benchmarks']),
       entry_points = {
           'console_scripts':[
               'inflowStats=eddylicious.bin.inflowStats:main',
@@ -0,0 +1,82 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.estimation import *
+from eddylicious.generators.timing import get_timers, timing_summary
+from eddylicious.generators.executors import get_executor
+from eddylicious.writers.raw_writers import *
+import numpy as np
+import pytest
+import os
+
+
+def test_estimate_runtime():
+    assert estimate_runtime(2.0, 1.0, 10, 1) == 30
+    assert estimate_runtime(2.0, 1.0, 10, 2, setupTime=5) == 20
+    assert estimate_runtime(2.0, 1.0, 10, 20) == 3
+
+    # The writing is not distributed
+    assert estimate_runtime(2.0, 1.0, 10, 4, "pool") == 10
+    assert estimate_runtime(2.0, 1.0, 10, 2, "pool") == 10
+    assert estimate_runtime(2.0, 1.0, 10, 1, "pool") == 20
+
+
+def test_estimate_output_size_raw(tmpdir):
+    writePath = str(tmpdir)
+    nPoints = 12
+    nTimes = 3
+    u = np.ones((3, 4))
+
+    create_velocity_files_raw(writePath, nTimes, nPoints, 0)
+    write_points_to_raw(writePath, u, u, 0)
+    for i in range(nTimes):
+        write_velocity_to_raw(writePath, i, u, u, u, i)
+
+    size = sum(os.path.getsize(os.path.join(writePath, fileName))
+               for fileName in ["time.raw", "velocity.raw", "completed.raw"])
+    points = np.load(os.path.join(writePath, "points.npy")).nbytes
+
+    assert estimate_output_size("raw", nPoints, nTimes) == size + points
+
+
+def test_estimate_output_size():
+    assert estimate_output_size("hdf5", 10, 0) == 240
+    assert estimate_output_size("raw", 10, 1, "float32") == \
+        240 + 120 + 9
+    assert estimate_output_size("ofnative", 10, 2) > \
+        estimate_output_size("ofnative", 10, 1)
+
+    with pytest.raises(ValueError):
+        estimate_output_size("vtk", 10, 1)
+
+
+def test_peak_memory():
+    memory = peak_memory()
+    assert memory is None or memory > np.zeros(2**20).nbytes
+
+
+def test_directory_size(tmpdir):
+    os.makedirs(os.path.join(str(tmpdir), "a"))
+    with open(os.path.join(str(tmpdir), "a", "b"), 'wb') as binaryFile:
+        binaryFile.write(b"1"*10000)
+
+    assert directory_size(str(tmpdir)) >= 10000
+
+
+def test_print_estimate(tmpdir, capsys):
+    timers = get_timers()
+    with timers("read"):
+        pass
+    with timers("write"):
+        pass
+
+    summary = timing_summary(timers, get_executor("serial").comm)
+    print_estimate(summary, 1, 100, 10, "raw", 1, "serial",
+                   memory=[peak_memory()], writtenSize=100,
+                   writePath=os.path.join(str(tmpdir), "missing"))
+
+    output = capsys.readouterr().out
+    assert "(measured)" in output
+    assert "Peak memory" in output
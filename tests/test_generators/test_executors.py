@@ -0,0 +1,117 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.executors import *
+import numpy as np
+import pytest
+import os
+
+
+def _square(item):
+    return [item**2, os.getpid()]
+
+
+def test_serial():
+    executor = get_executor("serial")
+    results = []
+
+    executor(np.arange(10), _square,
+             lambda item, result: results.append((item, result[0])))
+
+    assert executor.backend == "serial"
+    assert executor.nProcs == 1
+    assert results == [(i, i**2) for i in range(10)]
+
+
+def test_pool():
+    executor = get_executor("pool", nWorkers=2, blockSize=3)
+    results = []
+
+    executor(np.arange(20), _square,
+             lambda item, result: results.append((item, result)))
+
+    assert executor.backend == "pool"
+    assert executor.nProcs == 2
+    assert [item for item, result in results] == list(range(20))
+    assert [result[0] for item, result in results] == \
+        [i**2 for i in range(20)]
+    assert os.getpid() not in [result[1] for item, result in results]
+
+
+def test_pool_empty():
+    executor = get_executor("pool", nWorkers=2)
+    results = []
+
+    executor(np.arange(0), _square,
+             lambda item, result: results.append(item))
+
+    assert results == []
+
+
+@pytest.mark.parametrize("schedule", ["dynamic", "static"])
+def test_mpi(schedule):
+    pytest.importorskip("mpi4py")
+    executor = get_executor("mpi", blockSize=3, schedule=schedule)
+    results = []
+
+    executor(np.arange(10), _square,
+             lambda item, result: results.append((item, result[0])))
+
+    assert executor.comm.Get_size() == 1
+    assert results == [(i, i**2) for i in range(10)]
+
+
+def test_single_process_comm():
+    comm = get_executor("serial").comm
+
+    assert comm.Get_rank() == 0
+    assert comm.Get_size() == 1
+    assert comm.bcast(3) == 3
+    assert comm.gather(3) == [3]
+    assert comm.allgather(3) == [3]
+
+
+@pytest.mark.parametrize("backend", ["serial", "mpi"])
+def test_broadcast_array(backend):
+    if backend == "mpi":
+        pytest.importorskip("mpi4py")
+    comm = get_executor(backend).comm
+
+    array = broadcast_array(np.arange(6).reshape(2, 3), comm)
+    assert array.shape == (2, 3)
+    assert np.all(array.ravel() == np.arange(6))
+
+    array = broadcast_array(np.zeros(0, dtype=np.int32), comm)
+    assert array.size == 0 and array.dtype == np.int32
+
+
+def test_call_on_root():
+    comm = get_executor("serial").comm
+
+    assert call_on_root(comm, max, 1, 2) == 2
+
+    with pytest.raises(ValueError):
+        call_on_root(comm, int, "a")
+
+
+def test_open_hdf5(tmpdir):
+    executor = get_executor("serial")
+    filePath = os.path.join(str(tmpdir), "test.hdf5")
+
+    hdf5File = open_hdf5(filePath, 'a', executor)
+    hdf5File.create_dataset("a", data=np.arange(3))
+    hdf5File.close()
+
+    hdf5File = open_hdf5(filePath, 'r', executor)
+    assert np.all(hdf5File["a"][()] == np.arange(3))
+    hdf5File.close()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_executor("threads")
+
+    with pytest.raises(ValueError):
+        get_executor("serial", schedule="guided")
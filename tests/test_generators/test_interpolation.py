@@ -0,0 +1,174 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.interpolation import *
+from eddylicious.generators.executors import get_executor
+from eddylicious.writers.raw_writers import create_velocity_files_raw
+from eddylicious.readers.raw_readers import read_velocity_raw
+from scipy.interpolate import NearestNDInterpolator
+import numpy as np
+import pytest
+import os
+
+
+def test_nearest_neighbours():
+    points = np.random.RandomState(0).rand(50, 2)
+    pointsTarget = np.random.RandomState(1).rand(20, 2)
+    values = np.arange(50, dtype=np.float64)
+
+    indices = nearest_neighbours(points, pointsTarget)
+
+    assert np.all(values[indices] ==
+                  NearestNDInterpolator(points, values)(pointsTarget))
+
+
+def test_rectilinear_grid():
+    [y, z] = np.meshgrid([0., 0.5, 2.], [1., 1.5], indexing="ij")
+    shuffle = np.random.RandomState(0).permutation(6)
+    pointsY = y.ravel()[shuffle] + 1e-12
+    pointsZ = z.ravel()[shuffle]
+
+    [axisY, axisZ, order] = rectilinear_grid(pointsY, pointsZ)
+
+    assert np.allclose(axisY, [0, 0.5, 2])
+    assert np.allclose(axisZ, [1, 1.5])
+    assert np.allclose(pointsY[order], y)
+    assert np.allclose(pointsZ[order], z)
+
+    # A missing node and a duplicated one
+    pointsZ[0] = pointsZ[1]
+    assert rectilinear_grid(pointsY, pointsZ) is None
+    assert rectilinear_grid(pointsY[1:], pointsZ[1:]) is None
+
+
+def test_linear_weights():
+    axis = np.array([0., 1., 3.])
+
+    weights = linear_weights(axis, [-1, 0, 0.5, 2, 3, 4])
+
+    assert np.allclose(weights.sum(axis=1), 1)
+    assert np.allclose(weights.dot(axis), [0, 0, 0.5, 2, 3, 3])
+    assert np.all(linear_weights(axis[:1], [0.5]) == 1)
+
+
+def test_geometry_hash():
+    points = np.linspace(0, 1, 5)
+
+    assert geometry_hash(points, [0, 1]) == geometry_hash(points, [0., 1.])
+    assert geometry_hash(points, [0, 1]) != geometry_hash(points, [0, 2])
+    assert geometry_hash(points, [0, 1]) != geometry_hash(points[:4], [0, 1])
+
+
+def test_interpolation_cache(tmpdir):
+    filePath = os.path.join(str(tmpdir), "cache.npz")
+
+    assert load_interpolation_cache(filePath, "key") is None
+
+    save_interpolation_cache(filePath, "key", indices=np.arange(3))
+    assert os.listdir(str(tmpdir)) == ["cache.npz"]
+
+    cache = load_interpolation_cache(filePath, "key")
+    assert list(cache) == ["indices"]
+    assert np.all(cache["indices"] == np.arange(3))
+
+    assert load_interpolation_cache(filePath, "otherKey") is None
+
+
+def test_interpolation_generate(tmpdir):
+    points = np.random.RandomState(0).rand(30, 2)
+    pointsInfl = np.random.RandomState(1).rand(10, 2)
+    values = np.random.RandomState(2).rand(3, 31)
+    idxPrec = np.arange(1, 31)
+
+    def read(timeIndex):
+        return [timeIndex*values[0], values[1], values[2]]
+
+    read.reader = "hdf5"
+
+    written = {}
+
+    def write(indices=None):
+        written.clear()
+        interpolation_generate(read, "ofnative", str(tmpdir), 1, 0, 3, 0,
+                               points, pointsInfl, idxPrec, range(4),
+                               executor=get_executor("serial"),
+                               indices=indices)
+        for t in range(4):
+            with open(os.path.join(str(tmpdir), str(float(t)), "U")) as f:
+                written[t] = f.read()
+
+    write()
+    expected = dict(written)
+    write(nearest_neighbours(points, pointsInfl))
+
+    assert written == expected
+    interp = NearestNDInterpolator(points, values[0, idxPrec])
+    assert "{0:e}".format(3*interp(pointsInfl)[0]) in written[3]
+
+
+def test_interpolation_generate_rectilinear(tmpdir):
+    [y, z] = np.meshgrid(np.linspace(0, 1, 5), np.linspace(0, 1, 4),
+                         indexing="ij")
+    points = np.column_stack((y.ravel(), z.ravel()))
+    [yInfl, zInfl] = np.meshgrid(np.linspace(0, 1, 7), np.linspace(0, 1, 6),
+                                 indexing="ij")
+    pointsInfl = np.column_stack((yInfl.ravel(), zInfl.ravel()))
+
+    def read(timeIndex):
+        return [1 + 2*points[:, 0] + 3*points[:, 1], points[:, 0]*0,
+                points[:, 1]]
+
+    read.reader = "hdf5"
+
+    writePath = str(tmpdir)
+    create_velocity_files_raw(writePath, 1, pointsInfl.shape[0], 0)
+
+    grids = [rectilinear_grid(points[:, 0], points[:, 1]),
+             rectilinear_grid(pointsInfl[:, 0], pointsInfl[:, 1])]
+    interpolation_generate(read, "raw", writePath, 1, 0, 0, 0,
+                           points, pointsInfl, np.arange(20), [0],
+                           executor=get_executor("serial"), grids=grids)
+
+    # Linear fields are interpolated exactly
+    [uX, uY, uZ] = read_velocity_raw(writePath)(0)
+    assert np.allclose(uX, 1 + 2*pointsInfl[:, 0] + 3*pointsInfl[:, 1])
+    assert np.allclose(uZ, pointsInfl[:, 1])
+
+
+@pytest.mark.parametrize("rectilinear", [False, True])
+def test_interpolation_generate_batches(tmpdir, rectilinear):
+    [y, z] = np.meshgrid(np.linspace(0, 1, 5), np.linspace(0, 1, 4),
+                         indexing="ij")
+    points = np.column_stack((y.ravel(), z.ravel()))
+    pointsInfl = np.random.RandomState(0).rand(10, 2)
+    values = np.random.RandomState(1).rand(3, 3, 20)
+
+    def read(timeIndex):
+        return list(values[timeIndex])
+
+    read.reader = "hdf5"
+
+    grids = None
+    if rectilinear:
+        pointsInfl = points[::2]
+        grids = [rectilinear_grid(points[:, 0], points[:, 1]),
+                 rectilinear_grid(pointsInfl[:, 0], pointsInfl[:, 1])]
+
+    velocities = []
+    for batchSize in [1, 4]:
+        writePath = os.path.join(str(tmpdir), str(batchSize))
+        os.makedirs(writePath)
+        create_velocity_files_raw(writePath, 8, pointsInfl.shape[0], 0)
+
+        interpolation_generate(read, "raw", writePath, 1, 0, 7, 0,
+                               points, pointsInfl, np.arange(20), range(3),
+                               recycling=True, recyclingReflect=True,
+                               executor=get_executor("serial"), grids=grids,
+                               batchSize=batchSize)
+
+        velocities.append([read_velocity_raw(writePath)(i)
+                           for i in range(8)])
+
+    assert np.allclose(velocities[0], velocities[1])
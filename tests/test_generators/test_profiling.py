@@ -0,0 +1,44 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.profiling import *
+from eddylicious.generators.executors import get_executor
+import os
+
+
+def _profiled_function():
+    return sum(i**2 for i in range(1000))
+
+
+def test_get_rank_profile_path():
+    assert get_rank_profile_path("prof", 12) == "prof.rank00012.pstats"
+
+
+def test_profiling(tmpdir, capsys):
+    profilePath = os.path.join(str(tmpdir), "prof")
+
+    profiler = start_profiling()
+    _profiled_function()
+    stop_profiling(profiler, profilePath, get_executor("serial").comm)
+
+    assert os.path.isfile(get_rank_profile_path(profilePath, 0))
+    assert os.path.isfile(profilePath + ".pstats")
+    assert "_profiled_function" in capsys.readouterr().out
+
+
+def test_merge_profiles(tmpdir):
+    paths = []
+    for i in range(2):
+        profiler = start_profiling()
+        _profiled_function()
+        profiler.disable()
+        paths.append(os.path.join(str(tmpdir), str(i) + ".pstats"))
+        profiler.dump_stats(paths[-1])
+
+    stats = merge_profiles(paths)
+    calls = [stats.stats[key][1] for key in stats.stats
+             if key[2] == "_profiled_function"]
+
+    assert calls == [2]
@@ -0,0 +1,54 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.recycling import *
+import numpy as np
+
+
+def test_recycling_passes():
+    [passes, locations] = recycling_passes(np.arange(8), 3)
+
+    assert np.all(passes == [0, 0, 0, 1, 1, 1, 2, 2])
+    assert np.allclose(locations, [0, 1, 2, 0, 1, 2, 0, 1])
+
+
+def test_recycling_passes_fractional_period():
+    [passes, locations] = recycling_passes(np.arange(6), 2.5)
+
+    assert np.all(passes == [0, 0, 0, 1, 1, 2])
+    assert np.allclose(locations, [0, 1, 2, 0.5, 1.5, 0])
+
+
+def test_recycling_shift():
+    assert recycling_shift(0) == 0
+    assert np.isclose(recycling_shift(3, 0.4), 0.2)
+
+    shifts = [recycling_shift(i) for i in range(10)]
+    assert np.unique(np.round(shifts, 6)).size == 10
+
+
+def test_recycling_order():
+    positions = recycling_order(np.arange(7), 3)
+
+    assert np.all(positions == [0, 3, 6, 1, 4, 2, 5])
+
+
+def test_cached_reader():
+    calls = []
+
+    def read(timeIndex):
+        calls.append(timeIndex)
+        return [np.ones(2)*timeIndex, np.zeros(2), np.zeros(2)]
+
+    read.reader = "hdf5"
+    cachedRead = cached_reader(read, [0, 1, 2])
+
+    for timeIndex in [0, 0, 1, 1, 1, 2, 0]:
+        [uX, uY, uZ] = cachedRead(timeIndex)
+        assert np.all(uX == timeIndex)
+        # The returned arrays can be modified
+        uX += 10
+
+    assert calls == [0, 1, 2, 0]
@@ -0,0 +1,170 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.scripts import *
+from eddylicious.generators.executors import get_executor
+from eddylicious.generators.profiling import get_rank_profile_path
+from eddylicious.writers.raw_writers import write_velocity_to_raw
+from eddylicious.readers.raw_readers import read_header_raw
+import numpy as np
+import argparse
+import pytest
+import os
+
+
+def get_config(writePath, writer):
+    return {"writer": writer, "writePath": writePath, "t0": "0",
+            "dt": "0.5", "inletPatchName": "inlet",
+            "hdf5FileName": "inflow.hdf5", "rawStoreName": "inflow.raw"}
+
+
+def test_add_generator_arguments():
+    parser = argparse.ArgumentParser()
+    add_generator_arguments(parser)
+
+    args = parser.parse_args(["--config", "config", "--dry-run"])
+    assert args.dry_run == 4
+    assert not args.append and not args.resume
+    assert not args.timing and args.profile is None
+
+    executor = get_generator_executor({"backend": "serial"}, args)
+    assert executor.backend == "serial"
+
+
+def test_run_with_diagnostics(tmpdir, capsys):
+    parser = argparse.ArgumentParser()
+    add_diagnostics_arguments(parser)
+    profilePath = tmpdir.join("prof").strpath
+    comm = get_executor("serial").comm
+
+    args = parser.parse_args(["--timing", "--profile", profilePath])
+    [timers, profiler] = start_diagnostics(args)
+    assert timers.enabled and profiler is not None
+    profiler.disable()
+
+    def run(timers):
+        with timers("compute"):
+            pass
+
+    run_with_diagnostics(run, args, comm)
+    assert "compute" in capsys.readouterr().out
+    assert os.path.isfile(profilePath+".pstats")
+
+    # A failed run still saves the profile of each process
+    os.remove(get_rank_profile_path(profilePath, 0))
+
+    def fail(timers):
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        run_with_diagnostics(fail, args, comm)
+    assert os.path.isfile(get_rank_profile_path(profilePath, 0))
+
+
+def test_set_up_dry_run(tmpdir):
+    config = get_config(tmpdir.strpath, "raw")
+    args = argparse.Namespace(append=True, resume=False)
+
+    outputPath = set_up_dry_run(config, args, get_executor("serial").comm)
+
+    assert outputPath == tmpdir.strpath
+    assert os.path.dirname(config["writePath"]) == tmpdir.strpath
+    assert not args.append
+
+
+def test_set_write_path_raw(tmpdir):
+    config = get_config(tmpdir.strpath, "raw")
+    storePath = tmpdir.join("inflow.raw")
+
+    # A store left without a header by an interrupted run
+    storePath.ensure("velocity.raw")
+    assert set_write_path(config, get_executor("serial")) == storePath.strpath
+    assert os.listdir(storePath.strpath) == []
+
+    storePath.ensure("velocity.raw")
+    set_write_path(config, get_executor("serial"), keep=True)
+    assert os.listdir(storePath.strpath) == ["velocity.raw"]
+
+
+def test_prepare_output_raw(tmpdir):
+    config = get_config(tmpdir.strpath, "raw")
+    executor = get_executor("serial")
+    pointsY = np.random.RandomState(0).rand(3, 2)
+    pointsZ = np.random.RandomState(1).rand(3, 2)
+
+    [writePath, positions, writerOptions] = prepare_output(
+        config, executor, 4, pointsY, pointsZ, 0.0)
+
+    assert writePath == os.path.join(tmpdir.strpath, "inflow.raw")
+    assert np.all(positions == np.arange(4))
+    assert writerOptions == {"header": read_header_raw(writePath)}
+
+    for i in [0, 2]:
+        write_velocity_to_raw(writePath, 0.5*i, pointsY, pointsY, pointsZ, i,
+                              **writerOptions)
+    finish_output(config, executor, writePath, writerOptions)
+
+    [writePath, positions, writerOptions] = prepare_output(
+        config, executor, 6, pointsY, pointsZ, 0.0, resume=True)
+    assert np.all(positions == [1, 3, 4, 5])
+    assert read_header_raw(writePath)["nTimes"] == 6
+
+    [writePath, positions, writerOptions] = prepare_output(
+        config, executor, 6, pointsY, pointsZ, 0.0, append=True)
+    assert np.all(positions == [])
+
+
+def test_prepare_output_dry_run(tmpdir):
+    config = get_config(tmpdir.strpath, "raw")
+    executor = get_executor("serial")
+    points = np.zeros((2, 2))
+
+    [writePath, positions, writerOptions] = prepare_output(
+        config, executor, 100, points, points, 0.0, dryRun=3)
+
+    assert np.all(positions == np.arange(3))
+    assert read_header_raw(writePath)["nTimes"] == 3
+
+
+def test_prepare_output_ofnative(tmpdir):
+    config = get_config(tmpdir.strpath, "ofnative")
+    config["compression"] = "gzip"
+    executor = get_executor("serial")
+    points = np.zeros((2, 2))
+
+    [writePath, positions, writerOptions] = prepare_output(
+        config, executor, 3, points, points, 0.0, dryRun=1)
+
+    assert os.path.isfile(os.path.join(writePath, "points"))
+    assert np.all(positions == [0])
+    assert writerOptions == {"compression": "gzip"}
+
+
+def test_prepare_output_compression(tmpdir):
+    config = get_config(tmpdir.strpath, "hdf5")
+    config["compression"] = "gzip"
+    points = np.zeros((2, 2))
+
+    class TwoProcessComm(object):
+        def Get_rank(self):
+            return 0
+
+        def Get_size(self):
+            return 2
+
+    # Several processes writing to a single compressed file
+    executor = get_executor("serial")
+    executor.backend = "mpi"
+    executor.comm = TwoProcessComm()
+    with pytest.raises(ValueError):
+        prepare_output(config, executor, 3, points, points, 0.0)
+    assert os.listdir(tmpdir.strpath) == []
+
+    # A single process
+    executor = get_executor("serial")
+    [writePath, positions, writerOptions] = prepare_output(
+        config, executor, 3, points, points, 0.0)
+    assert writePath["velocity"].compression == "gzip"
+    finish_output(config, executor, writePath, writerOptions)
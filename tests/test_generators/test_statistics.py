@@ -0,0 +1,227 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.statistics import *
+from eddylicious.generators.executors import get_executor
+from eddylicious.writers.ofnative_writers import write_points_to_ofnative
+from eddylicious.writers.ofnative_writers import write_velocity_to_ofnative
+import numpy as np
+import pytest
+import h5py
+import os
+
+
+def test_block_moments():
+    u = np.random.RandomState(0).rand(10, 4, 3)
+
+    moments = block_moments(u)
+
+    assert moments["count"] == 10
+    assert np.allclose(moments["mean"], np.mean(u, axis=0))
+    assert np.allclose(moments["m2"]/10, np.var(u, axis=0))
+    assert block_moments(u[:0]) is None
+
+
+def test_merge_moments():
+    u = np.random.RandomState(0).rand(17, 5, 3)
+
+    moments = None
+    for block in time_blocks(17, 4):
+        moments = merge_moments(moments, block_moments(u[block]))
+    moments = merge_moments(moments, None)
+
+    assert moments["count"] == 17
+    assert np.allclose(moments["mean"], np.mean(u, axis=0))
+    assert np.allclose(moments["m2"]/17, np.var(u, axis=0))
+
+
+def test_merge_moments_higher():
+    u = np.random.RandomState(0).rand(17, 5, 3)**2
+    deviation = u - np.mean(u, axis=0)
+
+    moments = None
+    for block in time_blocks(17, 5):
+        moments = merge_moments(moments, block_moments(u[block],
+                                                       crossTerms=True,
+                                                       order=4))
+
+    assert moments["m2"].shape == (5, 6)
+    assert np.allclose(moments["m2"][..., 1]/17,
+                       np.mean(deviation[..., 0]*deviation[..., 1], axis=0))
+    assert np.allclose(moments["m2"][..., 5]/17, np.var(u[..., 2], axis=0))
+    assert np.allclose(moments["m3"], np.sum(deviation**3, axis=0))
+    assert np.allclose(moments["m4"], np.sum(deviation**4, axis=0))
+
+
+def test_merge_moments_large_mean():
+    # Sums of squares would lose all the digits of the fluctuations
+    u = 1e8 + np.random.RandomState(0).rand(100, 3)
+
+    moments = None
+    for block in time_blocks(100, 7):
+        moments = merge_moments(moments, block_moments(u[block]))
+
+    assert np.allclose(moments["m2"]/100, np.var(u - 1e8, axis=0),
+                       rtol=1e-6)
+
+
+def test_reduce_moments():
+    u = np.random.RandomState(0).rand(5, 3)
+    comm = get_executor("serial").comm
+
+    moments = reduce_moments(block_moments(u), comm)
+
+    assert np.allclose(moments["mean"], np.mean(u, axis=0))
+
+
+def test_time_blocks():
+    assert time_blocks(5, 2) == [slice(0, 2), slice(2, 4), slice(4, 5)]
+    assert time_blocks(2, 0) == [slice(0, 1), slice(1, 2)]
+    assert time_blocks(0, 4) == []
+
+
+def test_position_blocks():
+    assert position_blocks([0, 1, 2, 5, 6, 9], 2) == \
+        [slice(0, 2), slice(2, 3), slice(5, 7), slice(9, 10)]
+    assert position_blocks([], 2) == []
+
+
+def test_statistics_cache(tmpdir):
+    u = np.random.RandomState(0).rand(10, 4, 3)
+    filePath = tmpdir.join("db.hdf5").strpath
+
+    with h5py.File(filePath, 'w') as dbFile:
+        assert read_statistics_cache(dbFile, "key", 10) is None
+
+        included = np.zeros(6, dtype=bool)
+        included[:5] = True
+        write_statistics_cache(dbFile, "key", included,
+                               {"moments": block_moments(u[:5], order=4),
+                                "spectra": None})
+
+    with h5py.File(filePath, 'r') as dbFile:
+        assert read_statistics_cache(dbFile, "otherKey", 10) is None
+        [included, cached] = read_statistics_cache(dbFile, "key", 10)
+
+    assert np.all(included == (np.arange(10) < 5))
+    assert list(cached) == ["moments"]
+
+    moments = merge_moments(cached["moments"], block_moments(u[5:], order=4))
+    assert moments["count"] == 10
+    assert np.allclose(moments["m4"],
+                       np.sum((u - np.mean(u, axis=0))**4, axis=0))
+
+
+def test_write_spanwise_averages(tmpdir):
+    u = np.random.RandomState(0).rand(4, 2, 3, 3)
+    statistics = moments_statistics(block_moments(u, crossTerms=True,
+                                                  order=3))
+
+    write_spanwise_averages(str(tmpdir), [0, 1], statistics)
+
+    assert len(os.listdir(str(tmpdir))) == 1 + 3 + 6 + 3
+    assert np.allclose(np.loadtxt(os.path.join(str(tmpdir), "uMeanY")),
+                       np.mean(u[..., 1], axis=(0, 2)))
+    assert np.allclose(np.loadtxt(os.path.join(str(tmpdir),
+                                               "uPrime2MeanYY")),
+                       np.mean(np.var(u[..., 1], axis=0), axis=1))
+
+
+def test_spectra_statistics():
+    for nPointsZ in [8, 9]:
+        u = 5 + np.random.RandomState(0).rand(20, 4, nPointsZ, 3)
+        deviation = u - np.mean(u, axis=0)
+        variance = np.mean(deviation**2, axis=(0, 2))
+
+        moments = None
+        for block in time_blocks(20, 6):
+            moments = merge_moments(moments, block_spectra(u[block], axis=2))
+        spectra = spectra_statistics(moments, nPointsZ, 3.0, axis=1)
+
+        # The spectra integrate to the variance
+        assert np.allclose(np.sum(spectra["E"], axis=1)*spectra["kz"][1],
+                           variance)
+
+        assert spectra["R"].shape == (4, nPointsZ//2 + 1, 3)
+        assert np.isclose(spectra["dz"][1], 3.0/nPointsZ)
+        for dz in range(nPointsZ//2 + 1):
+            shifted = np.roll(deviation, -dz, axis=2)
+            assert np.allclose(spectra["R"][:, dz],
+                               np.mean(deviation*shifted, axis=(0, 2)) /
+                               variance)
+
+
+def test_open_text_database(tmpdir):
+    writePath = tmpdir.strpath
+    [pointsY, pointsZ] = np.meshgrid([0., 1.], [0., 0.5, 1.], indexing="ij")
+    write_points_to_ofnative(os.path.join(writePath, "points"), pointsY,
+                             pointsZ, 0.0)
+    for t in [0.5, 0.25]:
+        write_velocity_to_ofnative(writePath, t, t*pointsY, pointsZ, pointsY)
+
+    [times, points, read] = open_text_database("ofnative", writePath)
+
+    assert times == ["0.25", "0.5"]
+    assert np.allclose(points, np.column_stack((pointsY.ravel(order='F'),
+                                                pointsZ.ravel(order='F'))))
+    assert np.allclose(read(times[1])[0], 0.5*points[:, 0])
+
+    with pytest.raises(ValueError):
+        open_text_database("foamFile", writePath)
+
+
+def test_accumulate_statistics(tmpdir):
+    u = np.random.RandomState(0).rand(10, 2, 4, 3)
+    filePath = tmpdir.join("db.hdf5").strpath
+    with h5py.File(filePath, 'w'):
+        pass
+
+    def read_block(block):
+        return u[block]
+
+    def accumulate(positions, cachePath=None):
+        return accumulate_statistics(read_block, positions,
+                                     get_executor("serial"), blockSize=3,
+                                     order=4, spectra=True,
+                                     cachePath=cachePath, size=10)
+
+    [moments, spectraMoments] = accumulate(np.arange(10))
+    assert moments["count"] == 10
+    assert np.allclose(moments["mean"], np.mean(u, axis=0))
+    assert spectraMoments["mean"].shape == (2, 3, 3)
+
+    # The saved moments are merged with those of the new time-steps
+    accumulate(np.arange(6), filePath)
+    [cachedMoments, cachedSpectra] = accumulate(np.arange(10), filePath)
+    for field in moments:
+        assert np.allclose(cachedMoments[field], moments[field])
+    for field in spectraMoments:
+        assert np.allclose(cachedSpectra[field], spectraMoments[field])
+
+    with h5py.File(filePath, 'r') as dbFile:
+        assert np.all(dbFile["stats"]["included"][()])
+
+
+def test_accumulate_statistics_empty(tmpdir):
+    u = np.random.RandomState(0).rand(4, 2, 3)
+    filePath = tmpdir.join("db.hdf5").strpath
+    with h5py.File(filePath, 'w'):
+        pass
+
+    def accumulate(positions, cachePath=None):
+        return accumulate_statistics(lambda block: u[block], positions,
+                                     get_executor("serial"),
+                                     cachePath=cachePath, size=4)
+
+    with pytest.raises(ValueError):
+        accumulate([])
+
+    # All the time-steps are already included in the saved moments
+    [moments, spectraMoments] = accumulate(np.arange(4), filePath)
+    [cachedMoments, cachedSpectra] = accumulate(np.arange(4), filePath)
+
+    assert cachedMoments["count"] == 4
+    assert np.allclose(cachedMoments["m2"], moments["m2"])
+    assert cachedSpectra is None
@@ -0,0 +1,82 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.time_interpolation import *
+import numpy as np
+import pytest
+
+
+def frame_reader(times, calls):
+    """A reader returning the time value as the velocity field."""
+
+    def read(timeIndex):
+        calls.append(timeIndex)
+        value = float(times[timeIndex])
+        return [value*np.ones(3), value**2*np.ones(3), -np.ones(3)]
+
+    read.reader = "hdf5"
+    return read
+
+
+def test_linear_weights():
+    [indices, weights] = time_interpolation_weights([0, 1, 3], 2.5)
+
+    assert np.all(indices == [1, 2])
+    assert np.allclose(weights, [0.25, 0.75])
+
+
+# At the frames the interpolation returns the frame itself
+def test_weights_at_frames():
+    times = np.array([0, 0.5, 1.5, 2, 4])
+    for method in ["linear", "cubic"]:
+        for i in range(times.size):
+            [indices, weights] = time_interpolation_weights(times, times[i],
+                                                            method)
+            assert np.allclose(weights[indices == i], 1)
+            assert np.allclose(weights[indices != i], 0)
+
+
+def test_cubic_weights_reproduce_quadratic():
+    times = np.linspace(0, 1, 6)
+    [indices, weights] = time_interpolation_weights(times, 0.53, "cubic")
+
+    assert indices.size == 4
+    assert np.isclose(np.sum(weights), 1)
+    assert np.isclose(np.sum(weights*times[indices]**2), 0.53**2)
+
+
+def test_weights_outside_time_span():
+    with pytest.raises(ValueError):
+        time_interpolation_weights([0, 1], 1.5)
+    with pytest.raises(ValueError):
+        time_interpolation_weights([0, 1], -0.1)
+
+
+def test_weights_unknown_method():
+    with pytest.raises(ValueError):
+        time_interpolation_weights([0, 1], 0.5, "quadratic")
+
+
+def test_reader_reads_each_frame_once():
+    times = np.linspace(0, 1, 5)
+    for method in ["linear", "cubic"]:
+        calls = []
+        read = time_interpolation_reader(frame_reader(times, calls), times,
+                                         method)
+        for t in np.linspace(0, 1, 41):
+            [uX, uY, uZ] = read(t)
+            assert np.allclose(uX, t)
+            assert np.allclose(uZ, -1)
+
+        assert sorted(calls) == list(range(times.size))
+
+
+def test_reader_unsorted_string_times():
+    times = ["10", "2", "6"]
+    calls = []
+    read = time_interpolation_reader(frame_reader(times, calls), times)
+
+    assert np.allclose(read(4)[0], 4)
+    assert np.allclose(read(8)[0], 8)
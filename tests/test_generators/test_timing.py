@@ -0,0 +1,118 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.generators.timing import *
+from eddylicious.generators.executors import get_executor
+import numpy as np
+import json
+import os
+
+
+def test_timers():
+    timers = get_timers()
+
+    for i in range(3):
+        with timers("read"):
+            pass
+        timers.add_bytes("read", np.zeros(4))
+
+    with timers("write"):
+        pass
+
+    assert list(timers.records) == ["read", "write"]
+    assert len(timers.records["read"]["durations"]) == 3
+    assert timers.records["read"]["bytes"] == 3*4*8
+    assert timers.records["write"]["bytes"] == 0
+
+
+def test_timers_disabled():
+    timers = get_timers(False)
+
+    with timers("read"):
+        pass
+    timers.add_bytes("read", np.zeros(4))
+
+    assert not timers.enabled
+    assert len(timers.records) == 0
+
+
+def test_merge_timings():
+    records = {"read": {"durations": [1.0], "bytes": 8}}
+    merge_timings(records, {"read": {"durations": [2.0], "bytes": 8},
+                            "write": {"durations": [3.0], "bytes": 16}})
+
+    assert records["read"] == {"durations": [1.0, 2.0], "bytes": 16}
+    assert records["write"] == {"durations": [3.0], "bytes": 16}
+
+
+def test_timing_summary(tmpdir):
+    timers = get_timers()
+    merge_timings(timers.records,
+                  {"read": {"durations": [1.0, 2.0, 3.0], "bytes": 24}})
+
+    summary = timing_summary(timers, get_executor("serial").comm)
+    read = summary["stages"]["read"]
+
+    assert read["count"] == 3
+    assert read["total"] == 6
+    assert read["min"] == 1
+    assert read["max"] == 3
+    assert read["p50"] == 2
+    assert read["bytes"] == 24
+    assert read["minRankTotal"] == read["maxRankTotal"] == 6
+    assert summary["ranks"][0]["read"]["count"] == 3
+
+    print_timing_summary(summary)
+
+    filePath = os.path.join(str(tmpdir), "timing.json")
+    write_timing_json(summary, filePath)
+    with open(filePath) as jsonFile:
+        assert json.load(jsonFile)["stages"]["read"]["count"] == 3
+
+
+def test_timers_pool():
+    timers = get_timers()
+    executor = get_executor("pool", nWorkers=2, blockSize=2)
+
+    def compute(item):
+        with timers("compute"):
+            return item
+
+    executor(np.arange(7), compute, lambda item, result: None,
+             timers=timers)
+
+    assert len(timers.records["compute"]["durations"]) == 7
+
+
+def test_trace(tmpdir):
+    timers = get_timers(False, trace=True)
+    executor = get_executor("pool", nWorkers=2, blockSize=2)
+
+    def compute(item):
+        with timers("compute"):
+            return item
+
+    def consume(item, result):
+        with timers("write"):
+            pass
+
+    executor(np.arange(6), compute, consume, timers=timers)
+
+    assert timers.enabled
+    assert len(timers.events) == 12
+
+    filePath = os.path.join(str(tmpdir), "trace.json")
+    write_trace(timers, executor.comm, filePath)
+
+    with open(filePath) as traceFile:
+        events = json.load(traceFile)["traceEvents"]
+
+    slices = [event for event in events if event["ph"] == "X"]
+    assert len(slices) == 12
+    assert min(event["ts"] for event in slices) == 0
+    assert set(event["tid"] for event in slices
+               if event["name"] == "write") == set([0])
+    assert 0 not in set(event["tid"] for event in slices
+                        if event["name"] == "compute")
@@ -7,6 +7,7 @@ import eddylicious
 from eddylicious.readers.foamfile_readers import *
 import numpy as np
 from os import path
+import gzip
 import pytest
 
 
@@ -212,3 +213,65 @@ def test_read_velocity_add_zeros_top_exclude_bot_interp_bot(load_vel):
     assert np.all(uZ == uZR)
 
 
+def test_structured_order():
+    [y, z] = np.meshgrid([0., 0.5, 2.], [1., 1.5], indexing="ij")
+    shuffle = np.random.RandomState(0).permutation(6)
+
+    [order, nPointsZ] = structured_order(y.ravel()[shuffle],
+                                         z.ravel()[shuffle])
+
+    assert nPointsZ == 2
+    assert np.all(np.reshape(y.ravel()[shuffle][order], (-1, 2)) == y)
+    assert np.all(np.reshape(z.ravel()[shuffle][order], (-1, 2)) == z)
+
+
+def test_read_vector_field_foamfile(tmpdir):
+    values = np.random.RandomState(0).rand(5, 3)
+    header = "FoamFile\n{\n    version 2.0;\n    format %s;\n}\n\n"
+
+    asciiPath = tmpdir.join("ascii").strpath
+    np.savetxt(asciiPath, values, fmt='(%.17g %.17g %.17g)',
+               header=header % "ascii" + "5\n(", footer=")\n",
+               comments="")
+    assert np.all(read_vector_field_foamfile(asciiPath) == values)
+
+    binaryPath = tmpdir.join("binary").strpath
+    with open(binaryPath, 'wb') as binaryFile:
+        binaryFile.write((header % "binary" + "5\n(").encode())
+        binaryFile.write(values.astype('<f8').tobytes())
+        binaryFile.write(b")\n")
+    assert np.all(read_vector_field_foamfile(binaryPath) == values)
+
+    gzPath = tmpdir.join("binary.gz").strpath
+    with open(binaryPath, 'rb') as binaryFile:
+        with gzip.open(gzPath, 'wb') as gzFile:
+            gzFile.write(binaryFile.read())
+    assert np.all(read_vector_field_foamfile(gzPath) == values)
+
+    with open(asciiPath, 'r') as asciiFile:
+        truncated = asciiFile.read().replace("5\n(", "6\n(")
+    with open(asciiPath, 'w') as asciiFile:
+        asciiFile.write(truncated)
+    with pytest.raises(ValueError):
+        read_vector_field_foamfile(asciiPath)
+
+
+def test_read_velocity_foamfile_gzip(tmpdir):
+    values = np.random.RandomState(0).rand(5, 3)
+    header = "FoamFile\n{\n    version 2.0;\n    format ascii;\n}\n\n5\n("
+
+    for time in ["0.5", "1"]:
+        uPath = tmpdir.join(time, "surface", "vectorField", "U")
+        uPath.dirpath().ensure(dir=True)
+        np.savetxt(uPath.strpath, values, fmt='(%.17g %.17g %.17g)',
+                   header=header, footer=")\n", comments="")
+    with open(uPath.strpath, 'rb') as uFile:
+        with gzip.open(uPath.strpath+".gz", 'wb') as gzFile:
+            gzFile.write(uFile.read())
+    uPath.remove()
+
+    assert read_times_foamfile(tmpdir.strpath, "surface") == ["0.5", "1"]
+
+    [uX, uY, uZ] = read_velocity_foamfile(tmpdir.strpath, "surface")("1")
+    assert np.all(uX == values[:, 0])
+    assert np.all(uZ == values[:, 2])
@@ -147,6 +147,19 @@ def test_read_velocity(load_vel, create_hdf5):
     assert np.all(load_vel[3] == uZR)
 
 
+def test_read_velocity_hyperslab(load_vel, create_hdf5):
+
+    readFunc = read_structured_velocity_hdf5(create_hdf5,
+                                             hyperslab=(slice(2, 10),
+                                                        slice(5, 8)))
+
+    [uXR, uYR, uZR] = readFunc(0)
+
+    assert np.all(load_vel[1][2:10, 5:8] == uXR)
+    assert np.all(load_vel[2][2:10, 5:8] == uYR)
+    assert np.all(load_vel[3][2:10, 5:8] == uZR)
+
+
 def test_read_velocity_add_zeros_bot_exclude_top_interp_top(load_vel,
                                                             create_hdf5):
     nPointsY = 15
@@ -0,0 +1,34 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.readers.ofnative_readers import *
+from eddylicious.writers.ofnative_writers import *
+import numpy as np
+
+
+def test_read_ofnative(tmpdir):
+    writePath = tmpdir.strpath
+    pointsY = np.linspace(0, 1, 6).reshape((3, 2))
+    pointsZ = np.linspace(1, 2, 6).reshape((3, 2))
+    write_points_to_ofnative(tmpdir.join("points").strpath, pointsY, pointsZ,
+                             0.0)
+    write_velocity_to_ofnative(writePath, 0.25, pointsY, pointsZ, -pointsY)
+    write_velocity_to_ofnative(writePath, 0.5, 2*pointsY, pointsZ, -pointsY,
+                               compression="gzip")
+    write_velocity_to_ofnative(writePath, 1.0, 3*pointsY, pointsZ, -pointsY)
+
+    [y, z] = read_points_ofnative(writePath)
+    assert np.allclose(y, pointsY.ravel(order='F'))
+    assert np.allclose(z, pointsZ.ravel(order='F'))
+
+    times = read_times_ofnative(writePath)
+    assert times == ["0.25", "0.5", "1.0"]
+
+    read = read_velocity_ofnative(writePath)
+    for i, time in enumerate(times):
+        [uX, uY, uZ] = read(time)
+        assert np.allclose(uX, (i + 1)*y)
+        assert np.allclose(uY, z)
+        assert np.allclose(uZ, -y)
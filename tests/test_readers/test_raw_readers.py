@@ -0,0 +1,46 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+from eddylicious.readers.raw_readers import *
+from eddylicious.writers.raw_writers import *
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def create_raw(tmpdir):
+    pointsY = np.linspace(0, 1, 6).reshape((3, 2))
+    pointsZ = np.linspace(1, 2, 6).reshape((3, 2))
+    create_velocity_files_raw(tmpdir.strpath, 4, 6, 0.0)
+    write_points_to_raw(tmpdir.strpath, pointsY, pointsZ, 0.0)
+    for i in range(4):
+        write_velocity_to_raw(tmpdir.strpath, 0.1*i, i*pointsY, pointsZ,
+                              -pointsY, i)
+    return [tmpdir.strpath, pointsY, pointsZ]
+
+
+def test_read_points(create_raw):
+    [readPath, pointsY, pointsZ] = create_raw
+    [readY, readZ] = read_points_raw(readPath)
+
+    assert np.all(readY == pointsY.flatten(order='F'))
+    assert np.all(readZ == pointsZ.flatten(order='F'))
+
+
+def test_read_times(create_raw):
+    assert np.allclose(read_times_raw(create_raw[0]), [0, 0.1, 0.2, 0.3])
+
+
+def test_read_velocity(create_raw):
+    [readPath, pointsY, pointsZ] = create_raw
+    readFunc = read_velocity_raw(readPath)
+
+    assert readFunc.reader == "raw"
+
+    [uX, uY, uZ] = readFunc(2)
+    assert np.all(uX == 2*pointsY.flatten(order='F'))
+    assert np.all(uY == pointsZ.flatten(order='F'))
+    assert np.all(uZ == -pointsY.flatten(order='F'))
+    assert not uX.flags.writeable
@@ -61,6 +61,25 @@ def test_velocity_writer(tmpdir):
     assert np.all(dbFile["velocity"][iteration, :, 2] == uZ)
 
 
+def test_velocities_writer(tmpdir):
+    u = np.arange(2*4, dtype=np.float64).reshape((2, 4))
+
+    dbFile = h5py.File(tmpdir.join("test.hdf5").strpath, 'a')
+    create_velocity_datasets_hdf5(dbFile, 4, 4, 0.0)
+    write_velocities_to_hdf5(dbFile, [0.1, 0.2], u, 2*u, 3*u, 1)
+
+    assert np.all(dbFile["velocity"][1:3, :, 0] == u)
+    assert np.all(dbFile["velocity"][1:3, :, 1] == 2*u)
+    assert np.all(dbFile["velocity"][1:3, :, 2] == 3*u)
+    assert np.all(dbFile["time"][1:3, 0] == [0.1, 0.2])
+    assert np.all(get_written_positions_hdf5(dbFile) == [1, 2])
+
+    with pytest.raises(ValueError):
+        write_velocities_to_hdf5(dbFile, [0.3, 0.4], u, u, u, 3)
+
+    dbFile.close()
+
+
 def test_velocity_writer_iter_larger_than_total_size(tmpdir):
     dsvDir = path.join(eddylicious.__path__[0], "..", "tests", "datasets",
                        "channel_flow_180", "dsv_output")
@@ -80,3 +99,134 @@ def test_velocity_writer_iter_larger_than_total_size(tmpdir):
 
     with pytest.raises(ValueError):
         write_velocity_to_hdf5(dbFile, 0.1, uX, uY, uZ, iteration)
+
+
+def test_create_velocity_datasets_chunked_compressed(tmpdir):
+    writePath = tmpdir.join("test.hdf5").strpath
+    dbFile = h5py.File(writePath, 'a')
+    create_velocity_datasets_hdf5(dbFile, 5, 10, 0.5, chunkSize=2,
+                                  compression="gzip", compressionLevel=4)
+
+    assert dbFile["velocity"].shape == (5, 10, 3)
+    assert dbFile["velocity"].chunks == (2, 10, 3)
+    assert dbFile["velocity"].maxshape == (None, 10, 3)
+    assert dbFile["velocity"].compression == "gzip"
+    assert dbFile["velocity"].compression_opts == 4
+    assert np.all(dbFile["time"][:, 0] == 0.5)
+
+
+def test_create_velocity_datasets_unknown_compression(tmpdir):
+    writePath = tmpdir.join("test.hdf5").strpath
+    dbFile = h5py.File(writePath, 'a')
+
+    with pytest.raises(ValueError):
+        create_velocity_datasets_hdf5(dbFile, 5, 10, 0.0, compression="zip")
+
+
+def test_extend_velocity_datasets(tmpdir):
+    writePath = tmpdir.join("test.hdf5").strpath
+    dbFile = h5py.File(writePath, 'a')
+    create_velocity_datasets_hdf5(dbFile, 3, 10, 0.0)
+    u = np.ones((10, 1))
+    write_velocity_to_hdf5(dbFile, 0.1, u, 2*u, 3*u, 2)
+
+    assert extend_velocity_datasets_hdf5(dbFile, 5) == 3
+    assert dbFile["velocity"].shape == (5, 10, 3)
+    assert dbFile["time"].shape == (5, 1)
+    assert np.all(dbFile["velocity"][2, :, 2] == 3)
+
+    write_velocity_to_hdf5(dbFile, 0.2, u, 2*u, 3*u, 4)
+    assert dbFile["time"][4, 0] == 0.2
+
+    with pytest.raises(ValueError):
+        extend_velocity_datasets_hdf5(dbFile, 4)
+
+
+def test_extend_velocity_datasets_not_resizable(tmpdir):
+    writePath = tmpdir.join("test.hdf5").strpath
+    dbFile = h5py.File(writePath, 'a')
+    dbFile.create_dataset("time", data=np.ones((3, 1)))
+    dbFile.create_dataset("velocity", (3, 10, 3), dtype=np.float64)
+
+    with pytest.raises(ValueError):
+        extend_velocity_datasets_hdf5(dbFile, 5)
+
+
+def test_written_positions(tmpdir):
+    writePath = tmpdir.join("test.hdf5").strpath
+    dbFile = h5py.File(writePath, 'a')
+    create_velocity_datasets_hdf5(dbFile, 5, 10, 0.0)
+    u = np.ones((10, 1))
+
+    assert get_written_positions_hdf5(dbFile).size == 0
+
+    write_velocity_to_hdf5(dbFile, 0.1, u, u, u, 1)
+    write_velocity_to_hdf5(dbFile, 0.3, u, u, u, 3)
+    assert np.all(get_written_positions_hdf5(dbFile) == [1, 3])
+
+    extend_velocity_datasets_hdf5(dbFile, 7)
+    assert np.all(get_written_positions_hdf5(dbFile) == [1, 3])
+
+
+def test_written_positions_no_completed_dataset(tmpdir):
+    writePath = tmpdir.join("test.hdf5").strpath
+    dbFile = h5py.File(writePath, 'a')
+    dbFile.create_dataset("time", data=np.ones((3, 1)))
+
+    assert np.all(get_written_positions_hdf5(dbFile) == [0, 1, 2])
+
+
+def test_rank_file_paths(tmpdir):
+    hdf5Path = tmpdir.join("test.hdf5").strpath
+
+    assert get_rank_file_path_hdf5(hdf5Path, 3) == \
+        path.join(hdf5Path+".ranks", "rank00003.hdf5")
+    assert get_rank_file_paths_hdf5(hdf5Path) == []
+
+    tmpdir.mkdir("test.hdf5.ranks")
+    for rank in [1, 0]:
+        h5py.File(get_rank_file_path_hdf5(hdf5Path, rank), 'a').close()
+
+    assert get_rank_file_paths_hdf5(hdf5Path) == \
+        [get_rank_file_path_hdf5(hdf5Path, 0),
+         get_rank_file_path_hdf5(hdf5Path, 1)]
+
+
+def test_virtual_datasets(tmpdir):
+    hdf5Path = tmpdir.join("test.hdf5").strpath
+    tmpdir.mkdir("test.hdf5.ranks")
+    u = np.ones((10, 1))
+    pointsY = np.zeros((2, 5))
+    pointsZ = np.ones((2, 5))
+
+    for rank, positions in enumerate([[0, 1], [2, 4]]):
+        rankFile = h5py.File(get_rank_file_path_hdf5(hdf5Path, rank), 'a')
+        create_velocity_datasets_hdf5(rankFile, 5, 10, 0.0)
+        write_points_to_hdf5(rankFile, pointsY, pointsZ, 0.0)
+        for i in positions:
+            write_velocity_to_hdf5(rankFile, 0.1*i, i*u, u, u, i)
+        rankFile.close()
+
+    dbFile = h5py.File(hdf5Path, 'a')
+    create_virtual_datasets_hdf5(dbFile, get_rank_file_paths_hdf5(hdf5Path))
+
+    assert dbFile["velocity"].is_virtual
+    assert dbFile["velocity"].shape == (5, 10, 3)
+    assert np.all(dbFile["completed"][()] == [1, 1, 1, 0, 1])
+    assert np.all(dbFile["velocity"][:, 0, 0] == [0, 1, 2, 0, 4])
+    assert np.allclose(dbFile["time"][:, 0], [0, 0.1, 0.2, 0, 0.4])
+    assert dbFile["points"].shape == (10, 3)
+
+
+def test_statistics_writer(tmpdir):
+    [pointsY, pointsZ] = np.meshgrid([0., 1.], [0., 1., 2.], indexing="ij")
+    statistics = {"uMean": np.ones((2, 3, 3)),
+                  "uPrime2Mean": np.zeros((2, 3, 6))}
+
+    with h5py.File(tmpdir.join("stats.hdf5").strpath, 'w') as statsFile:
+        write_statistics_to_hdf5(statsFile, pointsY, pointsZ, statistics)
+        write_statistics_to_hdf5(statsFile, pointsY, pointsZ, statistics)
+
+        assert np.all(statsFile["points"]["pointsZ"][()] == pointsZ)
+        assert np.all(statsFile["uMean"][()] == 1)
+        assert statsFile["uPrime2Mean"].shape == (2, 3, 6)
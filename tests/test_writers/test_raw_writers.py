@@ -0,0 +1,129 @@
+# This file is part of eddylicious
+# (c) Timofey Mukha
+# The code is released under the GNU GPL Version 3 licence.
+# See LICENCE.txt and the Legal section in the User Guide for more information
+
+import eddylicious
+from eddylicious.writers.raw_writers import *
+from eddylicious.readers.raw_readers import read_header_raw
+import numpy as np
+import pytest
+from os import path
+
+
+def test_point_writer(tmpdir):
+    dsvDir = path.join(eddylicious.__path__[0], "..", "tests", "datasets",
+                       "channel_flow_180", "dsv_output")
+
+    pointsY = np.load(path.join(dsvDir, "pointsY.npy"))
+    pointsZ = np.load(path.join(dsvDir, "pointsZ.npy"))
+    xVal = 0.5
+    write_points_to_raw(tmpdir.strpath, pointsY, pointsZ, xVal)
+
+    writtenPoints = np.load(tmpdir.join("points.npy").strpath)
+
+    assert np.all(writtenPoints[:, 0] == xVal)
+    assert np.all(writtenPoints[:, 1] ==
+                  pointsY.reshape((pointsY.size, -1), order='F')[:, 0])
+    assert np.all(writtenPoints[:, 2] ==
+                  pointsZ.reshape((pointsZ.size, -1), order='F')[:, 0])
+
+
+def test_create_velocity_files(tmpdir):
+    create_velocity_files_raw(tmpdir.strpath, 5, 10, 0.5, "float32")
+
+    header = read_header_raw(tmpdir.strpath)
+    assert header["nTimes"] == 5
+    assert header["nPoints"] == 10
+    assert np.dtype(header["dtype"]) == np.float32
+    assert tmpdir.join("velocity.raw").size() == 5*10*3*4
+    assert np.all(np.fromfile(tmpdir.join("time.raw").strpath) == 0.5)
+    assert get_written_positions_raw(tmpdir.strpath).size == 0
+
+
+def test_create_velocity_files_unsupported_dtype(tmpdir):
+    with pytest.raises(ValueError):
+        create_velocity_files_raw(tmpdir.strpath, 5, 10, 0.0, "int32")
+
+
+def test_velocity_writer(tmpdir):
+    dsvDir = path.join(eddylicious.__path__[0], "..", "tests", "datasets",
+                       "channel_flow_180", "dsv_output")
+
+    uX = np.load(path.join(dsvDir, "1000.05", "uX.npy"))
+    uY = np.load(path.join(dsvDir, "1000.05", "uY.npy"))
+    uZ = np.load(path.join(dsvDir, "1000.05", "uZ.npy"))
+
+    create_velocity_files_raw(tmpdir.strpath, 3, uX.size, 0.0)
+    write_velocity_to_raw(tmpdir.strpath, 0.1, uX, uY, uZ, 1)
+
+    velocity = np.fromfile(tmpdir.join("velocity.raw").strpath)
+    velocity = velocity.reshape((3, uX.size, 3))
+    uX = uX.reshape((uX.size, -1), order='F')[:, 0]
+    uY = uY.reshape((uY.size, -1), order='F')[:, 0]
+    uZ = uZ.reshape((uZ.size, -1), order='F')[:, 0]
+
+    assert np.all(velocity[1, :, 0] == uX)
+    assert np.all(velocity[1, :, 1] == uY)
+    assert np.all(velocity[1, :, 2] == uZ)
+    assert np.all(velocity[[0, 2]] == 0)
+    assert np.all(np.fromfile(tmpdir.join("time.raw").strpath) ==
+                  [0, 0.1, 0])
+    assert np.all(get_written_positions_raw(tmpdir.strpath) == [1])
+
+    with pytest.raises(ValueError):
+        write_velocity_to_raw(tmpdir.strpath, 0.3, uX, uY, uZ, 3)
+
+
+def test_velocities_writer(tmpdir):
+    u = np.arange(2*4, dtype=np.float64).reshape((2, 4))
+
+    create_velocity_files_raw(tmpdir.strpath, 4, 4, 0.0)
+    write_velocities_to_raw(tmpdir.strpath, [0.1, 0.2], u, 2*u, 3*u, 1)
+
+    velocity = np.fromfile(tmpdir.join("velocity.raw").strpath)
+    velocity = velocity.reshape((4, 4, 3))
+
+    assert np.all(velocity[1:3, :, 0] == u)
+    assert np.all(velocity[1:3, :, 1] == 2*u)
+    assert np.all(velocity[1:3, :, 2] == 3*u)
+    assert np.all(velocity[[0, 3]] == 0)
+    assert np.all(np.fromfile(tmpdir.join("time.raw").strpath) ==
+                  [0, 0.1, 0.2, 0])
+    assert np.all(get_written_positions_raw(tmpdir.strpath) == [1, 2])
+
+    with pytest.raises(ValueError):
+        write_velocities_to_raw(tmpdir.strpath, [0.3, 0.4], u, u, u, 3)
+
+
+def test_velocity_writer_header(tmpdir):
+    u = np.arange(2*4, dtype=np.float64).reshape((2, 4))
+
+    create_velocity_files_raw(tmpdir.strpath, 4, 4, 0.0)
+    header = read_header_raw(tmpdir.strpath)
+    tmpdir.join("header.json").remove()
+
+    write_velocity_to_raw(tmpdir.strpath, 0.1, u[0], u[0], u[0], 0,
+                          header=header)
+    write_velocities_to_raw(tmpdir.strpath, [0.2, 0.3], u, u, u, 1,
+                            header=header)
+
+    time = np.fromfile(tmpdir.join("time.raw").strpath)
+    assert np.all(time == [0.1, 0.2, 0.3, 0])
+
+
+def test_extend_velocity_files(tmpdir):
+    u = np.ones((10, 1))
+    create_velocity_files_raw(tmpdir.strpath, 3, 10, 0.0)
+    write_velocity_to_raw(tmpdir.strpath, 0.2, u, u, u, 2)
+
+    assert extend_velocity_files_raw(tmpdir.strpath, 5) == 3
+    assert read_header_raw(tmpdir.strpath)["nTimes"] == 5
+    assert tmpdir.join("velocity.raw").size() == 5*10*3*8
+    assert np.all(get_written_positions_raw(tmpdir.strpath) == [2])
+
+    write_velocity_to_raw(tmpdir.strpath, 0.4, u, u, u, 4)
+    assert np.all(get_written_positions_raw(tmpdir.strpath) == [2, 4])
+
+    with pytest.raises(ValueError):
+        extend_velocity_files_raw(tmpdir.strpath, 4)
@@ -7,6 +7,9 @@ import eddylicious
 from eddylicious.writers.ofnative_writers import *
 import numpy as np
 from os import path
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import pytest
 
 
 def test_point_writer(tmpdir):
@@ -62,3 +65,50 @@ def test_velocity_writer(tmpdir):
     assert np.all(writtenU[:, 0] == uX)
     assert np.all(writtenU[:, 1] == uY)
     assert np.all(writtenU[:, 2] == uZ)
+
+
+def test_get_written_times(tmpdir):
+    writePath = tmpdir.mkdir("u").strpath
+    u = np.ones((4, 2))
+    write_velocity_to_ofnative(writePath, 0.2, u, u, u)
+    write_velocity_to_ofnative(writePath, 0.1, u, u, u)
+    write_points_to_ofnative(path.join(writePath, "points"), u, u, 0.0)
+
+    assert np.all(get_written_times_ofnative(writePath) == [0.1, 0.2])
+    assert get_written_times_ofnative(path.join(writePath, "none")).size == 0
+
+
+def test_velocity_writer_gzip(tmpdir):
+    dsvDir = path.join(eddylicious.__path__[0], "..", "tests", "datasets",
+                       "channel_flow_180", "dsv_output")
+
+    uX = np.load(path.join(dsvDir, "1000.01", "uX.npy"))
+    uY = np.load(path.join(dsvDir, "1000.01", "uY.npy"))
+    uZ = np.load(path.join(dsvDir, "1000.01", "uZ.npy"))
+
+    writePath = tmpdir.mkdir("u").strpath
+    write_velocity_to_ofnative(writePath, "0.1", uX, uY, uZ)
+
+    with ThreadPoolExecutor(2) as executor:
+        future = write_velocity_to_ofnative(writePath, "0.2", uX, uY, uZ,
+                                            compression="gzip",
+                                            compressionLevel=1,
+                                            executor=executor)
+        future.result()
+
+    with open(path.join(writePath, "0.1", "U"), 'rb') as uFile:
+        uncompressed = uFile.read()
+    with gzip.open(path.join(writePath, "0.2", "U.gz"), 'rb') as uFile:
+        assert uFile.read() == uncompressed
+
+    assert not path.exists(path.join(writePath, "0.2", "U.gz.tmp"))
+    assert np.all(get_written_times_ofnative(writePath) == [0.1, 0.2])
+
+
+def test_velocity_writer_unknown_compression(tmpdir):
+    writePath = tmpdir.mkdir("u").strpath
+    u = np.ones((4, 2))
+
+    with pytest.raises(ValueError):
+        write_velocity_to_ofnative(writePath, "0.1", u, u, u,
+                                   compression="lzf")